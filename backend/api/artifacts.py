@@ -0,0 +1,53 @@
+"""
+Short-lived store of OCR results for uploaded files.
+
+`/detect-language` OCRs an upload and returns an `artifact_id` for the result. Passing that id
+to `/transliterate` (or `/transliterate/stream`) instead of the file skips both the second upload
+and the second OCR run. Entries expire after ARTIFACT_TTL_SECONDS and the store keeps at most
+ARTIFACT_MAX_ENTRIES, least recently used first out; an unknown id means "upload it again".
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+# The frontend reads the same variable so its cached detections (with ids) expire first
+ARTIFACT_TTL_SECONDS = float(os.environ.get("ARTIFACT_TTL_SECONDS", 1800))
+ARTIFACT_MAX_ENTRIES = int(os.environ.get("ARTIFACT_MAX_ENTRIES", 256))
+
+
+class ArtifactStore:
+    """Bounded, expiring map of artifact id -> OCR result."""
+
+    def __init__(self, ttl: float = ARTIFACT_TTL_SECONDS, max_entries: int = ARTIFACT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, ocr_result: dict) -> str:
+        artifact_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[artifact_id] = (self.clock() + self.ttl, ocr_result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return artifact_id
+
+    def get(self, artifact_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(artifact_id)
+            if entry is None:
+                return None
+            expires, ocr_result = entry
+            if self.clock() >= expires:
+                del self._entries[artifact_id]
+                return None
+            self._entries.move_to_end(artifact_id)
+            return ocr_result
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,13 +1,26 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 import uuid
 import asyncio
+import time
+
+from llm.scheduler import LLMScheduler, LLMOverloadedError, INTERACTIVE, get_scheduler
+from observability import tracing
+from observability.metrics import record_stage, stage
+from api.dependencies import Services, get_services
+from transliteration.transliteration_service import EXPLAIN_NONE
+from api.intents import IntentClassifier, REPEAT, EXPLAIN, PRONOUNCE, SWITCH_TARGET, SHOW_ORIGINAL
 
 
 class ChatMessage(BaseModel):
     role: str  # 'user' | 'assistant' | 'system'
     text: str
+    # Client-chosen id of a user message, so a re-sent message is recognised
+    id: Optional[str] = None
+
+
+SYSTEM_PROMPT = "You are a helpful linguistics assistant."
 
 
 class ChatSession:
@@ -15,12 +28,30 @@ class ChatSession:
         self.id = session_id or str(uuid.uuid4())
         self.messages: List[ChatMessage] = []
         self.context: Dict[str, Any] = initial_context or {}
+        # Frozen system/context preamble, built on the first LLM turn
+        self.prefix: Optional[str] = None
+        # Per-LLM-turn latency: time to first chunk and total generation time
+        self.turn_timings: List[Dict[str, float]] = []
 
-    def add_message(self, role: str, text: str):
-        msg = ChatMessage(role=role, text=text)
+    def add_message(self, role: str, text: str, message_id: Optional[str] = None):
+        msg = ChatMessage(role=role, text=text, id=message_id)
         self.messages.append(msg)
         return msg
 
+    def forget_attempt(self, message_id: str):
+        """Drop the latest user message if it has `message_id`, with the reply that followed it.
+
+        A client that lost its connection re-sends the same message; the earlier attempt must
+        not stay in the transcript as a second turn.
+        """
+        for index in range(len(self.messages) - 1, -1, -1):
+            if self.messages[index].role == "user":
+                if self.messages[index].id == message_id:
+                    del self.messages[index:]
+                    turns = sum(1 for m in self.messages if m.role == "user")
+                    self.turn_timings = [t for t in self.turn_timings if t["turn"] <= turns]
+                return
+
 
 class ChatService:
     """In-memory Chat service for MVP. Stores sessions and contextual artifacts (e.g., transliteration results).
@@ -30,9 +61,13 @@ class ChatService:
     simple deterministic replies for environments without an LLM.
     """
 
-    def __init__(self, streaming_llm=None):
+    def __init__(self, streaming_llm=None, transliteration_service=None, scheduler: Optional[LLMScheduler] = None):
         self.sessions: Dict[str, ChatSession] = {}
         self.streaming_llm = streaming_llm
+        self.scheduler = scheduler or get_scheduler()
+        # Optional TransliterationService used to re-target a result when the user switches script
+        self.transliteration_service = transliteration_service
+        self.intents = IntentClassifier()
 
     def create_session(self, initial_context: Optional[Dict[str, Any]] = None) -> str:
         session = ChatSession(initial_context=initial_context)
@@ -54,10 +89,11 @@ class ChatService:
             raise ValueError("Session not found")
         return session.add_message(role, text)
 
-    async def generate_reply(self, session_id: str, text: str):
+    async def generate_reply(self, session_id: str, text: str, message_id: Optional[str] = None):
         """Async generator that yields assistant reply chunks.
 
         Yields strings representing partial content. Consumers can track final chunk when iterator completes.
+        A `message_id` equal to the latest user message's marks a retry, which replaces that turn.
         """
         session = self.get_session(session_id)
         if not session:
@@ -66,32 +102,47 @@ class ChatService:
             self.sessions[session.id] = session
 
         # store user message
-        session.add_message("user", text)
-
-        lower = text.lower()
-        # quick context-based answers (no LLM) for direct explanation requests
-        if "explain" in lower or "why" in lower or "how" in lower:
-            if "transliteration" in session.context:
-                expl = session.context["transliteration"].get("explanation")
-                if expl:
-                    session.add_message("assistant", expl)
-                    yield expl
-                    return
-            if "translation" in session.context:
-                expl = session.context["translation"].get("explanation")
-                if expl:
-                    session.add_message("assistant", expl)
-                    yield expl
-                    return
-
-        # Build a prompt for the LLM
-        prompt = self._build_prompt_from_session(session, text)
-
-        # If we have a streaming LLM adapter, use it to stream back chunks
+        if message_id:
+            session.forget_attempt(message_id)
+        session.add_message("user", text, message_id)
+
+        # quick context-based answers (no LLM) for recognised follow-up intents
+        with stage("chat.intent"):
+            intent, slots = self.intents.classify(text)
+        if intent:
+            reply = await self._answer_from_context(session, intent, slots)
+            if reply:
+                session.add_message("assistant", reply)
+                yield reply
+                return
+
+        # If we have a streaming LLM adapter, use it to stream back chunks. Chat-capable adapters
+        # get the structured conversation so the server can reuse the cached prefix across turns.
         if self.streaming_llm:
-            async for chunk in self.streaming_llm.stream_generate(prompt):
-                session.add_message("assistant", chunk)
-                yield chunk
+            if hasattr(self.streaming_llm, "stream_chat"):
+                stream = self.streaming_llm.stream_chat(self._build_messages_from_session(session))
+            else:
+                stream = self.streaming_llm.stream_generate(self._build_prompt_from_session(session, text))
+
+            queued = time.perf_counter()
+            async with self.scheduler.slot_async(INTERACTIVE):
+                started = time.perf_counter()
+                record_stage("chat.queue", started - queued)
+                ttft = None
+                parts = []
+                async for chunk in stream:
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                        record_stage("chat.ttft", ttft)
+                    parts.append(chunk)
+                    yield chunk
+            record_stage("chat.generate", time.perf_counter() - started)
+            session.add_message("assistant", "".join(parts))
+            session.turn_timings.append({
+                "turn": sum(1 for m in session.messages if m.role == "user"),
+                "ttft_ms": round((ttft or 0.0) * 1000, 1),
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
             return
 
         # Otherwise fall back to deterministic echoing behavior
@@ -104,59 +155,139 @@ class ChatService:
         for i, w in enumerate(words, start=1):
             chunk.append(w)
             if i % max_words == 0 or i == len(words):
-                yield " ".join(chunk)
+                # Leading space on later chunks so the frames concatenate to the reply
+                yield (" " if i > max_words else "") + " ".join(chunk)
                 chunk = []
                 await asyncio.sleep(0.03)
 
+    async def _answer_from_context(self, session: ChatSession, intent: str, slots: Dict[str, str]) -> Optional[str]:
+        """Answer a classified intent from session context. Returns None to defer to the LLM."""
+        tl = session.context.get("transliteration") or {}
+        tr = session.context.get("translation") or {}
+
+        if intent == EXPLAIN:
+            if tl.get("explanation") or tr.get("explanation"):
+                return tl.get("explanation") or tr.get("explanation")
+            # The transliteration was produced without an explanation: generate it once, on first ask
+            if tl.get("transliteration") and tl.get("original_text") and self.transliteration_service:
+                tl["explanation"] = await asyncio.to_thread(
+                    self.transliteration_service.explain_result, tl, priority=INTERACTIVE,
+                )
+                return tl["explanation"]
+            return None
+
+        if intent == REPEAT:
+            if tl.get("transliteration"):
+                return f"The transliteration is: {tl['transliteration']}"
+            if tr.get("translation"):
+                return f"The translation is: {tr['translation']}"
+            return None
+
+        if intent == SHOW_ORIGINAL:
+            original = tl.get("original_text") or tr.get("original_text")
+            return f"The original text was: {original}" if original else None
+
+        if intent == PRONOUNCE:
+            # A Latin transliteration doubles as a pronunciation guide
+            if tl.get("transliteration") and tl.get("target_script") == "Latn":
+                return f"It is pronounced roughly as: {tl['transliteration']}"
+            return None
+
+        if intent == SWITCH_TARGET:
+            target = slots.get("target_script")
+            if not target or not tl.get("original_text"):
+                return None
+            # Results per target script are kept on the session so switching back is free
+            by_target = session.context.setdefault("transliterations", {})
+            if tl.get("target_script"):
+                by_target.setdefault(tl["target_script"], tl)
+            result = by_target.get(target)
+            if result is None:
+                if not self.transliteration_service:
+                    return None
+                result = await asyncio.to_thread(
+                    self.transliteration_service.transliterate,
+                    tl["original_text"], tl.get("source_script", "Latn"), target,
+                    priority=INTERACTIVE, explain=EXPLAIN_NONE,
+                )
+                by_target[target] = result
+            session.context["transliteration"] = result
+            return f"In {target}: {result['transliteration']}"
+
+        return None
+
+    def _session_prefix(self, session: ChatSession) -> str:
+        """System preamble for a session, frozen on first use.
+
+        The prefix must stay byte-identical across turns so the model server can reuse the
+        KV cache computed for it; later context changes reach the model through the transcript.
+        """
+        if session.prefix is None:
+            ctx_parts = []
+            if "transliteration" in session.context:
+                tl = session.context["transliteration"]
+                ctx_parts.append(f"Transliteration: {tl.get('transliteration')} Explanation: {tl.get('explanation')}")
+            if "translation" in session.context:
+                tr = session.context["translation"]
+                ctx_parts.append(f"Translation: {tr.get('translation')} Explanation: {tr.get('explanation')}")
+            ctx_text = "\n".join(ctx_parts)
+
+            prefix = SYSTEM_PROMPT + "\n"
+            if ctx_text:
+                prefix += f"Context:\n{ctx_text}\n\n"
+            session.prefix = prefix
+        return session.prefix
+
     def _build_prompt_from_session(self, session: ChatSession, user_text: str) -> str:
-        # Build a simple prompt using available context
-        ctx_parts = []
-        if "transliteration" in session.context:
-            tl = session.context["transliteration"]
-            ctx_parts.append(f"Transliteration: {tl.get('transliteration')} Explanation: {tl.get('explanation')}")
-        if "translation" in session.context:
-            tr = session.context["translation"]
-            ctx_parts.append(f"Translation: {tr.get('translation')} Explanation: {tr.get('explanation')}")
-        ctx_text = "\n".join(ctx_parts)
-
-        prompt = f"You are a helpful linguistics assistant.\n"
-        if ctx_text:
-            prompt += f"Context:\n{ctx_text}\n\n"
+        # Stable layout: frozen prefix, then the transcript in append-only order, then the new turn
+        prompt = self._session_prefix(session)
+        for msg in session.messages[:-1]:
+            speaker = "User" if msg.role == "user" else "Assistant"
+            prompt += f"{speaker}: {msg.text}\n"
         prompt += f"User: {user_text}\nAssistant:"
         return prompt
 
+    def _build_messages_from_session(self, session: ChatSession) -> List[Dict[str, str]]:
+        messages = [{"role": "system", "content": self._session_prefix(session)}]
+        messages.extend({"role": msg.role, "content": msg.text} for msg in session.messages)
+        return messages
+
 
 chat_router = APIRouter()
 
-# Create a streaming LLM adapter around the transliteration service's LLM for now
-import shutil
-from llm.streaming_client import StreamingLLMClient
 
-# Prefer a direct Ollama streaming client when available; otherwise fall back to the adapter
-try:
-    from llm.ollama_streaming import OllamaStreamingClient
-    if shutil.which("ollama"):
-        try:
-            streaming_adapter = OllamaStreamingClient()
-        except Exception:
-            # fallback to synchronous adapter using OllamaClient if streaming fails to initialize
-            from transliteration.transliteration_service import OllamaClient
-            streaming_adapter = StreamingLLMClient(llm_client=OllamaClient())
-    else:
-        streaming_adapter = None
-except Exception:
-    # If the Ollama streaming module is not usable, attempt to use the synchronous Ollama client as fallback
+def build_streaming_adapter():
+    """Pick the LLM adapter chat replies stream from (None: deterministic replies without an LLM).
+
+    With LLM_BACKENDS set, chat is routed across the configured model servers. Otherwise prefer a
+    chat client on a persistent connection to the Ollama server (reuses the prompt prefix across
+    turns), then the `ollama run` streaming client, then the synchronous adapter.
+    """
+    import shutil
+    from llm.router import get_router
+    from llm.streaming_client import StreamingLLMClient
+
+    if get_router() is not None:
+        return get_router()
+    if not shutil.which("ollama"):
+        return None
     try:
-        from transliteration.transliteration_service import OllamaClient
-        streaming_adapter = StreamingLLMClient(llm_client=OllamaClient())
+        from llm.ollama_chat import OllamaChatClient
+        return OllamaChatClient()
     except Exception:
-        streaming_adapter = None
-
-service = ChatService(streaming_llm=streaming_adapter)
+        pass
+    try:
+        from llm.ollama_streaming import OllamaStreamingClient
+        return OllamaStreamingClient()
+    except Exception:
+        # fallback to synchronous adapter using OllamaClient if streaming fails to initialize
+        from transliteration.transliteration_service import OllamaClient
+        return StreamingLLMClient(llm_client=OllamaClient())
 
 
 @chat_router.websocket("/ws/chat")
-async def websocket_chat(ws: WebSocket):
+async def websocket_chat(ws: WebSocket, services: Services = Depends(get_services)):
+    service = services.chat
     await ws.accept()
     try:
         while True:
@@ -174,24 +305,41 @@ async def websocket_chat(ws: WebSocket):
             if msg_type in ("user", "message"):
                 session_id = data.get("session_id")
                 text = data.get("text", "")
+                message_id = data.get("message_id")
 
                 if not session_id:
                     # create ephemeral session if none provided
                     session_id = service.create_session()
                     await ws.send_json({"type": "session", "session_id": session_id})
 
-                # Stream the reply using the service's async generator
-                async for chunk_text in service.generate_reply(session_id, text):
-                    # send partial chunk; clients will receive an explicit final marker after generator completes
-                    await ws.send_json({"type": "assistant", "text": chunk_text, "partial": True, "session_id": session_id})
-                # explicit final marker to indicate the end of the reply
-                await ws.send_json({"type": "assistant", "text": "", "partial": False, "session_id": session_id})
+                # One trace per turn, linked to the /transliteration request that created the session
+                with tracing.tracer.start_trace(
+                    "chat.turn", attributes={"session.id": session_id}, links=tracing.links_for(session_id)
+                ):
+                    # Stream the reply using the service's async generator
+                    async for chunk_text in service.generate_reply(session_id, text, message_id):
+                        # send partial chunk; clients will receive an explicit final marker after generator completes
+                        await ws.send_json({"type": "assistant", "text": chunk_text, "partial": True, "session_id": session_id})
+                # explicit final marker to indicate the end of the reply, with LLM timing when available
+                final = {"type": "assistant", "text": "", "partial": False, "session_id": session_id}
+                session = service.get_session(session_id)
+                if session and session.turn_timings and session.turn_timings[-1]["turn"] == len(
+                    [m for m in session.messages if m.role == "user"]
+                ):
+                    final["ttft_ms"] = session.turn_timings[-1]["ttft_ms"]
+                await ws.send_json(final)
                 continue
 
             # unknown message
             await ws.send_json({"type": "error", "message": "Unknown message type"})
     except WebSocketDisconnect:
         return
+    except LLMOverloadedError as e:
+        try:
+            await ws.send_json({"type": "error", "message": str(e), "retry_after": e.retry_after})
+        except Exception:
+            pass
+        return
     except Exception as e:
         try:
             await ws.send_json({"type": "error", "message": str(e)})
@@ -0,0 +1,129 @@
+"""
+Lightweight intent classifier for chat follow-ups.
+
+Common follow-ups (repeat, explain, pronounce, switch target script, show original) can be
+answered from the session context without calling the LLM. Matching is done on whole words
+with a small phrase trie, so "show" no longer triggers the "how" explanation shortcut.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from ocr.language_detection import SCRIPT_TO_ISO
+
+REPEAT = "repeat"
+EXPLAIN = "explain"
+PRONOUNCE = "pronounce"
+SWITCH_TARGET = "switch_target"
+SHOW_ORIGINAL = "show_original"
+
+# A phrase ending in END only matches at the end of the message ("show me the original", but
+# not "the original meaning of ...")
+END = "."
+
+# Keyword phrases per intent. Phrases are matched on whole tokens.
+INTENT_PHRASES: Dict[str, List[str]] = {
+    REPEAT: [
+        "repeat", "again", "once more", "say that again", "say it again", "what was the transliteration",
+        "show the transliteration", "show me the transliteration", "what was the result",
+        "show the result", "show me the result",
+    ],
+    EXPLAIN: [
+        "explain", "explanation", "why", "how come", "how did you", "reason", "reasoning",
+        "what does it mean",
+    ],
+    PRONOUNCE: [
+        "pronounce", "pronounced", "pronunciation", "how do i say", "how does it sound",
+        "sound like", "read aloud", "say it",
+    ],
+    # Imperatives only ("write it in Greek"): a bare "in Greek" is usually part of a question
+    SWITCH_TARGET: [
+        f"{verb} {obj}{prep}"
+        for verb in ("switch", "convert", "change", "transliterate", "write", "show", "show me", "put", "render")
+        for obj in ("", "it ", "that ", "this ")
+        for prep in ("to", "into", "in")
+    ],
+    SHOW_ORIGINAL: [
+        "original text", "source text", "input text", "original input", "what did i type", "what did i write",
+    ] + [
+        f"{lead} the original {END}"
+        for lead in ("show", "show me", "give me", "what was", "what is", "what s", "back to", "go back to")
+    ],
+}
+
+# Tie-break order when several intents score equally (earlier wins).
+INTENT_PRIORITY = [SWITCH_TARGET, SHOW_ORIGINAL, PRONOUNCE, REPEAT, EXPLAIN]
+
+# Longer messages are treated as open-ended questions and go to the LLM.
+MAX_ROUTABLE_WORDS = 12
+
+# Script names and ISO 15924 codes the user may mention when switching target script
+SCRIPT_NAMES: Dict[str, str] = {name.lower(): iso for name, iso in SCRIPT_TO_ISO.items()}
+SCRIPT_NAMES.update({iso.lower(): iso for iso in SCRIPT_TO_ISO.values()})
+SCRIPT_NAMES.update({"roman": "Latn", "russian": "Cyrl", "hindi": "Deva", "chinese": "Hani", "korean": "Hang"})
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class IntentClassifier:
+    """Keyword automaton over word tokens.
+
+    Phrases are compiled into a token trie; classification walks the trie from every token
+    position and scores each intent by the number of tokens its matched phrases cover.
+    """
+
+    def __init__(self, phrases: Optional[Dict[str, List[str]]] = None):
+        self.trie: Dict = {}
+        for intent, items in (phrases or INTENT_PHRASES).items():
+            for phrase in items:
+                node = self.trie
+                tokens = _tokenize(phrase) + ([END] if phrase.endswith(END) else [])
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault("$", set()).add(intent)
+
+    def _match(self, tokens: List[str]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Per intent: the longest matched phrase (in tokens) and where its first match ends."""
+        scores: Dict[str, int] = {}
+        ends: Dict[str, int] = {}
+        for start in range(len(tokens)):
+            node = self.trie
+            for pos in range(start, len(tokens)):
+                node = node.get(tokens[pos])
+                if node is None:
+                    break
+                for intent in node.get("$", ()):
+                    scores[intent] = max(scores.get(intent, 0), pos - start + 1)
+                    ends.setdefault(intent, pos + 1)
+        return scores, ends
+
+    def classify(self, text: str) -> Tuple[Optional[str], Dict[str, str]]:
+        """Return (intent, slots) for a message, or (None, {}) for open-ended questions.
+
+        Slots currently hold `target_script` (ISO 15924 code) for SWITCH_TARGET.
+        """
+        tokens = _tokenize(text)
+        if not tokens or len(tokens) > MAX_ROUTABLE_WORDS:
+            return None, {}
+
+        scores, ends = self._match(tokens + [END])
+
+        # Switching only makes sense when a known script follows the trigger phrase
+        after = tokens[ends[SWITCH_TARGET]:] if SWITCH_TARGET in ends else []
+        target = next((SCRIPT_NAMES[t] for t in after if t in SCRIPT_NAMES), None)
+        if target:
+            if SWITCH_TARGET in scores and PRONOUNCE not in scores:
+                return SWITCH_TARGET, {"target_script": target}
+        scores.pop(SWITCH_TARGET, None)
+
+        if not scores:
+            return None, {}
+
+        best = max(scores.values())
+        for intent in INTENT_PRIORITY:
+            if scores.get(intent) == best:
+                return intent, {}
+        return None, {}
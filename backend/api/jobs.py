@@ -0,0 +1,285 @@
+from fastapi import APIRouter, UploadFile, File, Form, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import asyncio
+import json
+
+from jobs.job_queue import JobHandler, JobQueue, JobStore, TERMINAL_STATUSES, COMPLETED
+from ocr.language_detection import detect_script
+from ocr.ocr import extract_text_from_bytes
+from ocr.ocr_utils import iter_pdf_pages, pdf_page_count
+from transliteration.transliteration_service import EXPLAIN_LEVELS, EXPLAIN_NONE
+from api.dependencies import Services, get_services
+from llm.scheduler import BATCH
+
+jobs_router = APIRouter()
+
+INPUT_FILE = "input"
+# Batch jobs are processed (and checkpointed) this many texts at a time
+BATCH_SLICE = 16
+STREAM_POLL_SECONDS = 0.5
+
+
+class TransliterationJob(JobHandler):
+    """One long text; items are the document pipeline's chunks."""
+
+    def __init__(self, services: Services):
+        self.services = services
+
+    def count(self, params: dict, job_dir: Path) -> int:
+        return self.services.document_pipeline.count_chunks(params["text"])
+
+    def run(self, params: dict, job_dir: Path, indices: List[int]) -> Iterator[Tuple[int, dict]]:
+        for chunk in self.services.document_pipeline.iter_chunks(
+            params["text"], params["source_script"], params["target_script"], params.get("context"),
+            priority=BATCH, ordered=False, indices=indices,
+        ):
+            yield chunk["index"], {"text": chunk["text"]}
+
+
+class BatchJob(JobHandler):
+    """A list of texts; items are the individual transliterations."""
+
+    def __init__(self, services: Services):
+        self.services = services
+
+    def count(self, params: dict, job_dir: Path) -> int:
+        return len(params["texts"])
+
+    def run(self, params: dict, job_dir: Path, indices: List[int]) -> Iterator[Tuple[int, dict]]:
+        texts = params["texts"]
+        explain = params.get("explain", EXPLAIN_NONE)
+        for start in range(0, len(indices), BATCH_SLICE):
+            # Items of a slice share prompts when they share a source script
+            groups: Dict[str, List[int]] = {}
+            for idx in indices[start:start + BATCH_SLICE]:
+                src = params.get("source_script") or detect_script(texts[idx])["iso_15924"]
+                groups.setdefault(src, []).append(idx)
+
+            results: Dict[int, dict] = {}
+            for src, group in groups.items():
+                if explain == EXPLAIN_NONE:
+                    outputs = self.services.micro_batcher.transliterate_many(
+                        [texts[i] for i in group], src, params["target_script"], params.get("context")
+                    )
+                else:
+                    outputs = [
+                        self.services.transliteration.transliterate(
+                            texts[i], src, params["target_script"], params.get("context"),
+                            priority=BATCH, explain=explain,
+                        )
+                        for i in group
+                    ]
+                results.update(zip(group, outputs))
+            for idx in sorted(results):
+                yield idx, results[idx]
+
+
+class TranslationJob(JobHandler):
+    """A list of texts to translate."""
+
+    def __init__(self):
+        self._service = None
+
+    @property
+    def service(self):
+        # Created on first use so the API starts without touching the translation model
+        if self._service is None:
+            from transliteration.translation_service import TranslationService
+            from llm.tiering import get_model_tiers
+            self._service = TranslationService(tiers=get_model_tiers())
+        return self._service
+
+    def count(self, params: dict, job_dir: Path) -> int:
+        return len(params["texts"])
+
+    def run(self, params: dict, job_dir: Path, indices: List[int]) -> Iterator[Tuple[int, dict]]:
+        for idx in indices:
+            yield idx, self.service.translate(
+                params["texts"][idx], params["source_lang"], params["target_lang"], params.get("context"),
+                priority=BATCH,
+            )
+
+
+class OCRJob(JobHandler):
+    """An uploaded PDF (one item per page) or image (one item), optionally transliterated."""
+
+    def __init__(self, services: Services):
+        self.services = services
+
+    @staticmethod
+    def _is_pdf(params: dict) -> bool:
+        return (params.get("filename") or "").lower().endswith(".pdf")
+
+    def count(self, params: dict, job_dir: Path) -> int:
+        if self._is_pdf(params):
+            return pdf_page_count(str(job_dir / INPUT_FILE))
+        return 1
+
+    def run(self, params: dict, job_dir: Path, indices: List[int]) -> Iterator[Tuple[int, dict]]:
+        path = job_dir / INPUT_FILE
+        if self._is_pdf(params):
+            pages = iter_pdf_pages(str(path), lang=params.get("lang"), pages=indices)
+        else:
+            pages = [(0, extract_text_from_bytes(path.read_bytes())["text"])] if indices else []
+
+        for number, text in pages:
+            result = {"page": number, "text": text}
+            if params.get("target_script") and text.strip():
+                src = params.get("source_script") or detect_script(text)["iso_15924"]
+                result["transliteration"] = self.services.document_pipeline.transliterate_document(
+                    text, src, params["target_script"], params.get("context"), priority=BATCH
+                )["transliteration"]
+            yield number, result
+
+
+REQUIRED_PARAMS = {
+    "transliteration": ("text", "source_script", "target_script"),
+    "batch": ("texts", "target_script"),
+    "translation": ("texts", "source_lang", "target_lang"),
+    "ocr": (),
+}
+
+def build_job_queue(services: Services, jobs_dir: Optional[Path] = None) -> JobQueue:
+    """Jobs and their per-item results live in SQLite under `jobs_dir` (default backend/data/jobs).
+
+    The workers are started by the app's lifespan hook, which also resumes jobs interrupted by
+    a restart.
+    """
+    return JobQueue(
+        JobStore(jobs_dir / "jobs.sqlite3" if jobs_dir else None),
+        {
+            "transliteration": TransliterationJob(services),
+            "batch": BatchJob(services),
+            "translation": TranslationJob(),
+            "ocr": OCRJob(services),
+        },
+        jobs_dir=jobs_dir,
+    )
+
+
+def job_response(job_queue: JobQueue, job: dict, after: int = -1) -> dict:
+    """Status, progress and the results with an index greater than `after`."""
+    results = [{"index": idx, **result} for idx, result in job_queue.store.results(job["id"], after)]
+    response = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "total": job["total"],
+        "completed": job["completed"],
+        "error": job["error"],
+        "results": results,
+    }
+    if job["kind"] == "transliteration" and job["status"] == COMPLETED and after < 0:
+        response["transliteration"] = "".join(r["text"] for r in results)
+    return response
+
+
+# POST endpoint to submit a long-running job
+@jobs_router.post("/jobs")
+async def submit_job(
+    kind: str = Form(...),
+    params: str = Form("{}"),
+    file: Optional[UploadFile] = File(None),
+    services: Services = Depends(get_services),
+):
+    """
+    Submit a background job and return its id right away.
+
+    Args:
+    - kind: "transliteration", "batch", "translation" or "ocr"
+    - params: JSON object, e.g. {"text", "source_script", "target_script", "context"} for
+      transliteration, {"texts": [...], "target_script", "explain"} for batch,
+      {"texts": [...], "source_lang", "target_lang"} for translation and
+      {"target_script"} (optional) for ocr
+    - file: The PDF or image for "ocr" jobs
+
+    Poll /jobs/{job_id} or stream /jobs/{job_id}/stream for progress and partial results.
+    """
+    if kind not in REQUIRED_PARAMS:
+        return {"error": f"Unknown job kind: {kind}", "hint": f"Use one of {', '.join(REQUIRED_PARAMS)}"}
+    try:
+        job_params = json.loads(params)
+    except ValueError:
+        return {"error": "params must be a JSON object"}
+    if not isinstance(job_params, dict):
+        return {"error": "params must be a JSON object"}
+    missing = [name for name in REQUIRED_PARAMS[kind] if not job_params.get(name)]
+    if missing:
+        return {"error": f"Missing params for {kind} job: {', '.join(missing)}"}
+    if job_params.get("explain", EXPLAIN_NONE) not in EXPLAIN_LEVELS:
+        return {"error": f"Unknown explain level: {job_params['explain']}"}
+
+    files = None
+    if kind == "ocr":
+        if not file:
+            return {"error": "OCR jobs need a file"}
+        job_params["filename"] = file.filename
+        files = {INPUT_FILE: await file.read()}
+
+    job_queue = services.job_queue
+    # SQLite writes and the upload's file write block: keep them off the event loop
+    job_id = await run_in_threadpool(job_queue.submit, kind, job_params, files=files)
+    job = await run_in_threadpool(job_queue.store.get, job_id)
+    return {"job_id": job_id, "status": job["status"]}
+
+
+# GET endpoint for job status, progress and partial results
+@jobs_router.get("/jobs/{job_id}")
+def get_job(job_id: str, after: int = -1, services: Services = Depends(get_services)):
+    """Return the job's status and results; pass `after` to only get items past that index."""
+    job = services.job_queue.store.get(job_id)
+    if not job:
+        return {"error": "Job not found"}
+    return job_response(services.job_queue, job, after)
+
+
+# GET endpoint streaming a job's results as they finish (NDJSON)
+@jobs_router.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str, after: int = -1, services: Services = Depends(get_services)):
+    """
+    Newline-delimited JSON: one {"index", ...result} line per finished item past `after`, then a
+    final {"status", "completed", "total", "error"} line once the job is completed, failed or
+    cancelled.
+    """
+    job_queue = services.job_queue
+    if not await run_in_threadpool(job_queue.store.get, job_id):
+        return {"error": "Job not found"}
+
+    async def lines():
+        # Items of unordered jobs can finish out of order: each poll reads only results past the
+        # last index below which everything was sent, and skips the few already sent beyond it
+        done = after
+        sent = set()
+        while True:
+            job = await run_in_threadpool(job_queue.store.get, job_id)
+            for idx, result in await run_in_threadpool(job_queue.store.results, job_id, done):
+                if idx not in sent:
+                    sent.add(idx)
+                    yield json.dumps({"index": idx, **result}, ensure_ascii=False) + "\n"
+            while done + 1 in sent:
+                done += 1
+                sent.discard(done)
+            if job["status"] in TERMINAL_STATUSES:
+                yield json.dumps({
+                    "status": job["status"], "completed": job["completed"],
+                    "total": job["total"], "error": job["error"],
+                }) + "\n"
+                return
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# DELETE endpoint to cancel a queued or running job
+@jobs_router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, services: Services = Depends(get_services)):
+    job_queue = services.job_queue
+    job = job_queue.store.get(job_id)
+    if not job:
+        return {"error": "Job not found"}
+    if not job_queue.cancel(job_id):
+        return {"error": f"Job already {job['status']}", "job_id": job_id}
+    return {"job_id": job_id, "status": job_queue.store.get(job_id)["status"]}
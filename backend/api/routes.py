@@ -1,14 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+import json
 
 from ocr.ocr import extract_text
-from transliteration.transliteration_service import TransliterationService
-from api.chat import service as chat_service
+from transliteration.transliteration_service import EXPLAIN_LEVELS, EXPLAIN_NONE, EXPLAIN_BRIEF
+from api.dependencies import Services, get_services
 from ocr.language_detection import detect_script
+from llm.scheduler import SINGLE, BATCH, get_scheduler
+from llm.router import get_router
+from llm.tiering import get_model_tiers
+from llm.structured_output import structured_stats
+from observability import tracing
+from observability.metrics import stage
 
 router = APIRouter()
-transliteration_service = TransliterationService()
+# Services (transliteration, micro-batcher, document pipeline, chat) come from api.dependencies
+DOCUMENT_THRESHOLD_CHARS = 2000
+ARTIFACT_EXPIRED = {"error": "Unknown or expired artifact_id", "hint": "Upload the file again"}
 
 
 # Pydantic models for language detection confirmation flow
@@ -38,6 +49,7 @@ class TransliterationWithConfirmationRequest(BaseModel):
 async def detect_language(
     file: Optional[UploadFile] = File(None),
     text: Optional[str] = Form(None),
+    services: Services = Depends(get_services),
 ):
     """
     Detect the script/language of provided text or OCR'd file.
@@ -49,15 +61,18 @@ async def detect_language(
     - confidence: Confidence score (0-1)
     - available_scripts: List of common scripts user can switch to
     - message: Asks user to confirm or provide correction
+    - artifact_id: For files, pass it to /transliterate instead of uploading the file again
     """
     if not file and not text:
         return {"error": "Provide either text or a file"}
 
     # OCR path
+    artifact_id = None
     if file:
         ocr_result = extract_text(file)
         input_text = ocr_result["text"]
         detected = ocr_result
+        artifact_id = services.artifacts.put(ocr_result)
     else:
         input_text = text
         detected = detect_script(text)
@@ -83,6 +98,7 @@ async def detect_language(
         "confidence": detected["confidence"],
         "tesseract_lang": detected["tesseract_lang"],
         "available_scripts": available_scripts,
+        "artifact_id": artifact_id,
         "message": f"Detected language: {detected['script']} (confidence: {detected['confidence']}). "
                    f"Is this correct? If not, provide the correct ISO 15924 code or script name from available_scripts.",
         "instructions": {
@@ -96,7 +112,8 @@ async def detect_language(
 # POST endpoint to confirm/correct detected language
 @router.post("/confirm-language")
 async def confirm_language(
-    request: LanguageConfirmationRequest
+    request: LanguageConfirmationRequest,
+    services: Services = Depends(get_services),
 ):
     """
     User confirms or corrects the detected language.
@@ -118,7 +135,7 @@ async def confirm_language(
             }
         try:
             # Normalize the user's correction
-            confirmed_script = transliteration_service.normalize_script_code(request.corrected_language)
+            confirmed_script = services.transliteration.normalize_script_code(request.corrected_language)
             message = f"Language changed to: {confirmed_script}. Ready for transliteration."
         except ValueError as e:
             return {
@@ -142,16 +159,23 @@ async def transliterate(
     source_script: Optional[str] = Form(None),
     context: Optional[str] = Form(None),
     skip_detection: bool = Form(False),
+    batch: bool = Form(False),
+    explain: str = Form(EXPLAIN_NONE),
+    artifact_id: Optional[str] = Form(None),
+    services: Services = Depends(get_services),
 ):
     """
     Transliterate text from source script to target script.
     
     Args:
-    - text or file: Input to transliterate
+    - text, file or artifact_id: Input to transliterate (artifact_id: an OCR'd file from /detect-language)
     - target_script: Target script (required)
     - source_script: Source script (optional, auto-detected if not provided)
     - context: Additional context for transliteration
     - skip_detection: If True, use provided source_script without detection
+    - batch: If True, micro-batch with other batch items in the low-priority LLM lane
+    - explain: "none" (default), "brief" or "full". Skipped explanations can be fetched later
+      via /explain or by asking in the chat session
     
     Returns:
     - input_text: The text to transliterate
@@ -160,14 +184,21 @@ async def transliterate(
     - source_script: Source script used (user-confirmed or auto-detected)
     - target_script: Target script
     - transliteration: The transliterated result
-    - explanation: Explanation of transliteration choices
+    - explanation: Explanation of transliteration choices (null when explain="none")
     - session_id: Chat session for follow-up questions
     """
-    if not file and not text:
+    if not file and not text and not artifact_id:
         return {"error": "Provide either text or a file"}
+    if explain not in EXPLAIN_LEVELS:
+        return {"error": f"Unknown explain level: {explain}", "hint": f"Use one of {', '.join(EXPLAIN_LEVELS)}"}
 
-    # OCR path
-    if file:
+    # Earlier OCR result, OCR path or text
+    if artifact_id and not file and not text:
+        detected = services.artifacts.get(artifact_id)
+        if detected is None:
+            return ARTIFACT_EXPIRED
+        input_text = detected["text"]
+    elif file:
         ocr_result = extract_text(file)
         input_text = ocr_result["text"]
         detected = ocr_result
@@ -181,15 +212,43 @@ async def transliterate(
     else:
         src_script = detected["iso_15924"]
 
-    result = transliteration_service.transliterate(
-        text=input_text,
-        source_script=src_script,
-        target_script=target_script,
-        context=context,
-    )
+    # Run in a worker thread: the service blocks while waiting for an LLM slot and generating.
+    # Batch items without explanations are micro-batched with other concurrent batch items, and
+    # long documents go through the chunking pipeline (explanations are not generated for them).
+    if len(input_text) > DOCUMENT_THRESHOLD_CHARS:
+        result = await run_in_threadpool(
+            services.document_pipeline.transliterate_document,
+            text=input_text,
+            source_script=src_script,
+            target_script=target_script,
+            context=context,
+            priority=BATCH if batch else SINGLE,
+        )
+    elif batch and explain == EXPLAIN_NONE:
+        result = await run_in_threadpool(
+            services.micro_batcher.transliterate,
+            text=input_text,
+            source_script=src_script,
+            target_script=target_script,
+            context=context,
+        )
+    else:
+        result = await run_in_threadpool(
+            services.transliteration.transliterate,
+            text=input_text,
+            source_script=src_script,
+            target_script=target_script,
+            context=context,
+            priority=BATCH if batch else SINGLE,
+            explain=explain,
+        )
 
     # Create a chat session containing this transliteration as context so users can ask follow-ups
-    session_id = chat_service.create_session(initial_context={"transliteration": result})
+    with stage("chat.create_session"):
+        session_id = services.chat.create_session(initial_context={"transliteration": result})
+    # Later /ws/chat turns on this session link back to this request's trace
+    tracing.set_attribute("session.id", session_id)
+    tracing.remember(session_id)
 
     return {
         "input_text": input_text,
@@ -199,11 +258,88 @@ async def transliterate(
         "target_script": target_script,
         "transliteration": result["transliteration"],
         "explanation": result["explanation"],
+        "explanation_level": result["explanation_level"],
         "session_id": session_id,
         "detection_status": "auto-detected" if not source_script else "user-provided"
     }
 
 
+# POST endpoint streaming a long document's transliteration chunk by chunk (NDJSON)
+@router.post("/transliterate/stream")
+async def transliterate_stream(
+    file: Optional[UploadFile] = File(None),
+    text: Optional[str] = Form(None),
+    target_script: str = Form(...),
+    source_script: Optional[str] = Form(None),
+    context: Optional[str] = Form(None),
+    artifact_id: Optional[str] = Form(None),
+    services: Services = Depends(get_services),
+):
+    """
+    Transliterate a long text or OCR'd file (uploaded, or an artifact_id from /detect-language) in chunks.
+
+    Returns newline-delimited JSON: one {"index", "total", "text"} line per chunk, in document
+    order, sent as soon as each chunk (and every chunk before it) is finished. Concatenating the
+    "text" fields gives the full transliteration with the original layout.
+    """
+    if not file and not text and not artifact_id:
+        return {"error": "Provide either text or a file"}
+
+    if artifact_id and not file and not text:
+        ocr_result = services.artifacts.get(artifact_id)
+        if ocr_result is None:
+            return ARTIFACT_EXPIRED
+        input_text = ocr_result["text"]
+    elif file:
+        ocr_result = extract_text(file)
+        input_text = ocr_result["text"]
+    else:
+        input_text = text
+    src_script = source_script or detect_script(input_text)["iso_15924"]
+
+    def lines():
+        for chunk in services.document_pipeline.iter_chunks(input_text, src_script, target_script, context):
+            yield json.dumps(chunk, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+class ExplanationRequest(BaseModel):
+    """Request model for an on-demand explanation of a previous transliteration."""
+    session_id: str  # Chat session returned by /transliterate
+    level: str = EXPLAIN_BRIEF  # "brief" or "full"
+
+
+# POST endpoint to generate (or reuse) the explanation for an earlier transliteration
+@router.post("/explain")
+async def explain_transliteration(request: ExplanationRequest, services: Services = Depends(get_services)):
+    session = services.chat.get_session(request.session_id)
+    result = session.context.get("transliteration") if session else None
+    if not result:
+        return {"error": "Session not found or has no transliteration"}
+    try:
+        explanation = await run_in_threadpool(services.transliteration.explain_result, result, request.level)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    result["explanation"] = explanation
+    result["explanation_level"] = request.level
+    return {"session_id": request.session_id, "explanation": explanation, "explanation_level": request.level}
+
+
+# LLM metrics: admission control (queue depth, wait times per lane), structured-output parse
+# outcomes, word memory size, per-backend routing stats and model tier usage
+@router.get("/llm/stats")
+def llm_stats(services: Services = Depends(get_services)):
+    return {
+        **get_scheduler().stats(),
+        "structured_output": structured_stats.snapshot(),
+        "word_memory": services.transliteration.word_memory.stats(),
+        "backends": get_router().stats() if get_router() else None,
+        "tiers": get_model_tiers().stats() if get_model_tiers() else None,
+    }
+
+
 # Optional GET endpoint for browser testing
 @router.get("/transliterate")
 def transliterate_get():
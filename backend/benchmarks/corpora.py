@@ -0,0 +1,91 @@
+"""
+Synthetic multi-script corpora.
+
+Text is built from each script's alphabet with a seeded RNG, so the same seed always gives the
+same corpus on every machine. Images render corpus lines onto a noisy, unevenly lit page, which
+exercises the denoising and adaptive thresholding in OCR preprocessing.
+"""
+import io
+import random
+from typing import Dict, List, Tuple
+
+DEFAULT_SEED = 1234
+
+# Letters sampled for each script (ISO 15924 code -> alphabet)
+ALPHABETS: Dict[str, str] = {
+    "Latn": "abcdefghijklmnopqrstuvwxyz",
+    "Cyrl": "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+    "Grek": "αβγδεζηθικλμνξοπρστυφχψω",
+    "Arab": "ابتثجحخدذرزسشصضطظعغفقكلمنهوي",
+    "Hebr": "אבגדהוזחטיכלמנסעפצקרשת",
+    "Deva": "अआइईउऊएऐओऔकखगघचछजझटठडढणतथदधनपफबभमयरलवशषसह",
+    "Hani": "的一是不了人我在有他这中大来上国个到说们为子和你地出道也时年",
+    "Hang": "가나다라마바사아자차카타파하고노도로모보소오조초코토포호",
+}
+
+# Number of words per text size
+SIZES = {"word": 1, "sentence": 12, "paragraph": 120}
+
+
+def make_word(rng: random.Random, script: str) -> str:
+    alphabet = ALPHABETS[script]
+    length = rng.randint(1, 3) if script == "Hani" else rng.randint(2, 9)
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def make_text(script: str, words: int, seed: int = DEFAULT_SEED) -> str:
+    rng = random.Random(f"{seed}:{script}:{words}")
+    return " ".join(make_word(rng, script) for _ in range(words))
+
+
+def text_corpus(seed: int = DEFAULT_SEED) -> List[Tuple[str, str, str]]:
+    """(script, size, text) for every script and size, plus mixed-script sentences."""
+    corpus = [
+        (script, size, make_text(script, words, seed))
+        for script in ALPHABETS
+        for size, words in SIZES.items()
+    ]
+    rng = random.Random(f"{seed}:mixed")
+    scripts = sorted(ALPHABETS)
+    for size in ("sentence", "paragraph"):
+        mixed = " ".join(make_word(rng, rng.choice(scripts)) for _ in range(SIZES[size]))
+        # Zyyy: ISO 15924 code for text not in a single script
+        corpus.append(("Zyyy", size, mixed))
+    return corpus
+
+
+# Page sizes in pixels (width, height)
+IMAGE_SIZES = {"small": (640, 200), "page": (1240, 1754)}
+
+
+def make_image(size: str = "small", script: str = "Latn", seed: int = DEFAULT_SEED):
+    """A noisy page of corpus text as a PIL image (Pillow's bundled font; non-Latin glyphs may be boxes)."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = IMAGE_SIZES[size]
+    rng = random.Random(f"{seed}:{script}:{size}")
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+
+    # Uneven lighting: darker towards the bottom right
+    for y in range(0, height, 8):
+        shade = 255 - int(40 * y / height)
+        draw.rectangle([0, y, width, y + 8], fill=(shade, shade, shade))
+
+    font = ImageFont.load_default(size=20)
+    line_height = 28
+    for i, y in enumerate(range(16, height - line_height, line_height)):
+        draw.text((16, y), make_text(script, 8, seed + i), fill="black", font=font)
+
+    # Salt-and-pepper noise
+    pixels = image.load()
+    for _ in range(width * height // 50):
+        x, y = rng.randrange(width), rng.randrange(height)
+        pixels[x, y] = (0, 0, 0) if rng.random() < 0.5 else (255, 255, 255)
+    return image
+
+
+def image_bytes(size: str = "small", script: str = "Latn", seed: int = DEFAULT_SEED) -> bytes:
+    buffer = io.BytesIO()
+    make_image(size, script, seed).save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,93 @@
+"""
+Deterministic stand-ins for the model servers.
+
+Both fakes answer the service's prompts with output derived only from the prompt, and simulate a
+model with a fixed time to first token plus a token rate, so benchmark numbers reflect our own
+code and the configured latency rather than whatever a real model happens to do.
+"""
+import asyncio
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from transliteration.transliteration_service import LLMClient
+
+TEXT_RE = re.compile(r'Text: "(.*?)"\n', re.S)
+ITEM_RE = re.compile(r"^(\d+)\. (.*)$", re.M)
+
+
+def romanize(text: str) -> str:
+    """Stable pseudo-transliteration: ASCII passes through, other letters map onto a-z."""
+    out = []
+    for ch in text:
+        if ch.isascii() or not ch.isalpha():
+            out.append(ch)
+        else:
+            out.append(chr(ord("a") + ord(ch) % 26))
+    return "".join(out)
+
+
+def fake_response(prompt: str) -> str:
+    """The answer a well-behaved model would give to one of the service's prompts."""
+    if "Items:\n" in prompt:
+        items = prompt.split("Items:\n", 1)[1].split("\nReply with", 1)[0]
+        return "\n".join(f"{n}. {romanize(text)}" for n, text in ITEM_RE.findall(items))
+    match = TEXT_RE.search(prompt)
+    if match is None:
+        # Explanation prompts and chat turns
+        if '"explanation"' in prompt:
+            return '{"explanation": "Each letter maps to its closest Latin equivalent."}'
+        return "Sure, here is a short deterministic reply for benchmarking purposes."
+    value = romanize(match.group(1))
+    if '"explanation"' in prompt:
+        return '{"transliteration": "%s", "explanation": "Letter by letter."}' % value
+    if '"transliteration"' in prompt:
+        return '{"transliteration": "%s"}' % value
+    return f"{value}|Letter by letter."
+
+
+class FakeLLMClient(LLMClient):
+    """Synchronous fake: sleeps `ttft + tokens / tokens_per_second`, then answers."""
+
+    def __init__(self, ttft: float = 0.0, tokens_per_second: float = 0.0, model: str = "fake"):
+        self.model = model
+        self.ttft = ttft
+        # 0 = infinitely fast decoding
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+
+    def _delay(self, response: str) -> float:
+        decode = len(response.split()) / self.tokens_per_second if self.tokens_per_second else 0.0
+        return self.ttft + decode
+
+    def generate(self, prompt: str) -> str:
+        self.calls += 1
+        response = fake_response(prompt)
+        delay = self._delay(response)
+        if delay:
+            time.sleep(delay)
+        return response
+
+
+class FakeStreamingClient:
+    """Async streaming fake with the same timing model, one word per chunk."""
+
+    def __init__(self, ttft: float = 0.0, tokens_per_second: float = 0.0, model: str = "fake"):
+        self.model = model
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+
+    async def stream_generate(self, prompt: str) -> AsyncIterator[str]:
+        self.calls += 1
+        words = fake_response(prompt).split()
+        if self.ttft:
+            await asyncio.sleep(self.ttft)
+        for i, word in enumerate(words):
+            if i and self.tokens_per_second:
+                await asyncio.sleep(1.0 / self.tokens_per_second)
+            yield word if i == 0 else " " + word
+
+    async def stream_chat(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        async for chunk in self.stream_generate(messages[-1]["content"] if messages else ""):
+            yield chunk
@@ -0,0 +1,516 @@
+"""
+Load-testing harness for the HTTP and WebSocket endpoints.
+
+Run from `backend/`:
+
+    python -m benchmarks.load --users 1,4,16 --duration 20 --slo-p99-ms 500
+    python -m benchmarks.load --rate 5,10,20 --mix text=5,detect=3,chat=2 --llm-ttft 0.3 --llm-tps 40
+    python -m benchmarks.load --transport socket --users 8     # uvicorn on a local port, one worker
+
+Each step of `--users` (closed loop: N virtual users issuing requests back to back, with optional
+think time) or `--rate` (open loop: Poisson arrivals at N requests/s, whatever the latency) runs
+for `--duration` seconds. Every step reports throughput, p50/p95/p99 latency, chat time to first
+chunk and error rate per scenario. With an SLO set, the report names the highest step that met it.
+
+The app runs with the fake LLM from `benchmarks.fakes` (and no word memory, so repeated inputs
+keep hitting the model), injected through FastAPI's dependency overrides. In-process runs share
+one event loop between load generator and app; `--transport socket` serves the app with uvicorn
+in a background thread instead, which is closer to one production worker. `--url` targets an
+already running server (with whatever LLM it has).
+
+Scenarios: `text` (POST /transliterate), `detect` (POST /detect-language), `upload` (image upload
+to /detect-language, i.e. OCR; needs tesseract) and `chat` (/ws/chat session with one turn).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import corpora
+from benchmarks.fakes import FakeLLMClient, FakeStreamingClient
+
+DEFAULT_MIX = "text=5,detect=3,chat=2"
+# Default SLO: at most 1% failed requests per scenario
+DEFAULT_SLO_ERROR_RATE = 0.01
+
+
+class Sample:
+    __slots__ = ("scenario", "started", "latency", "ttfc", "status", "error")
+
+    def __init__(self, scenario: str, started: float):
+        self.scenario = scenario
+        self.started = started
+        self.latency: Optional[float] = None
+        # Chat only: time from sending the message to the first streamed chunk
+        self.ttfc: Optional[float] = None
+        self.status: Optional[int] = None
+        self.error: Optional[str] = None
+
+
+# --- Targets ------------------------------------------------------------------------------------
+
+class _ASGIWebSocket:
+    """Minimal in-process WebSocket client speaking ASGI directly to the app."""
+
+    def __init__(self, app, path: str):
+        self.app = app
+        self.path = path
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    async def __aenter__(self):
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws",
+            "path": self.path, "raw_path": self.path.encode(), "root_path": "", "query_string": b"",
+            "headers": [(b"host", b"loadtest")], "client": ("127.0.0.1", 0), "server": ("loadtest", 80),
+            "subprotocols": [],
+        }
+        self._task = asyncio.create_task(self.app(scope, self._to_app.get, self._from_app.put))
+        await self._to_app.put({"type": "websocket.connect"})
+        message = await self._from_app.get()
+        if message["type"] != "websocket.accept":
+            raise ConnectionError(f"WebSocket rejected: {message}")
+        return self
+
+    async def send_json(self, data: dict):
+        await self._to_app.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_json(self) -> dict:
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            raise ConnectionError(f"WebSocket closed ({message.get('code')})")
+        return json.loads(message.get("text") or message["bytes"])
+
+    async def __aexit__(self, *exc):
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self._task, 5)
+        except Exception:
+            self._task.cancel()
+
+
+class _SocketWebSocket:
+    def __init__(self, url: str):
+        self.url = url
+        self._conn = None
+
+    async def __aenter__(self):
+        import websockets
+        self._conn = await websockets.connect(self.url)
+        return self
+
+    async def send_json(self, data: dict):
+        await self._conn.send(json.dumps(data))
+
+    async def receive_json(self) -> dict:
+        return json.loads(await self._conn.recv())
+
+    async def __aexit__(self, *exc):
+        await self._conn.close()
+
+
+class Target:
+    """HTTP client plus a WebSocket factory for either the in-process app or a server URL."""
+
+    def __init__(self, app=None, base_url: Optional[str] = None, timeout: float = 60.0):
+        import httpx
+        self.app = app
+        self.base_url = base_url
+        # Open-loop steps can hold many requests in flight at once
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+        if app is not None:
+            self.http = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout
+            )
+        else:
+            self.http = httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits)
+
+    def websocket(self, path: str):
+        if self.app is not None:
+            return _ASGIWebSocket(self.app, path)
+        return _SocketWebSocket(self.base_url.replace("http", "ws", 1) + path)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+def build_app(llm_ttft: float = 0.0, llm_tps: float = 0.0, llm_concurrency: Optional[int] = None,
+              data_dir: Optional[str] = None):
+    """The FastAPI app with fresh services whose LLM calls go to the fakes.
+
+    Word memory and the job store live in `data_dir` (a new temporary directory by default), never
+    in backend/data. The dependency override and `llm_concurrency` change process-wide state that
+    callers sharing the process (tests) must restore.
+    """
+    from main import app
+    from api.dependencies import Services, get_services
+    from llm.scheduler import get_scheduler
+
+    services = Services(data_dir or tempfile.mkdtemp(prefix="loadtest-"))
+    services.transliteration.llm = FakeLLMClient(llm_ttft, llm_tps)
+    services.transliteration.tiers = None
+    services.transliteration.word_memory = None
+    services.chat.streaming_llm = FakeStreamingClient(llm_ttft, llm_tps)
+    app.dependency_overrides[get_services] = lambda: services
+    if llm_concurrency:
+        get_scheduler().max_concurrency = llm_concurrency
+    return app
+
+
+def serve_on_local_socket(app):
+    """Serve `app` with uvicorn on a free local port in a background thread; returns (url, stop)."""
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="loadtest-server", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(10)
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+# --- Scenarios ----------------------------------------------------------------------------------
+
+def _is_error(status: int, body) -> bool:
+    # Routes report bad input as 200 {"error": ...}
+    return status >= 400 or (isinstance(body, dict) and "error" in body)
+
+
+async def _post(target: Target, sample: Sample, path: str, **kwargs):
+    response = await target.http.post(path, **kwargs)
+    sample.status = response.status_code
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if _is_error(response.status_code, body):
+        message = body.get("error") if isinstance(body, dict) else None
+        sample.error = str(message) if message else f"HTTP {response.status_code}"
+
+
+class Workload:
+    """Inputs shared by all virtual users (built once so generating load stays cheap)."""
+
+    def __init__(self, seed: int = corpora.DEFAULT_SEED):
+        self.texts = [text for _, size, text in corpora.text_corpus(seed) if size != "paragraph"]
+        self._image = None
+        self._seed = seed
+
+    @property
+    def image(self) -> bytes:
+        if self._image is None:
+            self._image = corpora.image_bytes("small", seed=self._seed)
+        return self._image
+
+
+async def scenario_text(target: Target, workload: Workload, rng: random.Random, sample: Sample):
+    data = {"text": rng.choice(workload.texts), "target_script": "Latn"}
+    await _post(target, sample, "/transliterate", data=data)
+
+
+async def scenario_detect(target: Target, workload: Workload, rng: random.Random, sample: Sample):
+    await _post(target, sample, "/detect-language", data={"text": rng.choice(workload.texts)})
+
+
+async def scenario_upload(target: Target, workload: Workload, rng: random.Random, sample: Sample):
+    files = {"file": ("page.png", workload.image, "image/png")}
+    await _post(target, sample, "/detect-language", files=files)
+
+
+async def scenario_chat(target: Target, workload: Workload, rng: random.Random, sample: Sample):
+    async with target.websocket("/ws/chat") as ws:
+        await ws.send_json({"type": "init"})
+        session_id = (await ws.receive_json())["session_id"]
+        sent = time.perf_counter()
+        await ws.send_json({"type": "user", "session_id": session_id, "text": "Tell me about " + rng.choice(workload.texts)})
+        while True:
+            message = await ws.receive_json()
+            if message.get("type") == "error":
+                sample.error = message.get("message") or "chat error"
+                return
+            if message.get("partial"):
+                if sample.ttfc is None:
+                    sample.ttfc = time.perf_counter() - sent
+                continue
+            return
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "text": scenario_text,
+    "detect": scenario_detect,
+    "upload": scenario_upload,
+    "chat": scenario_chat,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """"text=5,chat=2" -> {"text": 5.0, "chat": 2.0}."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name}. Use one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def _execute(target: Target, workload: Workload, scenario: str, rng: random.Random) -> Sample:
+    sample = Sample(scenario, time.perf_counter())
+    try:
+        await SCENARIOS[scenario](target, workload, rng, sample)
+    except Exception as e:
+        sample.error = f"{type(e).__name__}: {e}"
+    sample.latency = time.perf_counter() - sample.started
+    return sample
+
+
+# --- Arrival models -----------------------------------------------------------------------------
+
+async def closed_loop(target: Target, workload: Workload, mix: Dict[str, float], users: int,
+                      duration: float, think: float = 0.0, seed: int = 0) -> List[Sample]:
+    """`users` virtual users, each starting its next request when the previous one finished."""
+    samples: List[Sample] = []
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    async def user(index: int):
+        rng = random.Random(f"{seed}:{index}")
+        while time.perf_counter() < deadline:
+            samples.append(await _execute(target, workload, rng.choices(names, weights)[0], rng))
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+
+    await asyncio.gather(*(user(i) for i in range(users)))
+    return samples
+
+
+async def open_loop(target: Target, workload: Workload, mix: Dict[str, float], rate: float,
+                    duration: float, max_in_flight: int = 1000, seed: int = 0) -> List[Sample]:
+    """Poisson arrivals at `rate` per second, independent of how fast the server answers."""
+    samples: List[Sample] = []
+    names, weights = list(mix), list(mix.values())
+    rng = random.Random(seed)
+    tasks = set()
+    started = time.perf_counter()
+    next_arrival = started
+
+    while next_arrival < started + duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_in_flight:
+            # The generator itself would become the bottleneck; count the arrival as shed
+            sample = Sample("dropped", time.perf_counter())
+            sample.latency, sample.error = 0.0, "client in-flight limit reached"
+            samples.append(sample)
+        else:
+            task = asyncio.create_task(_execute(target, workload, rng.choices(names, weights)[0],
+                                                random.Random(rng.random())))
+            task.add_done_callback(lambda t: (tasks.discard(t), samples.append(t.result())))
+            tasks.add(task)
+        next_arrival += rng.expovariate(rate)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return samples
+
+
+# --- Reports ------------------------------------------------------------------------------------
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def _ms(values: List[float]) -> dict:
+    if not values:
+        return {}
+    return {
+        "p50": round(percentile(values, 50) * 1000, 1),
+        "p95": round(percentile(values, 95) * 1000, 1),
+        "p99": round(percentile(values, 99) * 1000, 1),
+        "max": round(max(values) * 1000, 1),
+    }
+
+
+def _stats(samples: List[Sample], elapsed: float) -> dict:
+    ok = [s for s in samples if s.error is None]
+    stats = {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        # Latency of successful requests; failures are counted, not timed
+        "latency_ms": _ms([s.latency for s in ok]),
+    }
+    ttfc = [s.ttfc for s in ok if s.ttfc is not None]
+    if ttfc:
+        stats["ttfc_ms"] = _ms(ttfc)
+    return stats
+
+
+def summarize(samples: List[Sample], elapsed: float) -> dict:
+    errors: Dict[str, int] = {}
+    for s in samples:
+        if s.error is not None:
+            errors[s.error[:120]] = errors.get(s.error[:120], 0) + 1
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "overall": _stats(samples, elapsed),
+        "scenarios": {
+            name: _stats([s for s in samples if s.scenario == name], elapsed)
+            for name in sorted({s.scenario for s in samples})
+        },
+        "top_errors": dict(sorted(errors.items(), key=lambda kv: -kv[1])[:5]),
+    }
+
+
+def meets_slo(report: dict, p99_ms: Optional[float], error_rate: float) -> bool:
+    """Every scenario within the p99 bound (chat judged on time to first chunk) and error rate."""
+    for name, stats in report["scenarios"].items():
+        if stats["error_rate"] > error_rate:
+            return False
+        if p99_ms is None:
+            continue
+        latency = stats.get("ttfc_ms") or stats["latency_ms"]
+        if latency and latency["p99"] > p99_ms:
+            return False
+    return True
+
+
+async def run_step(target: Target, workload: Workload, mix: Dict[str, float], *, users: Optional[int] = None,
+                   rate: Optional[float] = None, duration: float = 10.0, think: float = 0.0, seed: int = 0) -> dict:
+    started = time.perf_counter()
+    if rate is not None:
+        samples = await open_loop(target, workload, mix, rate, duration, seed=seed)
+    else:
+        samples = await closed_loop(target, workload, mix, users or 1, duration, think, seed=seed)
+    report = summarize(samples, time.perf_counter() - started)
+    report["load"] = {"rate_rps": rate} if rate is not None else {"users": users}
+    return report
+
+
+def _print_step(report: dict, slo_met: Optional[bool]):
+    load = ", ".join(f"{k}={v}" for k, v in report["load"].items())
+    verdict = "" if slo_met is None else ("  SLO met" if slo_met else "  SLO BROKEN")
+    print(f"\n[{load}] {report['overall']['requests']} requests in {report['elapsed_s']} s{verdict}")
+    for name, stats in report["scenarios"].items():
+        latency = stats["latency_ms"] or {}
+        line = (f"  {name:8} {stats['throughput_rps']:>8.1f} req/s  p50 {latency.get('p50', '-'):>8}  "
+                f"p95 {latency.get('p95', '-'):>8}  p99 {latency.get('p99', '-'):>8} ms  "
+                f"errors {stats['error_rate']:.1%}")
+        if "ttfc_ms" in stats:
+            line += f"  ttfc p50/p99 {stats['ttfc_ms']['p50']}/{stats['ttfc_ms']['p99']} ms"
+        print(line)
+    for error, count in report["top_errors"].items():
+        print(f"  ! {count}x {error}")
+
+
+async def run(options: argparse.Namespace) -> dict:
+    mix = parse_mix(options.mix)
+    stop = None
+    if options.url:
+        target = Target(base_url=options.url.rstrip("/"))
+    else:
+        app = build_app(options.llm_ttft, options.llm_tps, options.llm_concurrency)
+        if options.transport == "socket":
+            url, stop = serve_on_local_socket(app)
+            target = Target(base_url=url)
+        else:
+            target = Target(app=app)
+
+    workload = Workload(options.seed)
+    steps = [("rate", float(r)) for r in options.rate.split(",")] if options.rate else \
+            [("users", int(u)) for u in options.users.split(",")]
+    reports = []
+    capacity, broken = None, False
+    try:
+        for kind, value in steps:
+            report = await run_step(target, workload, mix, duration=options.duration, think=options.think,
+                                    seed=options.seed, **{kind: value})
+            slo_met = meets_slo(report, options.slo_p99_ms, options.slo_error_rate)
+            report["slo_met"] = slo_met
+            reports.append(report)
+            _print_step(report, slo_met if options.slo_p99_ms is not None else None)
+            if slo_met and not broken:
+                capacity = report["load"]
+            broken = broken or not slo_met
+    finally:
+        await target.aclose()
+        if stop is not None:
+            stop()
+
+    result = {
+        "config": {k: v for k, v in vars(options).items() if k != "output"},
+        "steps": reports,
+        "slo": {"p99_ms": options.slo_p99_ms, "error_rate": options.slo_error_rate},
+        # Highest load level reached before the SLO first broke
+        "capacity": capacity,
+    }
+    if options.slo_p99_ms is not None:
+        print(f"\nCapacity within SLO: {capacity or 'none (first step already broke it)'}")
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test the API with a fake LLM.")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--users", default="1,4,16", help="Closed loop: comma-separated virtual user counts")
+    load.add_argument("--rate", help="Open loop: comma-separated arrival rates (requests/s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per step")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean think time between a user's requests (s)")
+    parser.add_argument("--mix", default=None, help=f"Scenario weights (default {DEFAULT_MIX}, plus upload=1 "
+                                                     "when tesseract is installed)")
+    parser.add_argument("--transport", choices=("inprocess", "socket"), default="inprocess")
+    parser.add_argument("--url", help="Load an already running server instead (its own LLM)")
+    parser.add_argument("--llm-ttft", type=float, default=0.2, help="Fake LLM time to first token (s)")
+    parser.add_argument("--llm-tps", type=float, default=50.0, help="Fake LLM tokens per second")
+    parser.add_argument("--llm-concurrency", type=int, help="Override the scheduler's LLM slot count")
+    parser.add_argument("--slo-p99-ms", type=float, help="p99 latency bound (chat: time to first chunk)")
+    parser.add_argument("--slo-error-rate", type=float, default=DEFAULT_SLO_ERROR_RATE)
+    parser.add_argument("--seed", type=int, default=corpora.DEFAULT_SEED)
+    parser.add_argument("--output", help="Write the full report as JSON")
+    options = parser.parse_args(argv)
+    if options.mix is None:
+        options.mix = DEFAULT_MIX + (",upload=1" if shutil.which("tesseract") else "")
+    return options
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    result = asyncio.run(run(options))
+    if options.output:
+        directory = os.path.dirname(options.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(options.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Report written to {options.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Benchmark runner.
+
+Run from `backend/`:
+
+    python -m benchmarks.run                                  # all benchmarks -> benchmarks/results/latest.json
+    python -m benchmarks.run -k detect_script -k parse        # only matching names
+    python -m benchmarks.run --output after.json --baseline before.json --fail-on-regression
+
+Every benchmark runs a warm-up call, then `--rounds` timed rounds of an automatically chosen
+number of calls; the median time per call is what baselines are compared on. Corpora come from
+`benchmarks.corpora` (seeded) and LLM calls go to `benchmarks.fakes`, whose latency is set with
+`--llm-ttft` / `--llm-tps` (both 0 by default, so end-to-end numbers are pure overhead).
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks import corpora
+from benchmarks.fakes import FakeLLMClient, FakeStreamingClient, fake_response
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# name -> setup(options) returning (operation, items handled per call)
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Tuple[Callable[[], object], int]]] = {}
+
+
+class Skip(Exception):
+    """Raised by a setup function when the benchmark cannot run here (e.g. no tesseract)."""
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _texts(options, size: str) -> List[Tuple[str, str]]:
+    return [(script, text) for script, s, text in corpora.text_corpus(options.seed) if s == size]
+
+
+# --- OCR --------------------------------------------------------------------------------------
+
+def _detect_script_setup(size: str):
+    def setup(options):
+        from ocr.language_detection import detect_script
+        texts = [text for _, text in _texts(options, size)]
+        return (lambda: [detect_script(t) for t in texts]), len(texts)
+    return setup
+
+
+for _size in ("word", "sentence", "paragraph"):
+    benchmark(f"detect_script.{_size}")(_detect_script_setup(_size))
+
+
+def _preprocess_setup(size: str):
+    def setup(options):
+        from ocr.preprocessing import preprocess_image
+        image = corpora.make_image(size, seed=options.seed)
+        return (lambda: preprocess_image(image)), 1
+    return setup
+
+
+for _size in corpora.IMAGE_SIZES:
+    benchmark(f"preprocess_image.{_size}")(_preprocess_setup(_size))
+
+
+@benchmark("extract_text.small")
+def _extract_text(options):
+    import shutil
+    if not shutil.which("tesseract"):
+        raise Skip("tesseract not installed")
+    from ocr.ocr import extract_text_from_bytes
+    contents = corpora.image_bytes("small", seed=options.seed)
+    return (lambda: extract_text_from_bytes(contents)), 1
+
+
+# --- Prompts and parsing ------------------------------------------------------------------------
+
+def _service(options, llm=None):
+    from llm.scheduler import LLMScheduler
+    from transliteration.transliteration_service import TransliterationService
+    llm = llm or FakeLLMClient(options.llm_ttft, options.llm_tps)
+    return TransliterationService(llm_client=llm, scheduler=LLMScheduler(max_concurrency=4))
+
+
+@benchmark("prompt.transliterate")
+def _prompt_transliterate(options):
+    service = _service(options)
+    texts = _texts(options, "sentence")
+    return (lambda: [service._build_prompt(t, s, "Latn", "a place name", "brief") for s, t in texts]), len(texts)
+
+
+@benchmark("prompt.batch")
+def _prompt_batch(options):
+    service = _service(options)
+    items = [t for _, t in _texts(options, "sentence")][:16]
+    return (lambda: service._build_batch_prompt(items, "Cyrl", "Latn")), 1
+
+
+def _responses(options) -> List[str]:
+    service = _service(options)
+    return [fake_response(service._build_prompt(t, s, "Latn", explain="brief")) for s, t in _texts(options, "sentence")]
+
+
+@benchmark("parse.structured")
+def _parse_structured(options):
+    from llm.structured_output import parse_structured
+    responses = _responses(options)
+    fields = ("transliteration", "explanation")
+    return (lambda: [parse_structured(r, fields) for r in responses]), len(responses)
+
+
+@benchmark("parse.repaired")
+def _parse_repaired(options):
+    from llm.structured_output import parse_structured
+    # Typical model slips: chatter around the object and a missing closing brace
+    responses = ["Sure! " + r.rstrip("}") for r in _responses(options)]
+    fields = ("transliteration", "explanation")
+    return (lambda: [parse_structured(r, fields) for r in responses]), len(responses)
+
+
+@benchmark("parse.batch")
+def _parse_batch(options):
+    service = _service(options)
+    items = [t for _, t in _texts(options, "sentence")][:16]
+    response = fake_response(service._build_batch_prompt(items, "Cyrl", "Latn"))
+    return (lambda: service._parse_batch_response(response, len(items))), 1
+
+
+# --- End to end (fake LLM) ----------------------------------------------------------------------
+
+@benchmark("service.transliterate")
+def _service_transliterate(options):
+    service = _service(options)
+    texts = _texts(options, "sentence")
+    return (lambda: [service.transliterate(t, s, "Latn", explain="none") for s, t in texts]), len(texts)
+
+
+@benchmark("chat.reply")
+def _chat_reply(options):
+    from api.chat import ChatService
+    chat = ChatService(streaming_llm=FakeStreamingClient(options.llm_ttft, options.llm_tps))
+    session_id = chat.create_session()
+
+    async def reply():
+        return [chunk async for chunk in chat.generate_reply(session_id, "Tell me more about this word")]
+
+    return (lambda: asyncio.run(reply())), 1
+
+
+# --- Runner -------------------------------------------------------------------------------------
+
+def measure(operation: Callable[[], object], rounds: int = 5, min_time: float = 0.2) -> dict:
+    """Time `operation`: one warm-up call, then `rounds` rounds sharing `min_time` seconds."""
+    operation()
+    number = 1
+    per_round = min_time / rounds
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= per_round or number >= 1_000_000:
+            break
+        # Aim a little past the target so calibration rarely needs another pass
+        number = max(number * 2, int(number * per_round * 1.2 / max(elapsed, 1e-9)))
+
+    samples = [elapsed / number]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "rounds": rounds,
+        "number": number,
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 3),
+        "min_us": round(min(samples) * 1e6, 3),
+        "stdev_us": round(statistics.stdev(samples) * 1e6, 3) if rounds > 1 else 0.0,
+    }
+
+
+def run(options: argparse.Namespace, log=print) -> dict:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if options.k and not any(pattern in name for pattern in options.k):
+            continue
+        try:
+            operation, items = setup(options)
+        except Skip as e:
+            results[name] = {"skipped": str(e)}
+            log(f"{name:32} skipped: {e}")
+            continue
+        stats = measure(operation, options.rounds, options.min_time)
+        stats["items"] = items
+        results[name] = stats
+        log(f"{name:32} {stats['median_us']:>12.1f} us/call  ({items} items, ±{stats['stdev_us']:.1f})")
+    return {"meta": _meta(options), "benchmarks": results}
+
+
+def _meta(options: argparse.Namespace) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": options.seed,
+        "llm_ttft": options.llm_ttft,
+        "llm_tps": options.llm_tps,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.10) -> List[dict]:
+    """Per-benchmark median change against `baseline`; beyond ±threshold counts as a change."""
+    rows = []
+    for name, stats in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or "median_us" not in base or "median_us" not in stats:
+            continue
+        ratio = stats["median_us"] / base["median_us"] if base["median_us"] else 1.0
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        rows.append({
+            "name": name,
+            "baseline_us": base["median_us"],
+            "current_us": stats["median_us"],
+            "change": round(ratio - 1, 4),
+            "status": status,
+        })
+    return rows
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the backend micro-benchmarks.")
+    parser.add_argument("-k", action="append", help="Only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds spent timing each benchmark")
+    parser.add_argument("--seed", type=int, default=corpora.DEFAULT_SEED)
+    parser.add_argument("--llm-ttft", type=float, default=0.0, help="Fake LLM time to first token (s)")
+    parser.add_argument("--llm-tps", type=float, default=0.0, help="Fake LLM tokens per second (0 = instant)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = run(options)
+
+    directory = os.path.dirname(options.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(options.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {options.output}")
+
+    if not options.baseline:
+        return 0
+    with open(options.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, options.threshold)
+    print(f"\nCompared with {options.baseline} (commit {baseline.get('meta', {}).get('commit')}):")
+    for row in rows:
+        print(f"{row['name']:32} {row['baseline_us']:>12.1f} -> {row['current_us']:>12.1f} us  "
+              f"{row['change']:+7.1%}  {row['status']}")
+    regressions = [row for row in rows if row["status"] == "regression"]
+    return 1 if regressions and options.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""
+Persistent background job queue.
+
+Jobs (OCR, transliteration, translation, batch) are stored in SQLite together with one result row
+per finished item, so clients can poll progress and partial results, and jobs interrupted by a
+restart resume from the first unfinished item. Work runs on an in-process pool of worker threads.
+A job whose LLM calls are shed by the scheduler (`LLMOverloadedError`) is not failed: it goes back
+to the queue after a backoff and resumes from its first unfinished item.
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from llm.scheduler import LLMOverloadedError
+
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / "data" / "jobs"
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    total INTEGER,
+    completed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+) WITHOUT ROWID;
+"""
+
+
+class JobHandler(ABC):
+    """Work definition for one job kind.
+
+    `count` returns how many items a job has; `run` processes the given item indices (in order)
+    and yields (index, result) as each one finishes.
+    """
+
+    @abstractmethod
+    def count(self, params: dict, job_dir: Path) -> int:
+        pass
+
+    @abstractmethod
+    def run(self, params: dict, job_dir: Path, indices: List[int]) -> Iterator[Tuple[int, dict]]:
+        pass
+
+
+class JobStore:
+    """SQLite persistence for jobs and their per-item results."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = str(path or DEFAULT_DIR / "jobs.sqlite3")
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def _execute(self, sql: str, args: Iterable = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            rows = self._conn.execute(sql, tuple(args)).fetchall()
+            self._conn.commit()
+            return rows
+
+    def create(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(params, ensure_ascii=False), now, now),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def transition(self, job_id: str, status: str, from_statuses: Tuple[str, ...], **fields) -> bool:
+        """Set `status` (and `fields`) only if the job is currently in one of `from_statuses`."""
+        fields["status"] = status
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        placeholders = ", ".join("?" for _ in from_statuses)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND status IN ({placeholders})",
+                (*fields.values(), job_id, *from_statuses),
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def add_result(self, job_id: str, idx: int, result: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, idx, result) VALUES (?, ?, ?)",
+                (job_id, idx, json.dumps(result, ensure_ascii=False)),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET completed = (SELECT COUNT(*) FROM job_results WHERE job_id = ?), updated_at = ? WHERE id = ?",
+                (job_id, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def results(self, job_id: str, after: int = -1) -> List[Tuple[int, dict]]:
+        rows = self._execute(
+            "SELECT idx, result FROM job_results WHERE job_id = ? AND idx > ? ORDER BY idx", (job_id, after)
+        )
+        return [(row["idx"], json.loads(row["result"])) for row in rows]
+
+    def done_indices(self, job_id: str) -> set:
+        return {row["idx"] for row in self._execute("SELECT idx FROM job_results WHERE job_id = ?", (job_id,))}
+
+    def unfinished(self) -> List[str]:
+        rows = self._execute(
+            "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+        )
+        return [row["id"] for row in rows]
+
+
+class JobQueue:
+    """Worker pool that runs stored jobs with their registered handlers."""
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler], workers: int = 2,
+                 jobs_dir: Optional[Path] = None, retry_backoff: float = 10.0, max_retries: int = 5):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.jobs_dir = Path(jobs_dir or DEFAULT_DIR)
+        # Overloaded jobs wait max(retry_after, retry_backoff * 2**n) before their n-th requeue
+        self.retry_backoff = retry_backoff
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._cancelled = set()
+        self._retries: Dict[str, int] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._threads: List[threading.Thread] = []
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.jobs_dir / job_id
+
+    def start(self):
+        """Start the workers and re-enqueue jobs left queued or running by a previous process."""
+        if self._threads:
+            return
+        for job_id in self.store.unfinished():
+            self.store.update(job_id, status=QUEUED)
+            self._queue.put(job_id)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        # Jobs waiting out a backoff stay queued in the store and resume on the next start
+        for timer in list(self._timers.values()):
+            timer.cancel()
+        self._timers.clear()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, kind: str, params: dict, files: Optional[Dict[str, bytes]] = None) -> str:
+        """Store a job (and any uploaded files in its directory) and enqueue it."""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}. Use one of {', '.join(sorted(self.handlers))}.")
+        job_id = self.store.create(kind, params)
+        if files:
+            job_dir = self.job_dir(job_id)
+            job_dir.mkdir(parents=True, exist_ok=True)
+            for name, data in files.items():
+                (job_dir / name).write_bytes(data)
+        self._queue.put(job_id)
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        # Workers check the flag between items; queued jobs are skipped when dequeued
+        self._cancelled.add(job_id)
+        if self.store.transition(job_id, CANCELLED, (QUEUED, RUNNING)):
+            return True
+        self._cancelled.discard(job_id)
+        return False
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            try:
+                self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if not job or job["status"] != QUEUED or job_id in self._cancelled:
+            return
+        handler = self.handlers[job["kind"]]
+        job_dir = self.job_dir(job_id)
+        # Conditional status writes: a cancel that lands at any point wins over the worker
+        if not self.store.transition(job_id, RUNNING, (QUEUED,)):
+            return
+        try:
+            total = job["total"]
+            if total is None:
+                total = handler.count(job["params"], job_dir)
+                self.store.update(job_id, total=total)
+
+            done = self.store.done_indices(job_id)
+            pending = [i for i in range(total) if i not in done]
+            for idx, result in handler.run(job["params"], job_dir, pending):
+                self.store.add_result(job_id, idx, result)
+                if job_id in self._cancelled:
+                    return
+            if job_id not in self._cancelled:
+                self.store.transition(job_id, COMPLETED, (RUNNING,), error=None)
+            self._retries.pop(job_id, None)
+        except LLMOverloadedError as e:
+            if job_id not in self._cancelled:
+                self._requeue_later(job_id, e)
+        except Exception as e:
+            self._retries.pop(job_id, None)
+            if job_id not in self._cancelled:
+                self.store.transition(job_id, FAILED, (RUNNING,), error=str(e))
+
+    def _requeue_later(self, job_id: str, error: LLMOverloadedError):
+        """Put an overloaded job back in the queue after a backoff; finished items are kept."""
+        attempt = self._retries.get(job_id, 0)
+        if attempt >= self.max_retries:
+            self._retries.pop(job_id, None)
+            self.store.transition(job_id, FAILED, (RUNNING,), error=str(error))
+            return
+        self._retries[job_id] = attempt + 1
+        delay = max(float(error.retry_after), self.retry_backoff * 2 ** attempt)
+        if not self.store.transition(job_id, QUEUED, (RUNNING,), error=f"{error}; retrying in {delay:.0f}s"):
+            return
+
+        def requeue():
+            self._timers.pop(job_id, None)
+            self._queue.put(job_id)
+
+        timer = self._timers[job_id] = threading.Timer(delay, requeue)
+        timer.daemon = True
+        timer.start()
+
+    def wait(self, job_id: str, timeout: float = 10.0, poll: float = 0.05) -> dict:
+        """Block until a job reaches a terminal status (used by tests and the CLI)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id)
+            if job["status"] in TERMINAL_STATUSES or time.monotonic() > deadline:
+                return job
+            time.sleep(poll)
@@ -0,0 +1,38 @@
+from typing import AsyncIterator, Dict, List, Optional
+
+
+class OllamaChatClient:
+    """Streams chat replies from a local Ollama server over a persistent HTTP connection.
+
+    Notes:
+    - Uses the `ollama` Python package (`ollama.AsyncClient`), whose connection pool is reused
+      across calls instead of spawning an `ollama run` process per turn.
+    - `keep_alive` keeps the model loaded between turns. Together with a byte-identical message
+      prefix (see `ChatService._build_messages_from_session`) the server can reuse the KV cache
+      from the previous turn and only process the newly appended messages.
+    """
+
+    def __init__(self, model: str = "mistral", host: Optional[str] = None, keep_alive: str = "30m"):
+        try:
+            from ollama import AsyncClient
+        except ImportError as e:
+            raise RuntimeError("The 'ollama' Python package is required for OllamaChatClient") from e
+        self.model = model
+        self.keep_alive = keep_alive
+        self.client = AsyncClient(host=host)
+
+    async def stream_chat(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        stream = await self.client.chat(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            keep_alive=self.keep_alive,
+        )
+        async for part in stream:
+            text = part["message"]["content"]
+            if text:
+                yield text
+
+    async def stream_generate(self, prompt: str) -> AsyncIterator[str]:
+        async for text in self.stream_chat([{"role": "user", "content": prompt}]):
+            yield text
@@ -0,0 +1,217 @@
+"""
+Global admission control for LLM calls.
+
+Every service that talks to the local model takes a slot from one shared `LLMScheduler` before
+generating. The scheduler caps concurrency, serves waiters from separate priority lanes
+(interactive chat > single transliteration > batch), bounds how long a request may queue, and
+sheds load with `LLMOverloadedError` (mapped to 429/503 + Retry-After by the API).
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+INTERACTIVE = "interactive"
+SINGLE = "single"
+BATCH = "batch"
+
+# Lanes in the order they are served
+PRIORITIES = (INTERACTIVE, SINGLE, BATCH)
+
+DEFAULT_QUEUE_TIMEOUTS = {INTERACTIVE: 30.0, SINGLE: 60.0, BATCH: 300.0}
+DEFAULT_MAX_QUEUE = {INTERACTIVE: 16, SINGLE: 32, BATCH: 64}
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when a request cannot be admitted to the LLM.
+
+    `status_code` is 429 when the request's lane is full and 503 when it waited past its
+    queue deadline; `retry_after` is a suggested delay in whole seconds.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ("priority", "enqueued", "granted", "notify")
+
+    def __init__(self, priority: str, notify):
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.notify = notify
+
+
+class LLMScheduler:
+    """Concurrency cap with priority lanes, usable from threads and from asyncio code."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 2,
+        max_queue: Optional[Dict[str, int]] = None,
+        queue_timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = {**DEFAULT_MAX_QUEUE, **(max_queue or {})}
+        self.queue_timeouts = {**DEFAULT_QUEUE_TIMEOUTS, **(queue_timeouts or {})}
+        self._lock = threading.Lock()
+        self._active = 0
+        self._lanes = {p: deque() for p in PRIORITIES}
+        # EWMA of how long a slot is held, used to estimate Retry-After
+        self._hold_ewma = 1.0
+        self._stats = {
+            p: {"admitted": 0, "rejected": 0, "timed_out": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for p in PRIORITIES
+        }
+
+    # ------------------------------------------------------------------ internals
+
+    def _retry_after_locked(self) -> int:
+        waiting = sum(len(lane) for lane in self._lanes.values())
+        return max(1, math.ceil(self._hold_ewma * (waiting + 1) / self.max_concurrency))
+
+    def _enqueue(self, priority: str, notify) -> _Ticket:
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown LLM priority: {priority}")
+        with self._lock:
+            lane = self._lanes[priority]
+            if len(lane) >= self.max_queue[priority]:
+                self._stats[priority]["rejected"] += 1
+                raise LLMOverloadedError(
+                    f"LLM queue for {priority} requests is full", 429, self._retry_after_locked()
+                )
+            ticket = _Ticket(priority, notify)
+            lane.append(ticket)
+            self._grant_locked()
+            return ticket
+
+    def _grant_locked(self):
+        while self._active < self.max_concurrency:
+            lane = next((self._lanes[p] for p in PRIORITIES if self._lanes[p]), None)
+            if lane is None:
+                return
+            ticket = lane.popleft()
+            ticket.granted = True
+            self._active += 1
+            wait = time.monotonic() - ticket.enqueued
+            stats = self._stats[ticket.priority]
+            stats["admitted"] += 1
+            stats["wait_total"] += wait
+            stats["wait_max"] = max(stats["wait_max"], wait)
+            ticket.notify()
+
+    def _release(self, held: float):
+        with self._lock:
+            self._active -= 1
+            self._hold_ewma = 0.8 * self._hold_ewma + 0.2 * held
+            self._grant_locked()
+
+    def _abandon(self, ticket: _Ticket) -> bool:
+        """Drop a waiting ticket. Returns True if it had already been granted (caller owns a slot)."""
+        with self._lock:
+            if ticket.granted:
+                return True
+            self._lanes[ticket.priority].remove(ticket)
+            self._stats[ticket.priority]["timed_out"] += 1
+            return False
+
+    def _timeout_error(self, priority: str) -> LLMOverloadedError:
+        with self._lock:
+            retry_after = self._retry_after_locked()
+        return LLMOverloadedError(f"Timed out waiting for the LLM ({priority})", 503, retry_after)
+
+    # ------------------------------------------------------------------ public API
+
+    @contextmanager
+    def slot(self, priority: str = SINGLE, timeout: Optional[float] = None):
+        """Blocking context manager holding one LLM slot (for synchronous callers in threads)."""
+        event = threading.Event()
+        ticket = self._enqueue(priority, event.set)
+        if not event.wait(timeout if timeout is not None else self.queue_timeouts[priority]):
+            if not self._abandon(ticket):
+                raise self._timeout_error(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def slot_async(self, priority: str = INTERACTIVE, timeout: Optional[float] = None):
+        """Async variant of `slot` that waits without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        ticket = self._enqueue(priority, notify)
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(granted), timeout if timeout is not None else self.queue_timeouts[priority]
+            )
+        except asyncio.TimeoutError:
+            if not self._abandon(ticket):
+                raise self._timeout_error(priority)
+        except asyncio.CancelledError:
+            if self._abandon(ticket):
+                self._release(0.0)
+            raise
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def try_acquire(self) -> bool:
+        """Take a slot without waiting, only if one is free and nobody is queued.
+
+        For speculative extra calls (e.g. a hedged request): they may use idle capacity but
+        never delay queued requests. A True result must be paired with `release`.
+        """
+        with self._lock:
+            if self._active >= self.max_concurrency or any(self._lanes.values()):
+                return False
+            self._active += 1
+            return True
+
+    def release(self, held: float = 0.0):
+        """Return a slot taken with `try_acquire` after holding it for `held` seconds."""
+        self._release(held)
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth, active slots and wait times per lane."""
+        with self._lock:
+            lanes = {}
+            for p in PRIORITIES:
+                s = self._stats[p]
+                lanes[p] = {
+                    "queue_depth": len(self._lanes[p]),
+                    "admitted": s["admitted"],
+                    "rejected": s["rejected"],
+                    "timed_out": s["timed_out"],
+                    "avg_wait_ms": round(1000 * s["wait_total"] / s["admitted"], 1) if s["admitted"] else 0.0,
+                    "max_wait_ms": round(1000 * s["wait_max"], 1),
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "lanes": lanes,
+            }
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Process-wide scheduler shared by all LLM-backed services."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
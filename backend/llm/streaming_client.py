@@ -31,7 +31,9 @@ class StreamingLLMClient:
         for i, w in enumerate(words, start=1):
             chunk.append(w)
             if i % self.chunk_words == 0 or i == len(words):
-                yield " ".join(chunk)
+                # Chunks after the first carry their leading space, like a model's token stream,
+                # so clients can append them verbatim
+                yield (" " if i > self.chunk_words else "") + " ".join(chunk)
                 chunk = []
                 # small sleep to simulate streaming
                 await asyncio.sleep(self.delay)
@@ -0,0 +1,219 @@
+"""
+Structured (JSON) LLM output parsing.
+
+Services ask the model for a JSON object (with constrained JSON generation where the client
+supports it) and parse it here instead of splitting on "|". `IncrementalJSONParser` extracts
+top-level string fields as soon as they are complete, so callers can use them while streaming.
+Malformed output gets one local repair pass and at most one targeted repair prompt; parse
+outcomes are counted in `structured_stats`.
+"""
+import json
+import re
+import threading
+from typing import Callable, Dict, Optional, Sequence
+
+
+class StructuredOutputError(RuntimeError):
+    """The model's reply held no parseable object, even after repair.
+
+    `output` is the raw reply, for logs; it must not be shown as a result.
+    """
+
+    def __init__(self, message: str, output: str):
+        super().__init__(message)
+        self.output = output
+
+
+def object_schema(fields: Sequence[str]) -> dict:
+    """JSON schema for an object whose fields are all required strings."""
+    return {
+        "type": "object",
+        "properties": {name: {"type": "string"} for name in fields},
+        "required": list(fields),
+    }
+
+
+class IncrementalJSONParser:
+    """Streams a JSON object and emits its top-level string fields as they complete.
+
+    Anything before the first "{" (e.g. a chatty preamble) is skipped. Nested values are
+    tracked for depth but not emitted.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self.done = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf = []
+        self._key: Optional[str] = None
+        self._expect_value = False
+
+    def feed(self, chunk: str) -> Dict[str, str]:
+        """Consume a chunk; return the fields completed by it."""
+        completed: Dict[str, str] = {}
+        for ch in chunk:
+            if self.done:
+                break
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._end_string(completed)
+                    continue
+                self._buf.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._buf = []
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.done = True
+            elif ch == ":" and self._depth == 1:
+                self._expect_value = True
+            elif ch == "," and self._depth == 1:
+                self._key, self._expect_value = None, False
+        return completed
+
+    def _end_string(self, completed: Dict[str, str]):
+        if self._depth != 1:
+            return
+        try:
+            value = json.loads('"' + "".join(self._buf) + '"')
+        except ValueError:
+            value = "".join(self._buf)
+        if self._expect_value and self._key is not None:
+            self.fields[self._key] = value
+            completed[self._key] = value
+            self._key, self._expect_value = None, False
+        else:
+            self._key = value
+
+
+class StructuredOutputStats:
+    """Thread-safe counters of parse outcomes."""
+
+    OUTCOMES = ("parsed", "repaired_locally", "repaired_by_llm", "legacy", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {name: 0 for name in self.OUTCOMES}
+
+    def record(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        counts["total"] = total
+        counts["failure_rate"] = round(counts["failed"] / total, 4) if total else 0.0
+        counts["first_try_rate"] = round(counts["parsed"] / total, 4) if total else 0.0
+        return counts
+
+
+structured_stats = StructuredOutputStats()
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.MULTILINE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def _extract_fields(text: str, fields: Sequence[str]) -> Optional[Dict[str, str]]:
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    if parser.done and all(name in parser.fields for name in fields):
+        return {name: parser.fields[name] for name in fields}
+    return None
+
+
+def repair_json(text: str, fields: Sequence[str]) -> Optional[Dict[str, str]]:
+    """Local, deterministic repairs: code fences, trailing commas, unterminated string/object."""
+    candidate = _FENCE_RE.sub("", text.strip())
+    start = candidate.find("{")
+    if start < 0:
+        return None
+    candidate = _TRAILING_COMMA_RE.sub(r"\1", candidate[start:])
+
+    parser = IncrementalJSONParser()
+    parser.feed(candidate)
+    if not parser.done:
+        # Close whatever was left open by a truncated generation
+        if parser._in_string:
+            candidate += '"'
+        candidate += "}" * max(parser._depth, 1)
+    try:
+        data = json.loads(candidate[: candidate.rfind("}") + 1])
+    except ValueError:
+        return _extract_fields(candidate, fields)
+    if isinstance(data, dict) and all(isinstance(data.get(name), str) for name in fields):
+        return {name: data[name] for name in fields}
+    return None
+
+
+def build_repair_prompt(bad_output: str, fields: Sequence[str]) -> str:
+    keys = ", ".join(f'"{name}"' for name in fields)
+    return f"""The following output was supposed to be a single JSON object with the string keys {keys}, but it could not be parsed:
+{bad_output}
+
+Return only the corrected JSON object.
+
+Answer:"""
+
+
+def parse_structured(
+    response: str,
+    fields: Sequence[str],
+    repair: Optional[Callable[[str], str]] = None,
+    legacy: bool = False,
+) -> Optional[Dict[str, str]]:
+    """Parse `fields` out of a model response.
+
+    Order: direct parse, local repair, with `legacy` the old "a|b" format for two-field schemas,
+    then one repair prompt through `repair` (if given). Returns None when everything fails.
+    `legacy` is only for clients that cannot constrain output to JSON: it cuts any value
+    containing "|".
+    """
+    fields = tuple(fields)
+    parsed = _extract_fields(response, fields)
+    if parsed:
+        structured_stats.record("parsed")
+        return parsed
+
+    parsed = repair_json(response, fields)
+    if parsed:
+        structured_stats.record("repaired_locally")
+        return parsed
+
+    if legacy and "{" not in response and "|" in response and len(fields) == 2:
+        first, second = response.split("|", 1)
+        structured_stats.record("legacy")
+        return {fields[0]: first.strip(), fields[1]: second.strip()}
+
+    if repair is not None:
+        try:
+            repaired = repair(build_repair_prompt(response, fields))
+        except Exception:
+            repaired = ""
+        parsed = _extract_fields(repaired, fields) or repair_json(repaired, fields)
+        if parsed:
+            structured_stats.record("repaired_by_llm")
+            return parsed
+
+    structured_stats.record("failed")
+    return None
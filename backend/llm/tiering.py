@@ -0,0 +1,176 @@
+"""
+Model tiering: easy requests go to a small, fast model.
+
+`TierPolicy` scores a request from its length, script pair, context and requested explanation;
+requests scoring at most `max_small_score` are sent to the small model. The small model's output
+is validated by the calling service (non-empty, plausible length, right target script, all
+requested fields present) and anything that fails is escalated to the service's regular (large)
+model. `ModelTiers` keeps per-tier latency and the escalation rate.
+"""
+import os
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+from ocr.language_detection import SCRIPT_RANGES, SCRIPT_TO_ISO
+
+SMALL = "small"
+LARGE = "large"
+
+# Abjads leave vowels unwritten and logographic/syllabic scripts need lexical knowledge, so
+# pairs involving them are harder than letter-by-letter alphabet mappings
+HARD_SCRIPTS = {"Arab", "Hebr", "Hani", "Hira", "Kana", "Jpan"}
+# Japanese output may legitimately mix kanji and kana
+SCRIPT_FAMILIES = {"Hani": {"Hani", "Hira", "Kana"}, "Hira": {"Hani", "Hira", "Kana"}, "Kana": {"Hani", "Hira", "Kana"}}
+EXPLANATION_COST = {"none": 0.0, "brief": 1.0, "full": 3.0}
+
+T = TypeVar("T")
+
+
+class TierPolicy:
+    """Difficulty score of a request; lower is easier."""
+
+    def __init__(self, max_small_score: float = 2.0, words_per_point: int = 4):
+        self.max_small_score = max_small_score
+        self.words_per_point = words_per_point
+
+    def _length(self, text: str) -> float:
+        return len(text.split()) / self.words_per_point
+
+    def transliteration_score(
+        self, text: str, source_script: str, target_script: str, context: Optional[str], explain: str
+    ) -> float:
+        score = self._length(text) + EXPLANATION_COST.get(explain, 1.0)
+        if source_script in HARD_SCRIPTS or target_script in HARD_SCRIPTS:
+            score += 2
+        if context:
+            score += 1
+        return score
+
+    def translation_score(self, text: str, source_lang: str, target_lang: str, context: Optional[str]) -> float:
+        # Translations always come with a brief explanation and need more than a letter mapping
+        score = self._length(text) + EXPLANATION_COST["brief"] + 1
+        if context:
+            score += 1
+        return score
+
+    def tier(self, score: float) -> str:
+        return SMALL if score <= self.max_small_score else LARGE
+
+
+def _script_of(ch: str) -> Optional[str]:
+    code = ord(ch)
+    for script, ranges in SCRIPT_RANGES.items():
+        if any(start <= code <= end for start, end in ranges):
+            return SCRIPT_TO_ISO[script]
+    return None
+
+
+def plausible_length(text: str, output: str, low: float = 0.25, high: float = 4.0) -> bool:
+    # Slack for very short inputs, where one extra letter changes the ratio a lot
+    return low * len(text) - 3 <= len(output) <= high * len(text) + 8
+
+
+def valid_transliteration(text: str, output: str, target_script: str) -> bool:
+    """Non-empty, plausible length and (mostly) written in the target script."""
+    output = (output or "").strip()
+    if not output or not plausible_length(text, output):
+        return False
+    scripts = [s for s in map(_script_of, output) if s]
+    if not scripts or target_script not in SCRIPT_TO_ISO.values():
+        return True
+    allowed = SCRIPT_FAMILIES.get(target_script, {target_script})
+    return sum(s in allowed for s in scripts) / len(scripts) >= 0.8
+
+
+def valid_translation(text: str, output: str) -> bool:
+    output = (output or "").strip()
+    return bool(output) and plausible_length(text, output, low=0.2, high=5.0)
+
+
+class ModelTiers:
+    """Runs calls on the small model when the policy allows it, escalating invalid results.
+
+    `run` calls `call(client)` with the small client, or with None meaning "the service's own
+    (large) model".
+    """
+
+    def __init__(self, small, policy: Optional[TierPolicy] = None):
+        self.small = small
+        self.policy = policy or TierPolicy()
+        self._lock = threading.Lock()
+        self._stats = {tier: {"calls": 0, "total_s": 0.0} for tier in (SMALL, LARGE)}
+        self.escalations = 0
+        self.small_errors = 0
+
+    def _record(self, tier: str, elapsed: float):
+        with self._lock:
+            self._stats[tier]["calls"] += 1
+            self._stats[tier]["total_s"] += elapsed
+
+    def _timed(self, tier: str, call: Callable[[object], T]) -> T:
+        started = time.monotonic()
+        try:
+            return call(self.small if tier == SMALL else None)
+        finally:
+            self._record(tier, time.monotonic() - started)
+
+    def run(self, score: float, call: Callable[[object], T], validate: Callable[[T], bool]) -> T:
+        if self.policy.tier(score) == LARGE:
+            return self._timed(LARGE, call)
+        try:
+            result = self._timed(SMALL, call)
+            if validate(result):
+                return result
+        except Exception:
+            with self._lock:
+                self.small_errors += 1
+        with self._lock:
+            self.escalations += 1
+        return self._timed(LARGE, call)
+
+    def stats(self) -> dict:
+        with self._lock:
+            small_calls = self._stats[SMALL]["calls"]
+            return {
+                "small_model": getattr(self.small, "model", None),
+                "max_small_score": self.policy.max_small_score,
+                "tiers": {
+                    tier: {
+                        "calls": s["calls"],
+                        "avg_latency_ms": round(1000 * s["total_s"] / s["calls"], 1) if s["calls"] else 0.0,
+                    }
+                    for tier, s in self._stats.items()
+                },
+                "escalations": self.escalations,
+                "small_errors": self.small_errors,
+                "escalation_rate": round(self.escalations / small_calls, 4) if small_calls else 0.0,
+            }
+
+
+def tiers_from_env(var: str = "LLM_SMALL_MODEL") -> Optional[ModelTiers]:
+    """Build tiers from e.g. LLM_SMALL_MODEL="qwen2.5:1.5b" or "phi3@http://gpu1:11434".
+
+    Returns None when the variable is unset, so every request keeps using the regular model.
+    """
+    spec = os.environ.get(var, "").strip()
+    if not spec:
+        return None
+    # Imported here: the services import this module for their validators
+    from transliteration.transliteration_service import OllamaClient
+
+    model, _, host = spec.partition("@")
+    return ModelTiers(OllamaClient(model=model, host=host or None))
+
+
+_tiers: Optional[ModelTiers] = None
+_tiers_loaded = False
+
+
+def get_model_tiers() -> Optional[ModelTiers]:
+    """Process-wide tiers configured from LLM_SMALL_MODEL (None when not configured)."""
+    global _tiers, _tiers_loaded
+    if not _tiers_loaded:
+        _tiers = tiers_from_env()
+        _tiers_loaded = True
+    return _tiers
@@ -0,0 +1,155 @@
+"""
+Model warm-up and keep-alive.
+
+Ollama loads a model on its first request and unloads it after a few idle minutes, so the first
+user request after startup (or after a quiet period) pays the full load time. `ModelWarmer`
+preloads the configured models when the API starts and pings them periodically to keep them
+resident. With `idle_after` set, pings stop once no real LLM traffic has been seen for that long
+(letting the server free memory) and resume as soon as traffic returns.
+
+`ready()` is what load balancers should look at: it turns true once every model answered its
+warm-up prompt, while the process itself is live as soon as it starts. With warm-up disabled
+(LLM_WARMUP=0) models are reported as "skipped" and count as ready: they load on first use.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from llm.scheduler import get_scheduler
+
+COLD = "cold"
+WARMING = "warming"
+WARM = "warm"
+IDLE = "idle"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+WARMUP_PROMPT = "Reply with OK."
+
+
+def scheduler_activity() -> int:
+    """Number of real LLM calls admitted so far (warm-up pings bypass the scheduler)."""
+    return sum(lane["admitted"] for lane in get_scheduler().stats()["lanes"].values())
+
+
+class ModelWarmer:
+    def __init__(
+        self,
+        models: Dict[str, object],
+        interval: float = 240.0,
+        idle_after: float = 0.0,
+        activity: Optional[Callable[[], int]] = None,
+        enabled: bool = True,
+    ):
+        self.models = models
+        # Ollama's default keep-alive is 5 minutes; ping a bit more often than that
+        self.interval = interval
+        self.idle_after = idle_after
+        self.activity = activity or scheduler_activity
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        initial = COLD if enabled else SKIPPED
+        self._state = {name: {"state": initial, "load_ms": None, "last_ping": None, "error": None} for name in models}
+        self._last_count = None
+        self._last_activity = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, models: Dict[str, object]) -> "ModelWarmer":
+        """LLM_KEEPALIVE_INTERVAL (seconds between pings), LLM_IDLE_AFTER (0 = keep warm) and
+        LLM_WARMUP (0 = no warm-up or keep-alive)."""
+        return cls(
+            models,
+            interval=float(os.environ.get("LLM_KEEPALIVE_INTERVAL", 240)),
+            idle_after=float(os.environ.get("LLM_IDLE_AFTER", 0)),
+            enabled=os.environ.get("LLM_WARMUP", "1") != "0",
+        )
+
+    def start(self):
+        """Warm up and keep alive in a background thread, so startup is not blocked."""
+        if self._thread is not None or not self.models or not self.enabled:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="model-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        self.warm_up()
+        while not self._stop.wait(self.interval):
+            self.tick()
+
+    def warm_up(self):
+        """Ping every model concurrently."""
+        if not self.models:
+            return
+        with ThreadPoolExecutor(max_workers=len(self.models)) as pool:
+            list(pool.map(self._ping, self.models))
+
+    def _ping(self, name: str):
+        with self._lock:
+            entry = self._state[name]
+            loading = entry["state"] != WARM
+            if entry["state"] in (COLD, FAILED):
+                # Idle models stay ready while they reload; only never-warmed ones report warming
+                entry["state"] = WARMING
+        started = time.monotonic()
+        try:
+            self.models[name].generate(WARMUP_PROMPT)
+        except Exception as e:
+            with self._lock:
+                entry.update(state=FAILED, error=str(e))
+            return
+        with self._lock:
+            if loading:
+                # Pings to unloaded models measure load time; warm pings just refresh keep-alive
+                entry["load_ms"] = round(1000 * (time.monotonic() - started), 1)
+            entry.update(state=WARM, last_ping=time.time(), error=None)
+
+    def tick(self):
+        """One keep-alive round: ping unless the idle policy says to let models unload."""
+        count = self.activity()
+        now = time.monotonic()
+        if count != self._last_count:
+            self._last_count = count
+            self._last_activity = now
+
+        if self.idle_after and now - self._last_activity > self.idle_after:
+            with self._lock:
+                for entry in self._state.values():
+                    if entry["state"] == WARM:
+                        entry["state"] = IDLE
+            return
+        for name in self.models:
+            self._ping(name)
+
+    def ready(self) -> bool:
+        """True once every model has been warmed; idle models count (traffic re-warms them), and
+        so do skipped ones when warm-up is disabled."""
+        with self._lock:
+            return bool(self._state) and all(e["state"] in (WARM, IDLE, SKIPPED) for e in self._state.values())
+
+    def status(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._state.items()}
+
+
+def models_to_warm(llm, tiers=None) -> Dict[str, object]:
+    """Every model the services can call: each router backend (or the single client) and the small tier."""
+    models: Dict[str, object] = {}
+    if hasattr(llm, "backends"):
+        for backend in llm.backends:
+            models[backend.name] = backend.client
+    elif llm is not None:
+        models[getattr(llm, "model", None) or "default"] = llm
+    if tiers is not None:
+        models.setdefault(getattr(tiers.small, "model", None) or "small", tiers.small)
+    return models
@@ -1,16 +1,179 @@
-from fastapi import FastAPI
+import os
+import time
+from contextlib import asynccontextmanager
+
+import anyio
+from fastapi import Depends, FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 from api.routes import router
 from api.chat import chat_router
+from api.jobs import jobs_router
+from api.dependencies import Services, get_services, init_services, shutdown_services
+from llm.scheduler import LLMOverloadedError, get_scheduler
+from llm.structured_output import StructuredOutputError
+from observability import metrics, profiling, tracing
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Services are built here rather than at import time (see api.dependencies)
+    init_services()
+    yield
+    shutdown_services()
+
+
+app = FastAPI(title="Transliteration LLM API", lifespan=lifespan)
+
+
+@app.exception_handler(StructuredOutputError)
+async def structured_output_handler(request: Request, exc: StructuredOutputError):
+    # The model answered, but not with a usable result: a bad upstream reply, not a client error
+    return JSONResponse(status_code=502, content={"error": str(exc)})
+
+
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError):
+    # Shed load quickly and tell clients when to come back
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# SERVER_TIMING=1 adds a Server-Timing header with the request's stage durations
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if not metrics.ENABLED and not tracing.tracer.enabled:
+        return await call_next(request)
+    token = metrics.begin_request() if SERVER_TIMING else None
+    started = time.perf_counter()
+    # One trace per request; stages run inside it become child spans
+    with tracing.tracer.start_trace(request.method, {"http.method": request.method}) as span:
+        try:
+            response = await call_next(request)
+        finally:
+            stages = metrics.end_request(token) if token is not None else None
+        # Label by route template, not raw path, to keep the series count bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        if span is not None:
+            span.name = f"{request.method} {route}"
+            span.attributes.update({"http.route": route, "http.status_code": response.status_code})
+    elapsed = time.perf_counter() - started
+    if metrics.ENABLED:
+        metrics.HTTP_SECONDS.observe(elapsed, request.method, route, str(response.status_code))
+    if stages is not None:
+        response.headers["Server-Timing"] = metrics.server_timing_header(stages + [("total", elapsed)])
+    return response
+
+
+class ProfiledResponse:
+    """Sends `response`, then stops `capture` however sending ends: done, failed, or cut short by
+    a client disconnect (which leaves a wrapped body iterator suspended rather than closed)."""
+
+    def __init__(self, response, capture: profiling.Capture):
+        self.response = response
+        self.capture = capture
 
-app = FastAPI(title="Transliteration LLM API")
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            await stop_profile(self.capture)
+
+
+async def stop_profile(capture: profiling.Capture):
+    # Joining the sampler and writing the capture block; shielded so a cancelled request still stops it
+    with anyio.CancelScope(shield=True):
+        await run_in_threadpool(profiling.profiler.stop, capture)
+
+
+async def profile_request(request: Request, call_next):
+    token = request.headers.get("x-profile") or request.query_params.get("profile")
+    if not profiling.profiler.authorized(token):
+        return await call_next(request)
+    capture, status = profiling.profiler.start(f"{request.method} {request.url.path}")
+    if capture is None:
+        response = await call_next(request)
+        response.headers["X-Profile-Status"] = status
+        return response
+    try:
+        response = await call_next(request)
+    except BaseException:
+        await stop_profile(capture)
+        raise
+    # Streaming bodies are produced after call_next returns; stop once the response is over
+    response.headers["X-Profile-Id"] = capture.id
+    return ProfiledResponse(response, capture)
+
+
+# PROFILING_TOKEN enables on-demand request profiling (see observability.profiling)
+if profiling.ENABLED:
+    app.middleware("http")(profile_request)
+
+
+metrics.registry.register(metrics.Gauge(
+    "llm_queue_depth", "Requests waiting for an LLM slot.", ("lane",),
+    lambda: {(lane,): s["queue_depth"] for lane, s in get_scheduler().stats()["lanes"].items()},
+))
+metrics.registry.register(metrics.Gauge(
+    "llm_active_slots", "LLM slots currently held.", (),
+    lambda: {(): get_scheduler().stats()["active"]},
+))
 
 # Include routers without prefix
 app.include_router(router)
 app.include_router(chat_router)
+app.include_router(jobs_router)
 
+# Liveness: the process is up (models may still be loading)
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+def health(services: Services = Depends(get_services)):
+    warmer = services.warmer
+    return {"status": "ok", "ready": warmer.ready(), "models": warmer.status()}
+
+# Readiness: 503 until every configured model is warm, so load balancers skip cold workers
+@app.get("/ready")
+def ready(services: Services = Depends(get_services)):
+    warmer = services.warmer
+    if not warmer.ready():
+        return JSONResponse(status_code=503, content={"ready": False, "models": warmer.status()})
+    return {"ready": True, "models": warmer.status()}
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+# Recent traces kept in memory (empty when tracing is off or TRACE_FILE is set)
+@app.get("/traces")
+def recent_traces(limit: int = 20):
+    exporter = tracing.tracer.exporter
+    traces = exporter.traces(limit) if isinstance(exporter, tracing.InMemoryExporter) else []
+    return {"enabled": tracing.tracer.enabled, "traces": traces}
+
+# Recent profiler captures with their hottest frames (requires the profiling token)
+@app.get("/profiles")
+def list_profiles(request: Request, limit: int = 20):
+    if not profiling.profiler.authorized(request.headers.get("x-profile")):
+        return JSONResponse(status_code=403, content={"error": "Profiling is disabled or the token is wrong"})
+    return {"profiles": profiling.profiler.captures(limit)}
+
+# Collapsed stacks of one capture, for flamegraph.pl / speedscope
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, request: Request):
+    if not profiling.profiler.authorized(request.headers.get("x-profile")):
+        return JSONResponse(status_code=403, content={"error": "Profiling is disabled or the token is wrong"})
+    folded = profiling.profiler.folded(profile_id)
+    if folded is None:
+        return JSONResponse(status_code=404, content={"error": "Profile not found"})
+    return PlainTextResponse(folded)
 
 @app.get("/")
 def root():
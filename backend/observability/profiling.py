@@ -0,0 +1,259 @@
+"""
+On-demand sampling profiler for single requests.
+
+Off unless PROFILING_TOKEN is set. A request carrying that token in an `X-Profile` header (or a
+`?profile=` query parameter) is profiled: a sampler thread records the Python stacks of every
+thread working on it, PROFILE_INTERVAL_MS apart, until its response has been sent or abandoned.
+A capture still running after PROFILE_MAX_SECONDS is ended by the sampler itself, so a response
+that is never finished cannot keep the profiler busy.
+
+"Working on it" means the event-loop thread that handles the request, plus every worker thread
+(FastAPI's thread pool, document-chunk workers) that enters a `stage(...)` in the request's
+context. Threads blocked in a wait (idle pool workers, the event loop in `select`) are counted as
+idle rather than hot.
+
+Captures are rate-limited: one at a time, at least PROFILE_MIN_INTERVAL seconds apart. Each is
+written to PROFILE_DIR as
+- `<id>.folded`: collapsed stacks ("frame;frame;frame count"), which flamegraph.pl, speedscope
+  and inferno read, and
+- `<id>.json`: request, duration, sample counts and the top hot frames, listed by `/profiles`.
+Only the newest PROFILE_KEEP captures are kept.
+"""
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DIR = BACKEND_DIR / "data" / "profiles"
+
+TOKEN = os.environ.get("PROFILING_TOKEN") or None
+ENABLED = TOKEN is not None
+
+# Leaf frames (file, function) of a thread that is waiting rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+# Capture the current context belongs to (None when the request is not being profiled)
+_active: ContextVar[Optional["Capture"]] = ContextVar("active_profile", default=None)
+
+_labels: Dict[object, str] = {}
+
+
+def _label(code) -> str:
+    """Frame label "function (path:line)", paths relative to backend/ when inside it."""
+    label = _labels.get(code)
+    if label is None:
+        path = Path(code.co_filename)
+        try:
+            name = path.resolve().relative_to(BACKEND_DIR).as_posix()
+        except ValueError:
+            name = "/".join(path.parts[-2:])
+        label = _labels[code] = f"{code.co_name} ({name}:{code.co_firstlineno})".replace(";", ",")
+    return label
+
+
+class Capture:
+    def __init__(self, label: str):
+        self.id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        self.label = label
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.idle = 0
+        self._threads = set()
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    def attach(self, thread_id: Optional[int] = None):
+        with self._lock:
+            self._threads.add(thread_id or threading.get_ident())
+
+    def sample(self, skip: int):
+        with self._lock:
+            threads = set(self._threads)
+        frames = sys._current_frames()
+        stacks, idle = [], 0
+        for thread_id in threads:
+            frame = frames.get(thread_id)
+            if frame is None or thread_id == skip:
+                continue
+            leaf = frame.f_code
+            if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                idle += 1
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            stacks.append(";".join(reversed(stack)))
+        with self._lock:
+            self.idle += idle
+            self.stacks.update(stacks)
+
+    def snapshot(self) -> Tuple[Counter, int]:
+        """Copy of (stacks, idle samples), consistent with any concurrent `sample`."""
+        with self._lock:
+            return Counter(self.stacks), self.idle
+
+
+def top_frames(stacks: Counter, limit: int = 10) -> List[dict]:
+    """Hottest frames by self samples (stack leaf), with their inclusive share."""
+    total = sum(stacks.values()) or 1
+    self_counts: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+    return [
+        {
+            "frame": frame,
+            "self": count,
+            "self_pct": round(100 * count / total, 1),
+            "inclusive_pct": round(100 * inclusive[frame] / total, 1),
+        }
+        for frame, count in self_counts.most_common(limit)
+    ]
+
+
+class Profiler:
+    def __init__(
+        self,
+        directory: Path = DEFAULT_DIR,
+        interval: float = 0.005,
+        min_interval: float = 10.0,
+        keep: int = 50,
+        max_seconds: float = 60.0,
+        token: Optional[str] = None,
+    ):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.min_interval = min_interval
+        self.keep = keep
+        self.max_seconds = max_seconds
+        self.token = token
+        self._lock = threading.Lock()
+        self._current: Optional[Capture] = None
+        self._last_start = 0.0
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        return cls(
+            directory=Path(os.environ.get("PROFILE_DIR", DEFAULT_DIR)),
+            interval=float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000,
+            min_interval=float(os.environ.get("PROFILE_MIN_INTERVAL", 10)),
+            keep=int(os.environ.get("PROFILE_KEEP", 50)),
+            max_seconds=float(os.environ.get("PROFILE_MAX_SECONDS", 60)),
+            token=TOKEN,
+        )
+
+    def authorized(self, token: Optional[str]) -> bool:
+        # Compared as bytes: compare_digest rejects str arguments with non-ASCII characters
+        return bool(self.token and token) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def start(self, label: str) -> Tuple[Optional[Capture], str]:
+        """Begin a capture for the current context; returns (capture, status) with capture None if refused."""
+        now = time.monotonic()
+        with self._lock:
+            if self._current is not None:
+                return None, "busy"
+            if now - self._last_start < self.min_interval:
+                return None, "rate-limited"
+            capture = self._current = Capture(label)
+            self._last_start = now
+        capture.attach()
+        _active.set(capture)
+        capture._sampler = threading.Thread(target=self._sample_loop, args=(capture,), name="profiler", daemon=True)
+        capture._sampler.start()
+        return capture, "started"
+
+    def _sample_loop(self, capture: Capture):
+        me = threading.get_ident()
+        deadline = time.monotonic() + self.max_seconds
+        while capture.ended is None and time.monotonic() < deadline:
+            capture.sample(skip=me)
+            time.sleep(self.interval)
+        if capture.ended is None:
+            self.stop(capture)
+
+    def stop(self, capture: Capture) -> Optional[dict]:
+        """End `capture` and write it out; None if it had already been stopped."""
+        with self._lock:
+            if capture.ended is not None:
+                return None
+            capture.ended = time.time()
+        # The sampler notices `ended` within one interval; wait so the capture is complete
+        if capture._sampler is not None and capture._sampler is not threading.current_thread():
+            capture._sampler.join(self.interval + 1.0)
+        with self._lock:
+            if self._current is capture:
+                self._current = None
+        return self._write(capture)
+
+    def _write(self, capture: Capture) -> dict:
+        stacks, idle = capture.snapshot()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / f"{capture.id}.folded", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        summary = {
+            "id": capture.id,
+            "request": capture.label,
+            "started": capture.started,
+            "duration_ms": round(1000 * (capture.ended - capture.started), 1),
+            "interval_ms": self.interval * 1000,
+            "samples": sum(stacks.values()),
+            "idle_samples": idle,
+            "top_frames": top_frames(stacks),
+        }
+        with open(self.directory / f"{capture.id}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        self._prune()
+        return summary
+
+    def _prune(self):
+        summaries = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in summaries[self.keep:]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".folded").unlink(missing_ok=True)
+
+    def captures(self, limit: int = 20) -> List[dict]:
+        """Summaries of the most recent captures, newest first."""
+        if not self.directory.exists():
+            return []
+        paths = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        summaries = []
+        for path in paths[:limit]:
+            try:
+                summaries.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return summaries
+
+    def folded(self, capture_id: str) -> Optional[str]:
+        path = self.directory / f"{Path(capture_id).name}.folded"
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+
+profiler = Profiler.from_env()
+
+
+def attach_current_thread():
+    """Include the calling thread in the current request's capture, if it is being profiled."""
+    capture = _active.get()
+    if capture is not None:
+        capture.attach()
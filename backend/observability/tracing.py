@@ -0,0 +1,301 @@
+"""
+Request tracing.
+
+Each HTTP request (and each `/ws/chat` turn) becomes one trace; every `stage(...)` from
+`observability.metrics` that runs inside it becomes a child span, so OCR passes, preprocessing,
+script detection, cache lookups, LLM queue wait and generation show up without extra code. Spans
+use OpenTelemetry's data model and are exported as OTLP JSON, which Jaeger, Tempo or an
+OpenTelemetry collector's file receiver can load.
+
+Sampling keeps a trace when either
+- it was picked up front (TRACE_SAMPLE_RATE, 0..1), or
+- it turned out slow (TRACE_SLOW_MS; 0 = off),
+so slow requests are always kept without storing every fast one. With both unset tracing is off
+and a stage pays one context variable lookup.
+
+Traces go to TRACE_FILE (one OTLP JSON document per line) when set, otherwise to a bounded
+in-memory buffer served by `/traces`.
+
+`remember(key)` / `links_for(key)` connect traces that belong together, e.g. a `/transliterate`
+request and the chat turns that later use its `session_id`.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+SERVICE_NAME = "transliteration-llm"
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Span currently open in this context (None outside a sampled-or-pending trace)
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return "%0*x" % (bits // 4, random.getrandbits(bits))
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, object]) -> List[dict]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+class _Trace:
+    """Spans of one trace, buffered until the root span ends and the sampling decision is made."""
+
+    __slots__ = ("trace_id", "sampled", "spans", "lock")
+
+    def __init__(self, sampled: bool):
+        self.trace_id = _new_id(128)
+        self.sampled = sampled
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "links", "status", "error", "_token")
+
+    def __init__(self, trace: _Trace, name: str, parent: Optional["Span"] = None,
+                 kind: int = KIND_INTERNAL, start_ns: Optional[int] = None):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, object] = {}
+        self.links: List[dict] = []
+        self.status = STATUS_OK
+        self.error: Optional[str] = None
+        self._token = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_error(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        with self.trace.lock:
+            self.trace.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status, **({"message": self.error} if self.error else {})},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.links:
+            span["links"] = self.links
+        return span
+
+
+def _otlp_document(spans: List[Span]) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+        "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [s.to_otlp() for s in spans]}],
+    }]}
+
+
+class InMemoryExporter:
+    """Keeps the most recent traces for `/traces` and tests."""
+
+    def __init__(self, max_traces: int = 200):
+        self._traces = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        trace = [s.to_otlp() for s in sorted(spans, key=lambda s: s.start_ns)]
+        with self._lock:
+            self._traces.append(trace)
+
+    def traces(self, limit: Optional[int] = None) -> List[List[dict]]:
+        """Newest first."""
+        with self._lock:
+            traces = list(reversed(self._traces))
+        return traces[:limit] if limit else traces
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+class FileExporter:
+    """Appends one OTLP JSON document per trace to a file (JSON lines)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        line = json.dumps(_otlp_document(spans), ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.0, slow_ms: float = 0.0, exporter=None):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.exporter = exporter if exporter is not None else InMemoryExporter()
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        path = os.environ.get("TRACE_FILE")
+        return cls(
+            sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", 0)),
+            slow_ms=float(os.environ.get("TRACE_SLOW_MS", 0)),
+            exporter=FileExporter(path) if path else InMemoryExporter(),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_ms > 0
+
+    @contextmanager
+    def start_trace(self, name: str, attributes: Optional[Dict[str, object]] = None,
+                    links: Optional[List[dict]] = None) -> Iterator[Optional[Span]]:
+        """Open a root span for the current context; yields None when tracing is off."""
+        if not self.enabled:
+            yield None
+            return
+        trace = _Trace(sampled=random.random() < self.sample_rate)
+        root = Span(trace, name, kind=KIND_SERVER)
+        root.attributes.update(attributes or {})
+        root.links.extend(links or [])
+        token = _current.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.set_error(e)
+            raise
+        finally:
+            _current.reset(token)
+            root.end()
+            self._finish(root)
+
+    def _finish(self, root: Span):
+        trace = root.trace
+        if not trace.sampled and not (self.slow_ms and root.duration_ms >= self.slow_ms):
+            return
+        with trace.lock:
+            spans = list(trace.spans)
+        try:
+            self.exporter.export(spans)
+        except Exception:
+            # Tracing must never fail a request
+            pass
+
+
+tracer = Tracer.from_env()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str) -> Optional[Span]:
+    """Open a child of the current span and make it current; None outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        return None
+    span = Span(parent.trace, name, parent)
+    span._token = _current.set(span)
+    return span
+
+
+def end_span(span: Span, exc: Optional[BaseException] = None):
+    if exc is not None:
+        span.set_error(exc)
+    try:
+        _current.reset(span._token)
+    except ValueError:
+        # Ended from a different context (e.g. across an async generator's yield)
+        pass
+    span.end()
+
+
+def record_span(name: str, seconds: float):
+    """Add an already finished child span covering the last `seconds` (for caller-measured stages)."""
+    parent = _current.get()
+    if parent is None:
+        return
+    end_ns = time.time_ns()
+    Span(parent.trace, name, parent, start_ns=end_ns - int(seconds * 1e9)).end(end_ns)
+
+
+def set_attribute(key: str, value):
+    """Set an attribute on the current span (no-op outside a trace)."""
+    span = _current.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+# key (e.g. a chat session id) -> span context of the trace that created it
+_links: "OrderedDict[str, dict]" = OrderedDict()
+_links_lock = threading.Lock()
+MAX_LINKS = 10000
+
+
+def remember(key: str):
+    """Remember the current span under `key` so later traces can link back to it."""
+    span = _current.get()
+    if span is None:
+        return
+    with _links_lock:
+        _links[key] = {"traceId": span.trace_id, "spanId": span.span_id}
+        _links.move_to_end(key)
+        while len(_links) > MAX_LINKS:
+            _links.popitem(last=False)
+
+
+def links_for(key: Optional[str]) -> List[dict]:
+    """OTLP links to the trace remembered under `key` (empty if unknown)."""
+    if not key:
+        return []
+    with _links_lock:
+        link = _links.get(key)
+    return [dict(link)] if link else []
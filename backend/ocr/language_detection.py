@@ -1,6 +1,8 @@
 import unicodedata
 from collections import Counter
 
+from observability.metrics import stage
+
 # Unicode script ranges (simplified but effective)
 SCRIPT_RANGES = {
     "Latin": [(0x0041, 0x024F)],
@@ -43,6 +45,11 @@ SCRIPT_TO_ISO = {
 
 
 def detect_script(text: str) -> dict:
+    with stage("detect_script"):
+        return _detect_script(text)
+
+
+def _detect_script(text: str) -> dict:
     counts = Counter()
 
     for char in text:
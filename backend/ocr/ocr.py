@@ -1,11 +1,9 @@
 from fastapi import UploadFile
-from PIL import Image
-import pytesseract
 import io
 
-from .ocr_utils import check_tesseract_installed
-from .preprocessing import preprocess_image
+from .ocr_utils import check_tesseract_installed, get_pytesseract
 from .language_detection import detect_script
+from observability.metrics import stage
 
 
 def extract_text(file: UploadFile) -> dict:
@@ -13,27 +11,45 @@ def extract_text(file: UploadFile) -> dict:
     OCR entry point.
     Returns extracted text + detected script metadata.
     """
+    return extract_text_from_bytes(file.file.read())
+
+
+def extract_text_from_bytes(contents: bytes) -> dict:
+    """
+    OCR for raw image bytes (uploads, stored job files).
+    Returns extracted text + detected script metadata.
+    """
     check_tesseract_installed()
+    # Imaging and OpenCV are only loaded once something is actually OCR'd
+    from PIL import Image
+    from .preprocessing import preprocess_image
 
-    contents = file.file.read()
-    image = Image.open(io.BytesIO(contents)).convert("RGB")
+    pytesseract = get_pytesseract()
+    with stage("ocr.decode"):
+        image = Image.open(io.BytesIO(contents)).convert("RGB")
 
     processed = preprocess_image(image)
 
     # First-pass OCR in English to get raw text for detection
-    raw_text = pytesseract.image_to_string(processed, lang="eng").strip()
+    with stage("ocr.pass1"):
+        raw_text = pytesseract.image_to_string(processed, lang="eng").strip()
 
     detection = detect_script(raw_text)
 
     # Second-pass OCR using detected language
-    final_text = pytesseract.image_to_string(
-        processed,
-        lang=detection["tesseract_lang"]
-    ).strip()
+    with stage("ocr.pass2"):
+        final_text = pytesseract.image_to_string(
+            processed,
+            lang=detection["tesseract_lang"]
+        ).strip()
 
     return {
         "text": final_text,
         "detected_script": detection["script"],
         "script_confidence": detection["confidence"],
         "iso_15924": detection["iso_15924"],
+        # The keys detect_script() returns, which the routes read for text and files alike
+        "script": detection["script"],
+        "confidence": detection["confidence"],
+        "tesseract_lang": detection["tesseract_lang"],
     }
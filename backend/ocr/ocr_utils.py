@@ -1,7 +1,9 @@
-from typing import Optional
-from PIL import Image
-import pytesseract
-import pdfplumber
+from typing import Iterable, Iterator, Optional, Tuple
+import os
+
+# pytesseract, pdfplumber and PIL are imported on first use: they are slow to import and most
+# API processes only OCR occasionally
+WINDOWS_TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 
 def check_tesseract_installed() -> bool:
@@ -13,7 +15,15 @@ def check_tesseract_installed() -> bool:
     return True
 
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+def get_pytesseract():
+    """Import and configure pytesseract."""
+    import pytesseract
+
+    if os.name == "nt":
+        # The Windows installer does not put tesseract on PATH
+        pytesseract.pytesseract.tesseract_cmd = WINDOWS_TESSERACT_CMD
+    return pytesseract
+
 
 def ocr_from_image(image_path: str, lang: Optional[str] = None) -> str:
     """
@@ -24,6 +34,9 @@ def ocr_from_image(image_path: str, lang: Optional[str] = None) -> str:
     Returns:
         Extracted text as string
     """
+    from PIL import Image
+
+    pytesseract = get_pytesseract()
     img = Image.open(image_path)
     text = pytesseract.image_to_string(img, lang=lang) if lang else pytesseract.image_to_string(img)
     return text.strip()
@@ -39,13 +52,38 @@ def ocr_from_pdf(pdf_path: str, lang: Optional[str] = None) -> str:
         Extracted text as string
     """
     text = ""
+    for _, page_text in iter_pdf_pages(pdf_path, lang=lang):
+        text += page_text + "\n"
+    return text.strip()
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    """Number of pages in a PDF."""
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pdf_pages(
+    pdf_path: str, lang: Optional[str] = None, pages: Optional[Iterable[int]] = None
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for a PDF, page by page.
+    Args:
+        pdf_path: Path to PDF file
+        lang: Optional Tesseract language code for OCR on scanned pages
+        pages: Optional 0-based page numbers to extract (default: all)
+    """
+    import pdfplumber
+
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
+        numbers = range(len(pdf.pages)) if pages is None else pages
+        for number in numbers:
+            page = pdf.pages[number]
             page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-            else:
+            if not page_text:
                 # If page is scanned image, run OCR on image
                 page_image = page.to_image(resolution=300).original
-                text += pytesseract.image_to_string(page_image, lang=lang) + "\n"
-    return text.strip()
+                page_text = get_pytesseract().image_to_string(page_image, lang=lang)
+            yield number, page_text
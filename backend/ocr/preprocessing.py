@@ -2,6 +2,8 @@ import cv2
 import numpy as np
 from PIL import Image
 
+from observability.metrics import stage
+
 
 def preprocess_image(image: Image.Image) -> Image.Image:
     """
@@ -11,19 +13,22 @@ def preprocess_image(image: Image.Image) -> Image.Image:
     img = np.array(image)
 
     # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    with stage("ocr.grayscale"):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
     # Denoise
-    gray = cv2.fastNlMeansDenoising(gray, h=30)
+    with stage("ocr.denoise"):
+        gray = cv2.fastNlMeansDenoising(gray, h=30)
 
     # Adaptive threshold (handles uneven lighting)
-    thresh = cv2.adaptiveThreshold(
-        gray,
-        255,
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY,
-        31,
-        10,
-    )
+    with stage("ocr.threshold"):
+        thresh = cv2.adaptiveThreshold(
+            gray,
+            255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY,
+            31,
+            10,
+        )
 
     return Image.fromarray(thresh)
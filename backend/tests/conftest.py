@@ -0,0 +1,55 @@
+import pytest
+
+from backend.benchmarks.load import build_app
+
+
+@pytest.fixture(autouse=True)
+def isolated_services(tmp_path, monkeypatch):
+    """Keep every test that reaches the app off backend/data.
+
+    Routes get a `Services` on a per-test data dir (built on first use), and DATA_DIR covers
+    containers built outside the dependency, e.g. by the lifespan's `init_services()`.
+    """
+    data_dir = tmp_path / "data"
+    monkeypatch.setenv("DATA_DIR", str(data_dir))
+    try:
+        from main import app
+        from api.dependencies import Services, get_services
+    except ImportError:
+        yield
+        return
+
+    built = []
+
+    def services():
+        if not built:
+            built.append(Services(data_dir=str(data_dir)))
+        return built[0]
+
+    app.dependency_overrides[get_services] = services
+    yield
+    if app.dependency_overrides.get(get_services) is services:
+        del app.dependency_overrides[get_services]
+    for s in built:
+        s.stop()
+
+
+@pytest.fixture
+def load_app(tmp_path):
+    """`build_app` on stores under tmp_path; restores the app's dependency overrides and the
+    global scheduler's concurrency afterwards."""
+    from main import app
+    from llm.scheduler import get_scheduler
+
+    scheduler = get_scheduler()
+    max_concurrency = scheduler.max_concurrency
+    overrides = dict(app.dependency_overrides)
+
+    def build(**kwargs):
+        return build_app(data_dir=str(tmp_path), **kwargs)
+
+    yield build
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(overrides)
+    scheduler.max_concurrency = max_concurrency
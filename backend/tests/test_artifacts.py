@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+
+from backend.api.artifacts import ArtifactStore
+
+
+def run(coro):
+    # A private loop: asyncio.run() would leave later tests without a current event loop
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_store_expires_and_evicts_least_recently_used():
+    now = [0.0]
+    store = ArtifactStore(ttl=10, max_entries=2, clock=lambda: now[0])
+    a, b = store.put({"text": "a"}), store.put({"text": "b"})
+    assert store.get(a) == {"text": "a"}
+
+    c = store.put({"text": "c"})
+    assert store.get(b) is None
+    assert store.get(a) and store.get(c)
+
+    now[0] = 10.0
+    assert store.get(a) is None
+    assert store.get("unknown") is None
+
+
+def test_transliterate_reuses_ocr_result_by_artifact_id(monkeypatch, load_app):
+    import api.routes
+
+    ocr_calls = []
+
+    def fake_extract_text(file):
+        ocr_calls.append(file.filename)
+        return {"text": "привет", "script": "Cyrillic", "confidence": 1.0,
+                "tesseract_lang": "rus", "iso_15924": "Cyrl"}
+
+    monkeypatch.setattr(api.routes, "extract_text", fake_extract_text)
+    app = load_app()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            detected = (await client.post("/detect-language", files={"file": ("page.png", b"image")})).json()
+            result = (await client.post("/transliterate", data={
+                "artifact_id": detected["artifact_id"], "target_script": "Latn",
+                "source_script": detected["iso_code"], "skip_detection": "true",
+            })).json()
+            expired = (await client.post("/transliterate", data={
+                "artifact_id": "gone", "target_script": "Latn",
+            })).json()
+            return detected, result, expired
+
+    detected, result, expired = run(scenario())
+
+    assert detected["iso_code"] == "Cyrl"
+    assert result["input_text"] == "привет"
+    assert result["source_script"] == "Cyrl"
+    assert ocr_calls == ["page.png"]
+    assert "artifact_id" in expired["error"]
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from backend.benchmarks import corpora
+from backend.benchmarks.fakes import FakeLLMClient, FakeStreamingClient
+from backend.benchmarks.run import compare, main, measure
+from backend.transliteration.transliteration_service import TransliterationService
+
+
+def test_corpus_is_deterministic_and_covers_every_script():
+    corpus = corpora.text_corpus(seed=7)
+
+    assert corpus == corpora.text_corpus(seed=7)
+    assert corpus != corpora.text_corpus(seed=8)
+    assert {script for script, _, _ in corpus} == set(corpora.ALPHABETS) | {"Zyyy"}
+    assert corpora.image_bytes("small", seed=7) == corpora.image_bytes("small", seed=7)
+
+
+def test_fake_llm_answers_service_prompts():
+    llm = FakeLLMClient()
+    service = TransliterationService(llm_client=llm)
+
+    first = service.transliterate("Привет", "Cyrl", "Latn", explain="brief")
+    second = service.transliterate("Привет", "Cyrl", "Latn", explain="brief")
+
+    assert first["transliteration"] == second["transliteration"]
+    assert first["transliteration"].isascii()
+    assert first["explanation"] == "Letter by letter."
+
+
+def test_fake_streaming_client_applies_ttft():
+    client = FakeStreamingClient(ttft=0.02)
+
+    async def collect():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        chunks = [chunk async for chunk in client.stream_generate("hello")]
+        return chunks, loop.time() - started
+
+    # A private loop: asyncio.run() would leave later tests without a current event loop
+    loop = asyncio.new_event_loop()
+    try:
+        chunks, elapsed = loop.run_until_complete(collect())
+    finally:
+        loop.close()
+
+    assert "".join(chunks).startswith("Sure,")
+    assert elapsed >= 0.02
+
+
+def test_compare_flags_regressions_and_improvements():
+    baseline = {"benchmarks": {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}, "c": {"median_us": 100.0}}}
+    current = {"benchmarks": {"a": {"median_us": 150.0}, "b": {"median_us": 50.0}, "c": {"median_us": 105.0},
+                              "d": {"median_us": 1.0}}}
+
+    statuses = {row["name"]: row["status"] for row in compare(current, baseline, threshold=0.1)}
+
+    assert statuses == {"a": "regression", "b": "improvement", "c": "unchanged"}
+    assert measure(lambda: None, rounds=2, min_time=0.001)["number"] > 1
+
+
+def test_main_writes_results_and_fails_on_regression(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    output = tmp_path / "current.json"
+    args = ["-k", "prompt.batch", "--rounds", "2", "--min-time", "0.01", "--output", str(output)]
+
+    assert main(args) == 0
+    results = json.loads(output.read_text())
+    assert set(results["benchmarks"]) == {"prompt.batch"}
+    assert results["meta"]["seed"] == corpora.DEFAULT_SEED
+
+    # A baseline 1000x faster than reality makes the current run a regression
+    results["benchmarks"]["prompt.batch"]["median_us"] /= 1000
+    baseline.write_text(json.dumps(results))
+    assert main(args + ["--baseline", str(baseline), "--fail-on-regression"]) == 1
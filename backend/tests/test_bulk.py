@@ -0,0 +1,145 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.transliteration import bulk
+from backend.transliteration.transliteration_service import TransliterationService, LLMClient
+
+
+class UpperLLM(LLMClient):
+    """Answers numbered batch prompts and single prompts by upper-casing the text."""
+
+    def __init__(self):
+        self.prompts = 0
+
+    def generate(self, prompt: str) -> str:
+        self.prompts += 1
+        if "Items:" not in prompt:
+            text = prompt.split('Text: "', 1)[1].split('"', 1)[0]
+            return '{"transliteration": "%s"}' % text.upper()
+        items = prompt.split("Items:\n", 1)[1].split("\nReply with", 1)[0].splitlines()
+        return "\n".join(f"{number}. {text.upper()}" for number, text in (line.split(". ", 1) for line in items))
+
+
+class OverloadedLLM(UpperLLM):
+    """Refuses its first `refusals` prompts the way the scheduler does when the lane is full."""
+
+    def __init__(self, refusals: int):
+        super().__init__()
+        self.refusals = refusals
+
+    def generate(self, prompt: str) -> str:
+        if self.refusals:
+            self.refusals -= 1
+            # The class bulk imports (`llm.scheduler`), not backend.llm.scheduler's
+            raise bulk.LLMOverloadedError("LLM queue is full", 429, 0)
+        return super().generate(prompt)
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_jsonl_corpus_is_transliterated_in_order(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text(
+        "".join(json.dumps({"id": f"r{i}", "text": f"word {i}"}) + "\n" for i in range(50)) + "{broken\n",
+        encoding="utf-8",
+    )
+    output = tmp_path / "out.jsonl"
+
+    code = bulk.main([str(corpus), "-o", str(output), "--source", "Latn", "--target", "Latn"],
+                     service=TransliterationService(llm_client=UpperLLM()))
+
+    rows = read_jsonl(output)
+    assert code == 0
+    assert [row["index"] for row in rows] == list(range(51))
+    assert [row["transliteration"] for row in rows[:50]] == [f"WORD {i}" for i in range(50)]
+    assert rows[7]["id"] == "r7"
+    assert "error" in rows[50]
+
+
+def test_resume_skips_checkpointed_records_and_drops_later_output(tmp_path):
+    corpus = tmp_path / "lines.txt"
+    corpus.write_text("".join(f"line {i}\n" for i in range(30)), encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    args = [str(corpus), "-o", str(output), "--source", "Latn", "--target", "Latn", "--checkpoint-every", "10"]
+
+    bulk.main(args, service=TransliterationService(llm_client=UpperLLM()))
+    complete = output.read_bytes()
+    # Simulate a crash after the checkpoint at record 20: a later, half-written line survives
+    state = {"records": 20, "units": 20, "unit_records": 20,
+             "output_bytes": len(b"".join(complete.splitlines(keepends=True)[:20]))}
+    (tmp_path / "out.jsonl.checkpoint").write_text(json.dumps(state))
+    output.write_bytes(complete[:state["output_bytes"]] + b'{"index": 20, "tra')
+
+    llm = UpperLLM()
+    bulk.main(args, service=TransliterationService(llm_client=llm))
+
+    assert output.read_bytes() == complete
+    # Only the last 10 lines were transliterated again
+    assert 0 < llm.prompts <= 10
+
+
+def test_overloaded_records_are_retried_not_written_as_errors():
+    transliterator = bulk.BulkTransliterator(
+        TransliterationService(llm_client=OverloadedLLM(refusals=2)), "Latn", "Latn", retry_backoff=0,
+    )
+    records = [{"id": i, "text": f"word {i}", "end_of_unit": True} for i in range(5)]
+    out = io.BytesIO()
+
+    transliterator.run(records, out)
+
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [row["transliteration"] for row in rows] == [f"WORD {i}" for i in range(5)]
+    assert transliterator.stats["errors"] == 0
+    assert transliterator.stats["retries"] >= 1
+
+
+def test_run_stops_when_still_overloaded_after_retries(tmp_path):
+    transliterator = bulk.BulkTransliterator(
+        TransliterationService(llm_client=OverloadedLLM(refusals=1000)), "Latn", "Latn",
+        concurrency=2, max_retries=1, retry_backoff=0,
+    )
+    records = [{"id": i, "text": f"word {i}", "end_of_unit": True} for i in range(10)]
+    checkpoint = tmp_path / "out.jsonl.checkpoint"
+
+    with open(tmp_path / "out.jsonl", "wb") as out:
+        with pytest.raises(bulk.LLMOverloadedError):
+            transliterator.run(records, out, checkpoint=checkpoint, checkpoint_every=1)
+
+    # Nothing was recorded as done, so a rerun starts over instead of skipping the records
+    assert (tmp_path / "out.jsonl").read_bytes() == b""
+    assert not checkpoint.exists()
+
+
+def test_in_order_bounds_work_in_flight():
+    submitted = []
+    with ThreadPoolExecutor(4) as pool:
+        def entries():
+            for i in range(20):
+                submitted.append(i)
+                yield i, pool.submit(lambda n: n * n, i)
+
+        for key, value in bulk.in_order(entries(), window=3):
+            assert value == key * key
+            assert len(submitted) <= key + 3
+
+
+def test_ocr_records_split_documents_into_pages(tmp_path, monkeypatch):
+    (tmp_path / "b").mkdir()
+    for name in ("a.png", "b/c.pdf", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    pages = {"a.png": [("", "alpha")], "c.pdf": [("#1", "one"), ("#2", "two")]}
+    monkeypatch.setattr(bulk, "ocr_document", lambda path: (pages[path.rsplit("/", 1)[-1]], None))
+
+    with ThreadPoolExecutor(2) as pool:
+        records = list(bulk.ocr_records(str(tmp_path), pool, window=2))
+        resumed = list(bulk.ocr_records(str(tmp_path), pool, window=2, skip=1))
+
+    assert [(r["id"], r["text"], r["end_of_unit"]) for r in records] == [
+        ("a.png", "alpha", True), ("b/c.pdf#1", "one", False), ("b/c.pdf#2", "two", True),
+    ]
+    assert [r["id"] for r in resumed] == ["b/c.pdf#1", "b/c.pdf#2"]
@@ -0,0 +1,127 @@
+import asyncio
+
+from backend.api.intents import (
+    IntentClassifier, REPEAT, EXPLAIN, PRONOUNCE, SWITCH_TARGET, SHOW_ORIGINAL,
+)
+from backend.api.chat import ChatService
+
+
+class CountingStreamLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def stream_generate(self, prompt: str):
+        self.calls += 1
+        yield "from the llm"
+
+
+class DummyTransliterator:
+    def __init__(self):
+        self.calls = []
+
+    def transliterate(self, text, source_script, target_script, context=None, priority=None, explain="brief"):
+        self.calls.append((target_script, explain))
+        return {
+            "original_text": text,
+            "source_script": source_script,
+            "target_script": target_script,
+            "transliteration": f"{text}-{target_script}",
+            "explanation": "dummy",
+        }
+
+
+CONTEXT = {
+    "transliteration": {
+        "original_text": "привет",
+        "source_script": "Cyrl",
+        "target_script": "Latn",
+        "transliteration": "privet",
+        "explanation": "Standard romanization.",
+    }
+}
+
+
+def _collect(service, session_id, text):
+    async def run():
+        return [c async for c in service.generate_reply(session_id, text)]
+    return "".join(asyncio.run(run()))
+
+
+def test_classifier_intents():
+    clf = IntentClassifier()
+
+    assert clf.classify("Can you explain the transliteration?")[0] == EXPLAIN
+    assert clf.classify("Repeat that please")[0] == REPEAT
+    assert clf.classify("How do I pronounce it?")[0] == PRONOUNCE
+    assert clf.classify("show me the original")[0] == SHOW_ORIGINAL
+    assert clf.classify("Now switch to Greek") == (SWITCH_TARGET, {"target_script": "Grek"})
+    assert clf.classify("write it in cyrl") == (SWITCH_TARGET, {"target_script": "Cyrl"})
+
+
+def test_classifier_avoids_substring_misfires_and_open_questions():
+    clf = IntentClassifier()
+
+    # "show" must not trigger the explanation shortcut via "how"
+    assert clf.classify("show something else")[0] is None
+    assert clf.classify("Hello there")[0] is None
+    # Questions that merely mention a script are not requests to switch
+    assert clf.classify("Is this name common in Greek?")[0] is None
+    assert clf.classify("What does this word mean in Russian?")[0] is None
+    assert clf.classify("how greek evolved into latin")[0] is None
+    assert clf.classify("what is the result of the war")[0] is None
+    assert clf.classify("say it again")[0] == REPEAT
+    # "original" alone is a question about the word, not a request for the input
+    assert clf.classify("what is the original meaning of this word?")[0] is None
+    assert clf.classify("is the original spelling older?")[0] is None
+    assert clf.classify("show the original text")[0] == SHOW_ORIGINAL
+    assert clf.classify("what's the original?")[0] == SHOW_ORIGINAL
+    # The script after the trigger is the target, not the first one mentioned
+    assert clf.classify("this greek word, convert it to latin") == (SWITCH_TARGET, {"target_script": "Latn"})
+    long_question = "What other historical romanization systems exist for Russian and when were they used in libraries"
+    assert clf.classify(long_question)[0] is None
+
+
+def test_routed_intents_do_not_call_llm():
+    llm = CountingStreamLLM()
+    service = ChatService(streaming_llm=llm)
+    session_id = service.create_session(initial_context=dict(CONTEXT))
+
+    assert "privet" in _collect(service, session_id, "repeat")
+    assert "привет" in _collect(service, session_id, "what was the original?")
+    assert "Standard romanization" in _collect(service, session_id, "why?")
+    assert "privet" in _collect(service, session_id, "how is it pronounced")
+    assert llm.calls == 0
+
+    assert _collect(service, session_id, "Tell me a story about Moscow") == "from the llm"
+    assert llm.calls == 1
+
+
+def test_switch_target_uses_service_once_and_caches_per_script():
+    translit = DummyTransliterator()
+    llm = CountingStreamLLM()
+    service = ChatService(streaming_llm=llm, transliteration_service=translit)
+    session_id = service.create_session(initial_context=dict(CONTEXT))
+
+    assert "привет-Grek" in _collect(service, session_id, "switch to Greek")
+    assert "privet" in _collect(service, session_id, "convert to Latin")
+    assert "привет-Grek" in _collect(service, session_id, "show it in greek")
+
+    # No explanation is generated for a switch; it is produced only when asked for
+    assert translit.calls == [("Grek", "none")]
+    assert llm.calls == 0
+
+
+def test_explanation_generated_lazily_on_first_ask():
+    class ExplainingTransliterator(DummyTransliterator):
+        def explain_result(self, result, level="brief", priority=None):
+            self.calls.append("explain")
+            return "Generated on demand."
+
+    translit = ExplainingTransliterator()
+    service = ChatService(streaming_llm=CountingStreamLLM(), transliteration_service=translit)
+    context = {"transliteration": dict(CONTEXT["transliteration"], explanation=None)}
+    session_id = service.create_session(initial_context=context)
+
+    assert _collect(service, session_id, "explain please") == "Generated on demand."
+    assert _collect(service, session_id, "why?") == "Generated on demand."
+    assert translit.calls == ["explain"]
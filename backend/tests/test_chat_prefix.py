@@ -0,0 +1,63 @@
+import asyncio
+
+from backend.api.chat import ChatService
+
+
+class RecordingChatLLM:
+    """Fake chat backend that records the message lists it was sent."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def stream_chat(self, messages):
+        self.requests.append([dict(m) for m in messages])
+        yield "answer "
+        yield f"{len(self.requests)}"
+
+
+class RecordingPromptLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def stream_generate(self, prompt):
+        self.prompts.append(prompt)
+        yield "ok"
+
+
+def _turn(service, session_id, text):
+    async def run():
+        return [c async for c in service.generate_reply(session_id, text)]
+    return "".join(asyncio.run(run()))
+
+
+def test_chat_messages_extend_previous_turn_verbatim():
+    llm = RecordingChatLLM()
+    service = ChatService(streaming_llm=llm)
+    session_id = service.create_session(initial_context={"transliteration": {"transliteration": "privet"}})
+
+    _turn(service, session_id, "Tell me about Russian vowels")
+    # context changes after the first turn must not alter the frozen prefix
+    service.add_context(session_id, "transliteration", {"transliteration": "something else"})
+    _turn(service, session_id, "And consonants?")
+
+    first, second = llm.requests
+    assert second[:len(first)] == first
+    assert "privet" in first[0]["content"]
+    # the whole streamed reply is stored as a single assistant turn
+    assert second[len(first)] == {"role": "assistant", "content": "answer 1"}
+
+
+def test_prompt_prefix_is_stable_and_turn_timings_recorded():
+    llm = RecordingPromptLLM()
+    service = ChatService(streaming_llm=llm)
+    session_id = service.create_session()
+
+    _turn(service, session_id, "Tell me about Greek letters")
+    _turn(service, session_id, "What about accents?")
+
+    first, second = llm.prompts
+    assert second.startswith(first[:-len("Assistant:")])
+
+    timings = service.get_session(session_id).turn_timings
+    assert [t["turn"] for t in timings] == [1, 2]
+    assert all(t["ttft_ms"] <= t["total_ms"] for t in timings)
@@ -0,0 +1,131 @@
+import pytest
+import random
+import threading
+import time
+
+from backend.transliteration.transliteration_service import TransliterationService, LLMClient
+from backend.transliteration.document_pipeline import DocumentPipeline, split_document
+
+
+class UpperCaseLLM(LLMClient):
+    """Upper-cases numbered items with random latency; optionally drops one item on first sight."""
+
+    def __init__(self, flaky_item=None):
+        self.flaky_item = flaky_item
+        self.seen = set()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self.lock:
+            self.calls += 1
+        time.sleep(random.uniform(0, 0.02))
+        items = prompt.split("Items:\n", 1)[1].split("\nReply with", 1)[0].splitlines()
+        lines = []
+        for line in items:
+            number, text = line.split(". ", 1)
+            with self.lock:
+                if text == self.flaky_item and text not in self.seen:
+                    self.seen.add(text)
+                    continue
+            lines.append(f"{number}. {text.upper()}")
+        return "\n".join(lines)
+
+    def generate_structured(self, prompt: str, schema: dict) -> str:
+        text = prompt.split('Text: "', 1)[1].split('"\n', 1)[0]
+        return '{"transliteration": "%s"}' % text.upper()
+
+
+DOCUMENT = (
+    "  Chapter one\n\n"
+    "The first line. The second sentence is here!   \n"
+    "\tIndented line\n"
+    "\f\n"
+    + " ".join(f"word{i}." for i in range(300))
+    + "\n\nLast paragraph  \n"
+)
+
+
+def test_split_document_round_trips_layout():
+    segments, chunks = split_document(DOCUMENT, max_chars=120)
+
+    assert "".join(value for _, value in segments) == DOCUMENT
+    assert len(chunks) > 3
+    assert all(chunk.size <= 120 for chunk in chunks)
+
+
+def test_document_is_reassembled_in_order_with_layout():
+    llm = UpperCaseLLM(flaky_item="Indented line")
+    pipeline = DocumentPipeline(TransliterationService(llm_client=llm), max_chars=120, parallelism=4)
+
+    result = pipeline.transliterate_document(DOCUMENT, "Latn", "Latn")
+
+    assert result["transliteration"] == DOCUMENT.upper()
+    assert result["chunks"] > 3
+    # the flaky chunk was retried on its own, not the whole document
+    assert llm.calls <= result["chunks"] + 1
+
+
+def test_unordered_stream_yields_every_chunk_once():
+    pipeline = DocumentPipeline(TransliterationService(llm_client=UpperCaseLLM()), max_chars=120)
+
+    chunks = list(pipeline.iter_chunks(DOCUMENT, "Latn", "Latn", ordered=False))
+
+    assert sorted(c["index"] for c in chunks) == list(range(chunks[0]["total"]))
+    ordered = "".join(c["text"] for c in sorted(chunks, key=lambda c: c["index"]))
+    assert ordered == DOCUMENT.upper()
+
+
+class ScriptedLLM(LLMClient):
+    """Answers each numbered prompt with a callable of the prompt's items; records the prompts."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+
+    def generate(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        items = [line.split(". ", 1)[1] for line in
+                 prompt.split("Items:\n", 1)[1].split("\nReply with", 1)[0].splitlines()]
+        return self.answer(len(self.prompts), items)
+
+
+LINES = "one\ntwo\nthree\nfour\n"
+
+
+def test_retry_asks_only_for_missing_items_and_keeps_earlier_answers():
+    def answer(call, items):
+        # First call: only the first two items; the retry completes the rest
+        keep = items[:2] if call == 1 else items
+        return "\n".join(f"{n}. {text.upper()}" for n, text in enumerate(keep, start=1))
+
+    llm = ScriptedLLM(answer)
+    pipeline = DocumentPipeline(TransliterationService(llm_client=llm), backoff=0)
+
+    assert pipeline.transliterate_document(LINES, "Latn", "Latn")["transliteration"] == LINES.upper()
+    assert len(llm.prompts) == 2
+    assert "1. three\n2. four\n" in llm.prompts[1]
+
+
+def test_overload_and_outages_are_not_retried_unit_by_unit():
+    # The class the pipeline itself imported (the backend modules import each other top-level)
+    from backend.transliteration.document_pipeline import LLMOverloadedError
+
+    def overloaded(call, items):
+        raise LLMOverloadedError("busy", 429, 1)
+
+    def down(call, items):
+        raise RuntimeError("connection refused")
+
+    llm = ScriptedLLM(overloaded)
+    with pytest.raises(LLMOverloadedError):
+        DocumentPipeline(TransliterationService(llm_client=llm), backoff=0).transliterate_document(LINES, "Latn", "Latn")
+    assert len(llm.prompts) == 1
+
+    llm = ScriptedLLM(down)
+    with pytest.raises(RuntimeError):
+        DocumentPipeline(TransliterationService(llm_client=llm), retries=2, backoff=0).transliterate_document(
+            LINES, "Latn", "Latn"
+        )
+    # One chunk, three attempts, no per-unit fallback calls
+    assert len(llm.prompts) == 3
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded on first use only (OCR, model clients); importing the app must not pull them in
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "pytesseract", "pdfplumber", "ollama")
+# Import cost of the app's own modules on top of FastAPI itself
+IMPORT_BUDGET_MS = 200
+
+PROBE = """
+import json, sys
+import main
+import api.dependencies
+print(json.dumps({
+    "heavy": [m for m in %r if m in sys.modules],
+    "services_built": api.dependencies._services is not None,
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_probe():
+    env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if total.strip().isdigit():
+            # First (outermost) import of a module is the one that paid for it
+            cumulative.setdefault(name.strip(), int(total) / 1000)
+    return json.loads(result.stdout.strip().splitlines()[-1]), cumulative
+
+
+def test_importing_app_is_lazy_and_within_budget():
+    probe, cumulative = run_probe()
+
+    assert probe["heavy"] == []
+    assert probe["services_built"] is False
+    app_ms = cumulative["main"] - cumulative.get("fastapi", 0.0)
+    assert app_ms < IMPORT_BUDGET_MS, f"importing main took {app_ms:.0f} ms beyond FastAPI"
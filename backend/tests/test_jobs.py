@@ -0,0 +1,268 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+
+from backend.api import jobs as api_jobs
+from backend.jobs import job_queue
+from backend.jobs.job_queue import JobHandler, JobQueue, JobStore, COMPLETED, CANCELLED, FAILED
+from backend.transliteration.document_pipeline import DocumentPipeline
+from backend.transliteration.micro_batcher import MicroBatcher
+from backend.transliteration.transliteration_service import TransliterationService, LLMClient
+
+
+class UpperJob(JobHandler):
+    """Upper-cases params["texts"]; optionally blocks before item `block_at` or fails on it."""
+
+    def __init__(self, block_at=None, fail_at=None):
+        self.block_at = block_at
+        self.fail_at = fail_at
+        self.release = threading.Event()
+        self.blocked = threading.Event()
+        self.seen = []
+
+    def count(self, params, job_dir):
+        return len(params["texts"])
+
+    def run(self, params, job_dir, indices):
+        for idx in indices:
+            if idx == self.block_at:
+                self.blocked.set()
+                self.release.wait(5)
+            if idx == self.fail_at:
+                raise RuntimeError("model unavailable")
+            self.seen.append(idx)
+            yield idx, {"text": params["texts"][idx].upper()}
+
+
+def make_queue(tmp_path, handler):
+    return JobQueue(JobStore(tmp_path / "jobs.sqlite3"), {"upper": handler}, workers=1, jobs_dir=tmp_path)
+
+
+def test_job_reports_progress_and_results(tmp_path):
+    queue = make_queue(tmp_path, UpperJob())
+    queue.start()
+    job_id = queue.submit("upper", {"texts": ["a", "b", "c"]}, files={"input": b"data"})
+
+    job = queue.wait(job_id)
+    queue.stop()
+
+    assert job["status"] == COMPLETED
+    assert (job["total"], job["completed"]) == (3, 3)
+    assert queue.store.results(job_id, after=0) == [(1, {"text": "B"}), (2, {"text": "C"})]
+    assert (tmp_path / job_id / "input").read_bytes() == b"data"
+
+
+def test_cancel_stops_running_job(tmp_path):
+    handler = UpperJob(block_at=1)
+    queue = make_queue(tmp_path, handler)
+    queue.start()
+    job_id = queue.submit("upper", {"texts": ["a", "b", "c"]})
+    assert handler.blocked.wait(5)
+
+    assert queue.cancel(job_id)
+    handler.release.set()
+    job = queue.wait(job_id)
+    queue.stop()
+
+    assert job["status"] == CANCELLED
+    assert handler.seen == [0, 1]
+    assert not queue.cancel(job_id)
+
+
+def test_interrupted_job_resumes_from_unfinished_items(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    job_id = store.create("upper", {"texts": ["a", "b", "c"]})
+    # A previous process finished item 0 and died while running
+    store.update(job_id, status="running", total=3)
+    store.add_result(job_id, 0, {"text": "A"})
+
+    handler = UpperJob()
+    queue = JobQueue(JobStore(tmp_path / "jobs.sqlite3"), {"upper": handler}, workers=1, jobs_dir=tmp_path)
+    queue.start()
+    job = queue.wait(job_id)
+    queue.stop()
+
+    assert job["status"] == COMPLETED
+    assert handler.seen == [1, 2]
+    assert [r["text"] for _, r in queue.store.results(job_id)] == ["A", "B", "C"]
+
+
+def test_failed_job_keeps_partial_results(tmp_path):
+    queue = make_queue(tmp_path, UpperJob(fail_at=2))
+    queue.start()
+    job_id = queue.submit("upper", {"texts": ["a", "b", "c"]})
+    job = queue.wait(job_id)
+    queue.stop()
+
+    assert job["status"] == FAILED
+    assert job["error"] == "model unavailable"
+    assert job["completed"] == 2
+
+
+class SlowFinishJob(UpperJob):
+    """Blocks after yielding its last item, before the worker marks the job done."""
+
+    def run(self, params, job_dir, indices):
+        yield from super().run(params, job_dir, indices)
+        self.blocked.set()
+        self.release.wait(5)
+        if self.fail_at is not None:
+            raise RuntimeError("model unavailable")
+
+
+def test_cancel_after_last_item_is_not_overwritten(tmp_path):
+    for handler in (SlowFinishJob(), SlowFinishJob(fail_at=-1)):
+        queue = make_queue(tmp_path, handler)
+        queue.start()
+        job_id = queue.submit("upper", {"texts": ["a", "b"]})
+        assert handler.blocked.wait(5)
+
+        assert queue.cancel(job_id)
+        handler.release.set()
+        queue._queue.join()
+        queue.stop()
+
+        assert queue.store.get(job_id)["status"] == CANCELLED
+
+
+class OverloadedOnceJob(UpperJob):
+    """Sheds item `fail_at` with LLMOverloadedError the first `times` runs."""
+
+    def __init__(self, fail_at, times=1):
+        super().__init__()
+        self.overload_at = fail_at
+        self.times = times
+
+    def run(self, params, job_dir, indices):
+        for idx, result in super().run(params, job_dir, indices):
+            if idx == self.overload_at and self.times:
+                self.times -= 1
+                raise job_queue.LLMOverloadedError("LLM queue for batch requests is full", 429, 0)
+            yield idx, result
+
+
+def test_overloaded_job_is_requeued_and_keeps_finished_items(tmp_path):
+    handler = OverloadedOnceJob(fail_at=1)
+    queue = JobQueue(JobStore(tmp_path / "jobs.sqlite3"), {"upper": handler}, workers=1, jobs_dir=tmp_path,
+                     retry_backoff=0.01)
+    queue.start()
+    job_id = queue.submit("upper", {"texts": ["a", "b", "c"]})
+    job = queue.wait(job_id)
+    queue.stop()
+
+    assert job["status"] == COMPLETED
+    assert job["error"] is None
+    # Item 0 was stored before the overload and not redone; item 1 was retried
+    assert handler.seen == [0, 1, 1, 2]
+
+
+def test_job_fails_once_overload_retries_are_exhausted(tmp_path):
+    handler = OverloadedOnceJob(fail_at=0, times=10)
+    queue = JobQueue(JobStore(tmp_path / "jobs.sqlite3"), {"upper": handler}, workers=1, jobs_dir=tmp_path,
+                     retry_backoff=0.01, max_retries=2)
+    queue.start()
+    job_id = queue.submit("upper", {"texts": ["a"]})
+    job = queue.wait(job_id)
+    queue.stop()
+
+    assert job["status"] == FAILED
+    assert "queue for batch requests is full" in job["error"]
+    assert handler.times == 7
+
+
+class UpperLLM(LLMClient):
+    """Answers numbered batch prompts and single prompts by upper-casing the text."""
+
+    def generate(self, prompt: str) -> str:
+        if "Items:" not in prompt:
+            text = prompt.split('Text: "', 1)[1].split('"', 1)[0]
+            return '{"transliteration": "%s"}' % text.upper()
+        items = prompt.split("Items:\n", 1)[1].split("\nReply with", 1)[0].splitlines()
+        return "\n".join(f"{number}. {text.upper()}" for number, text in (line.split(". ", 1) for line in items))
+
+
+def make_services():
+    service = TransliterationService(llm_client=UpperLLM())
+    return SimpleNamespace(
+        transliteration=service,
+        micro_batcher=MicroBatcher(service),
+        document_pipeline=DocumentPipeline(service, max_chars=20),
+    )
+
+
+def test_transliteration_job_resumes_by_chunk():
+    services = make_services()
+    handler = api_jobs.TransliterationJob(services)
+    params = {"text": "one two three.\n\nfour five six.\n\nseven eight.", "source_script": "Latn",
+              "target_script": "Latn"}
+
+    total = handler.count(params, None)
+    rest = dict(handler.run(params, None, list(range(1, total))))
+    first = dict(handler.run(params, None, [0]))
+
+    assert total > 1 and sorted(rest) == list(range(1, total))
+    assert "".join({**first, **rest}[i]["text"] for i in range(total)) == params["text"].upper()
+
+
+def test_batch_job_groups_by_detected_script():
+    handler = api_jobs.BatchJob(make_services())
+    params = {"texts": ["alpha", "beta", "gamma"], "target_script": "Latn"}
+
+    results = dict(handler.run(params, None, [2, 0]))
+
+    assert handler.count(params, None) == 3
+    assert sorted(results) == [0, 2]
+    assert results[0]["transliteration"] == "ALPHA"
+    assert results[2]["transliteration"] == "GAMMA"
+
+
+def test_ocr_job_transliterates_image_and_pdf_pages(tmp_path, monkeypatch):
+    handler = api_jobs.OCRJob(make_services())
+    (tmp_path / api_jobs.INPUT_FILE).write_bytes(b"data")
+    monkeypatch.setattr(api_jobs, "extract_text_from_bytes", lambda data: {"text": "scanned"})
+    monkeypatch.setattr(api_jobs, "pdf_page_count", lambda path: 3)
+    monkeypatch.setattr(api_jobs, "iter_pdf_pages",
+                        lambda path, lang=None, pages=None: [(i, f"page {i}" if i else " ") for i in pages])
+
+    image = {"filename": "photo.jpg", "target_script": "Latn", "source_script": "Latn"}
+    pdf = {"filename": "book.PDF", "target_script": "Latn", "source_script": "Latn"}
+
+    assert handler.count(image, tmp_path) == 1
+    assert list(handler.run(image, tmp_path, [0])) == [
+        (0, {"page": 0, "text": "scanned", "transliteration": "SCANNED"})]
+    assert handler.count(pdf, tmp_path) == 3
+    # Blank pages are returned without a transliteration
+    assert list(handler.run(pdf, tmp_path, [0, 2])) == [
+        (0, {"page": 0, "text": " "}), (2, {"page": 2, "text": "page 2", "transliteration": "PAGE 2"})]
+
+
+def test_stream_sends_results_past_after_then_status(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    job_id = store.create("upper", {"texts": ["a", "b", "c"]})
+    for idx in (2, 0, 1):
+        store.add_result(job_id, idx, {"text": "abc"[idx].upper()})
+    store.update(job_id, status=COMPLETED, total=3)
+
+    app = FastAPI()
+    app.include_router(api_jobs.jobs_router)
+    services = SimpleNamespace(job_queue=JobQueue(store, {"upper": UpperJob()}, jobs_dir=tmp_path))
+    app.dependency_overrides[api_jobs.get_services] = lambda: services
+
+    async def stream():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(f"/jobs/{job_id}/stream", params={"after": 0})
+            return [json.loads(line) for line in response.text.splitlines()]
+
+    loop = asyncio.new_event_loop()
+    try:
+        lines = loop.run_until_complete(stream())
+    finally:
+        loop.close()
+
+    assert lines == [{"index": 1, "text": "B"}, {"index": 2, "text": "C"},
+                     {"status": COMPLETED, "completed": 3, "total": 3, "error": None}]
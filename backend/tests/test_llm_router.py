@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.llm.router import Backend, LLMRouter, NoHealthyBackendError, router_from_env
+from backend.llm.scheduler import LLMScheduler
+from backend.transliteration.transliteration_service import LLMClient
+
+
+class FakeServer(LLMClient):
+    """Stands in for one model server: fixed latency, optional failures."""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.model = "fake"
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return f"{self.name}:{prompt}"
+
+
+def make_router(*servers, **kwargs):
+    return LLMRouter([Backend(s.name, s) for s in servers], **kwargs)
+
+
+def test_fails_over_and_ejects_unhealthy_backend():
+    bad, good = FakeServer("bad", fail=True), FakeServer("good", delay=0.005)
+    router = make_router(bad, good, max_failures=2, eject_seconds=60, hedge=False)
+
+    assert all(router.generate("x").startswith("good:") for _ in range(5))
+
+    stats = router.stats()
+    assert stats["bad"]["healthy"] is False
+    assert stats["bad"]["ejections"] == 1
+    # Once ejected, the bad backend gets no more traffic
+    assert bad.calls == 2
+
+
+def test_ejected_backend_is_probed_after_cooldown():
+    flaky, good = FakeServer("flaky", fail=True), FakeServer("good", delay=0.01)
+    router = make_router(flaky, good, max_failures=1, eject_seconds=0.05, hedge=False)
+    router.generate("x")
+    assert router.stats()["flaky"]["healthy"] is False
+
+    flaky.fail = False
+    time.sleep(0.06)
+    assert router.generate("y") == "flaky:y"
+    assert router.stats()["flaky"]["healthy"] is True
+
+
+def test_prefers_faster_backend():
+    slow, fast = FakeServer("slow", delay=0.03), FakeServer("fast", delay=0.001)
+    router = make_router(slow, fast, hedge=False)
+    for _ in range(10):
+        router.generate("x")
+
+    assert fast.calls > slow.calls
+    assert router.stats()["fast"]["ewma_ms"] < router.stats()["slow"]["ewma_ms"]
+
+
+def make_hedging_router(scheduler):
+    primary, secondary = FakeServer("primary", delay=0.001), FakeServer("secondary", delay=0.001)
+    router = make_router(primary, secondary, hedge_min_samples=3, scheduler=scheduler)
+    backend = router.backends[0]
+    backend.latencies.extend([5.0] * 3)
+    backend.ewma_ms = 0.5
+    router.backends[1].ewma_ms = 1000.0
+    return router, primary, secondary
+
+
+def test_hedges_slow_request_to_other_backend():
+    router, primary, _ = make_hedging_router(LLMScheduler())
+
+    # The primary now stalls far beyond its p95, so the duplicate on the secondary wins
+    primary.delay = 0.5
+    started = time.monotonic()
+    assert router.generate("x") == "secondary:x"
+    assert time.monotonic() - started < 0.3
+    assert router.stats()["primary"]["hedges"] == 1
+
+
+def test_hedge_holds_a_scheduler_slot_until_the_loser_finishes():
+    scheduler = LLMScheduler(max_concurrency=2)
+    router, primary, _ = make_hedging_router(scheduler)
+    primary.delay = 0.3
+
+    # The caller holds one slot; the hedge takes the other until the stalled primary is done
+    with scheduler.slot():
+        assert router.generate("x") == "secondary:x"
+    assert scheduler.stats()["active"] == 1
+    time.sleep(0.4)
+    assert scheduler.stats()["active"] == 0
+    assert router.stats()["primary"]["in_flight"] == 0
+
+
+def test_no_hedge_without_a_spare_scheduler_slot():
+    scheduler = LLMScheduler(max_concurrency=1)
+    router, primary, secondary = make_hedging_router(scheduler)
+    primary.delay = 0.1
+
+    with scheduler.slot():
+        assert router.generate("x") == "primary:x"
+    assert secondary.calls == 0
+    assert router.stats()["primary"]["hedges"] == 0
+
+
+def test_all_backends_failing_raises():
+    router = make_router(FakeServer("a", fail=True), FakeServer("b", fail=True), hedge=False)
+    with pytest.raises(NoHealthyBackendError):
+        router.generate("x")
+
+
+def test_stream_fails_over_before_first_chunk():
+    router = make_router(FakeServer("down", fail=True), FakeServer("up"), hedge=False)
+
+    async def collect():
+        return [chunk async for chunk in router.stream_generate("hello")]
+
+    assert " ".join(asyncio.run(collect())) == "up:hello"
+
+
+class WordStreamer:
+    async def stream_generate(self, prompt):
+        for word in prompt.split():
+            yield word
+
+
+def test_abandoned_stream_releases_its_backend():
+    router = LLMRouter([Backend("probe", FakeServer("probe"), WordStreamer()),
+                        Backend("other", FakeServer("other"))], hedge=False)
+    backend = router.backends[0]
+    backend.ejected_until = time.monotonic() - 1
+
+    async def take_one():
+        stream = router.stream_generate("one two three")
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(take_one()) == "one"
+    finally:
+        loop.close()
+
+    assert (backend.in_flight, backend.probing) == (0, False)
+    # An abandoned stream is neither a failure nor a latency sample
+    assert (backend.failures, len(backend.latencies)) == (0, 0)
+
+
+def test_router_from_env(monkeypatch):
+    monkeypatch.delenv("LLM_BACKENDS", raising=False)
+    assert router_from_env() is None
+
+    monkeypatch.setenv("LLM_BACKENDS", "mistral@http://gpu1:11434, llama3")
+    router = router_from_env()
+    assert [b.name for b in router.backends] == ["mistral@http://gpu1:11434", "llama3"]
+    assert router.backends[0].client.host == "http://gpu1:11434"
+    assert router.backends[1].client.host is None
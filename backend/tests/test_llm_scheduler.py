@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.llm.scheduler import (
+    LLMScheduler, LLMOverloadedError, INTERACTIVE, SINGLE, BATCH,
+)
+
+
+def _wait_for_depth(scheduler, lane, depth):
+    deadline = time.monotonic() + 2
+    while scheduler.stats()["lanes"][lane]["queue_depth"] != depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_concurrency_cap_and_priority_order():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+    release = threading.Event()
+
+    def hold():
+        with scheduler.slot(SINGLE):
+            release.wait(2)
+
+    def worker(priority):
+        with scheduler.slot(priority):
+            order.append(priority)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    deadline = time.monotonic() + 2
+    while scheduler.stats()["active"] != 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+    threads = []
+    for priority in (BATCH, SINGLE, INTERACTIVE):
+        t = threading.Thread(target=worker, args=(priority,))
+        t.start()
+        threads.append(t)
+        _wait_for_depth(scheduler, priority, 1)
+
+    release.set()
+    for t in [holder] + threads:
+        t.join(2)
+
+    assert order == [INTERACTIVE, SINGLE, BATCH]
+    stats = scheduler.stats()
+    assert stats["active"] == 0
+    assert stats["lanes"][BATCH]["max_wait_ms"] > 0
+
+
+def test_full_lane_is_rejected_with_429():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue={BATCH: 0})
+
+    with pytest.raises(LLMOverloadedError) as exc:
+        with scheduler.slot(BATCH):
+            pass
+
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after >= 1
+    assert scheduler.stats()["lanes"][BATCH]["rejected"] == 1
+
+
+def test_queue_deadline_returns_503_and_frees_lane():
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def run():
+        async with scheduler.slot_async(INTERACTIVE):
+            with pytest.raises(LLMOverloadedError) as exc:
+                async with scheduler.slot_async(INTERACTIVE, timeout=0.05):
+                    pass
+            assert exc.value.status_code == 503
+        # the slot is free again once the holder leaves
+        async with scheduler.slot_async(INTERACTIVE, timeout=0.05):
+            pass
+
+    asyncio.run(run())
+    lanes = scheduler.stats()["lanes"]
+    assert lanes[INTERACTIVE]["timed_out"] == 1
+    assert lanes[INTERACTIVE]["queue_depth"] == 0
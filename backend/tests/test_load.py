@@ -0,0 +1,75 @@
+import asyncio
+
+from backend.benchmarks.load import (
+    Sample, Target, Workload, meets_slo, parse_mix, percentile, run_step, summarize,
+)
+
+
+def run(coro):
+    # A private loop: asyncio.run() would leave later tests without a current event loop
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def make_sample(scenario, latency, error=None, ttfc=None):
+    sample = Sample(scenario, 0.0)
+    sample.latency, sample.error, sample.ttfc = latency, error, ttfc
+    return sample
+
+
+def test_percentiles_and_summary():
+    assert percentile([0.3, 0.1, 0.2, 0.4], 50) == 0.2
+    assert percentile(list(range(1, 101)), 99) == 99
+    samples = [make_sample("text", i / 1000) for i in range(1, 100)]
+    samples += [make_sample("text", 5.0, error="HTTP 503"), make_sample("chat", 0.4, ttfc=0.1)]
+
+    report = summarize(samples, elapsed=10.0)
+
+    assert report["overall"]["requests"] == 101
+    assert report["scenarios"]["text"]["error_rate"] == 0.01
+    assert report["scenarios"]["text"]["latency_ms"]["p99"] == 99.0
+    assert report["scenarios"]["chat"]["ttfc_ms"]["p50"] == 100.0
+    assert report["top_errors"] == {"HTTP 503": 1}
+    assert meets_slo(report, p99_ms=150, error_rate=0.01)
+    assert not meets_slo(report, p99_ms=50, error_rate=0.01)
+
+
+def test_closed_loop_against_app_with_fake_llm(load_app, tmp_path):
+    app = load_app(llm_ttft=0.0, llm_tps=0.0, llm_concurrency=4)
+
+    async def step():
+        target = Target(app=app)
+        try:
+            return await run_step(target, Workload(), parse_mix("text=1,detect=1,chat=1"), users=3, duration=0.5)
+        finally:
+            await target.aclose()
+
+    report = run(step())
+
+    assert report["load"] == {"users": 3}
+    assert report["overall"]["errors"] == 0, report["top_errors"]
+    assert set(report["scenarios"]) == {"text", "detect", "chat"}
+    assert "ttfc_ms" in report["scenarios"]["chat"]
+    # The services' stores were created under tmp_path, not backend/data
+    assert (tmp_path / "word_memory.sqlite3").exists()
+    assert (tmp_path / "jobs" / "jobs.sqlite3").exists()
+
+
+def test_open_loop_arrivals_follow_rate(load_app):
+    app = load_app()
+
+    async def step():
+        target = Target(app=app)
+        try:
+            return await run_step(target, Workload(), parse_mix("detect"), rate=100, duration=0.5)
+        finally:
+            await target.aclose()
+
+    report = run(step())
+
+    # ~50 Poisson arrivals expected
+    assert 20 <= report["overall"]["requests"] <= 100
+    assert report["overall"]["error_rate"] == 0.0
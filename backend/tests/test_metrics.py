@@ -0,0 +1,55 @@
+import pytest
+
+from backend.observability import metrics
+from backend.observability.metrics import Histogram, server_timing_header
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("demo_seconds", "Demo.", labels=("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, "ocr")
+    hist.observe(0.5, "ocr")
+    hist.observe(3.0, "ocr")
+
+    lines = hist.render()
+
+    assert 'demo_seconds_bucket{stage="ocr",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="ocr",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="ocr",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{stage="ocr"} 3.55' in lines
+    assert 'demo_seconds_count{stage="ocr"} 3' in lines
+
+
+def test_stage_records_duration_and_errors():
+    before = metrics.STAGE_SECONDS.snapshot().get(("test.fail",), {"count": 0})["count"]
+
+    with pytest.raises(ValueError):
+        with metrics.stage("test.fail"):
+            raise ValueError("boom")
+
+    assert metrics.STAGE_SECONDS.snapshot()[("test.fail",)]["count"] == before + 1
+    assert 'stage_errors_total{stage="test.fail"}' in metrics.registry.render()
+
+
+def test_request_collects_stages_for_server_timing():
+    token = metrics.begin_request()
+    metrics.record_stage("llm.queue", 0.002)
+    with metrics.stage("llm.generate"):
+        pass
+    metrics.record_stage("llm.queue", 0.003)
+    stages = metrics.end_request(token)
+
+    assert [name for name, _ in stages] == ["llm.queue", "llm.generate", "llm.queue"]
+    assert server_timing_header(stages).startswith("llm_queue;dur=5.0, llm_generate;dur=")
+    # Outside a request nothing is collected
+    metrics.record_stage("llm.queue", 0.001)
+    assert metrics._request_stages.get() is None
+
+
+def test_disabled_metrics_are_a_noop(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+
+    with metrics.stage("test.disabled"):
+        pass
+    metrics.record_stage("test.disabled", 1.0)
+
+    assert ("test.disabled",) not in metrics.STAGE_SECONDS.snapshot()
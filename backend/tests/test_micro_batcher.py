@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.llm.scheduler import LLMOverloadedError
+
+from backend.transliteration.transliteration_service import TransliterationService, LLMClient
+from backend.transliteration.micro_batcher import MicroBatcher
+
+
+class NumberedLLM(LLMClient):
+    """Answers numbered batch prompts by upper-casing each item; single prompts as JSON."""
+
+    def __init__(self, drop=()):
+        self.prompts = []
+        self.drop = set(drop)
+
+    def generate(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        if "Items:" not in prompt:
+            text = prompt.split('Text: "', 1)[1].split('"', 1)[0]
+            return '{"transliteration": "%s"}' % text.upper()
+        items = prompt.split("Items:\n", 1)[1].split("\nReply with", 1)[0].splitlines()
+        lines = ["Sure, here are the results:"]
+        for line in items:
+            number, text = line.split(". ", 1)
+            if text not in self.drop:
+                lines.append(f"{number}. {text.upper()}")
+        return "\n".join(lines)
+
+
+def test_transliterate_many_packs_items_and_preserves_order():
+    llm = NumberedLLM()
+    batcher = MicroBatcher(TransliterationService(llm_client=llm), max_items=4)
+    texts = [f"word {i}" for i in range(10)]
+
+    results = batcher.transliterate_many(texts, "Latn", "Latn")
+
+    assert [r["transliteration"] for r in results] == [t.upper() for t in texts]
+    assert len(llm.prompts) == 3
+    assert batcher.stats["batched_items"] == 10
+
+
+def test_unparsed_items_fall_back_to_single_calls():
+    llm = NumberedLLM(drop={"beta"})
+    batcher = MicroBatcher(TransliterationService(llm_client=llm))
+
+    results = batcher.transliterate_many(["alpha", "beta", "gamma"], "Latn", "Latn")
+
+    assert [r["transliteration"] for r in results] == ["ALPHA", "BETA", "GAMMA"]
+    assert all(r["explanation"] is None for r in results)
+    assert batcher.stats["fallbacks"] == 1
+    assert len(llm.prompts) == 2
+
+
+def test_concurrent_callers_within_window_share_a_prompt():
+    llm = NumberedLLM()
+    batcher = MicroBatcher(TransliterationService(llm_client=llm), window=0.5, max_items=8)
+    texts = [f"phrase {i}" for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda t: batcher.transliterate(t, "Latn", "Latn"), texts))
+
+    assert [r["transliteration"] for r in results] == [t.upper() for t in texts]
+    assert len(llm.prompts) == 1
+
+
+def test_overloaded_batch_is_raised_not_split_into_single_calls():
+    class OverloadedLLM(NumberedLLM):
+        def generate(self, prompt):
+            self.prompts.append(prompt)
+            raise LLMOverloadedError("LLM queue for batch requests is full", 429, 3)
+
+    llm = OverloadedLLM()
+    batcher = MicroBatcher(TransliterationService(llm_client=llm), max_items=4)
+
+    with pytest.raises(LLMOverloadedError):
+        batcher.transliterate_many([f"word {i}" for i in range(10)], "Latn", "Latn")
+
+    assert len(llm.prompts) == 1
+    assert batcher.snapshot()["fallbacks"] == 0
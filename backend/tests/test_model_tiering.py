@@ -0,0 +1,95 @@
+from backend.llm.tiering import ModelTiers, TierPolicy, valid_transliteration
+from backend.transliteration.transliteration_service import TransliterationService, LLMClient
+from backend.transliteration.translation_service import TranslationService
+
+
+class NamedLLM(LLMClient):
+    def __init__(self, model: str, response: str):
+        self.model = model
+        self.response = response
+        self.calls = 0
+
+    def generate(self, prompt: str) -> str:
+        self.calls += 1
+        return self.response
+
+
+def test_policy_scores_difficulty():
+    policy = TierPolicy()
+    easy = policy.transliteration_score("Αθήνα", "Grek", "Latn", None, "none")
+    hard = policy.transliteration_score("مرحبا بالعالم", "Arab", "Latn", "a greeting", "full")
+
+    assert policy.tier(easy) == "small"
+    assert policy.tier(hard) == "large"
+
+
+def test_valid_transliteration_checks_target_script_and_length():
+    assert valid_transliteration("Αθήνα", "Athina", "Latn")
+    assert not valid_transliteration("Αθήνα", "Αθήνα", "Latn")
+    assert not valid_transliteration("Αθήνα", "", "Latn")
+    assert not valid_transliteration("Αθήνα", "Athina " * 20, "Latn")
+
+
+def test_easy_request_uses_small_model():
+    small = NamedLLM("small", '{"transliteration": "Athina"}')
+    large = NamedLLM("large", '{"transliteration": "Athína"}')
+    tiers = ModelTiers(small)
+    svc = TransliterationService(llm_client=large, tiers=tiers)
+
+    result = svc.transliterate("Αθήνα", "Grek", "Latn", explain="none")
+
+    assert result["transliteration"] == "Athina"
+    assert (small.calls, large.calls) == (1, 0)
+    assert tiers.stats()["tiers"]["small"]["calls"] == 1
+
+
+def test_invalid_small_output_escalates():
+    # The small model echoes the Greek input instead of transliterating it
+    small = NamedLLM("small", '{"transliteration": "Αθήνα"}')
+    large = NamedLLM("large", '{"transliteration": "Athina"}')
+    tiers = ModelTiers(small)
+    svc = TransliterationService(llm_client=large, tiers=tiers)
+
+    result = svc.transliterate("Αθήνα", "Grek", "Latn", explain="none")
+
+    assert result["transliteration"] == "Athina"
+    assert (small.calls, large.calls) == (1, 1)
+    assert tiers.stats()["escalations"] == 1
+    assert tiers.stats()["escalation_rate"] == 1.0
+
+
+def test_unparseable_small_output_escalates():
+    # Chatter around a plausible Latin answer must not count as a valid small-tier result
+    small = NamedLLM("small", "Sure: dobroe utro drug")
+    large = NamedLLM("large", '{"transliteration": "dobroe utro, drug"}')
+    tiers = ModelTiers(small)
+    svc = TransliterationService(llm_client=large, tiers=tiers)
+
+    result = svc.transliterate("доброе утро, друг", "Cyrl", "Latn", explain="none")
+
+    assert result["transliteration"] == "dobroe utro, drug"
+    # One call plus one repair attempt on the small model, then the large model
+    assert (small.calls, large.calls) == (2, 1)
+    assert tiers.stats()["escalations"] == 1
+
+
+def test_hard_request_goes_straight_to_large_model():
+    small = NamedLLM("small", "{}")
+    large = NamedLLM("large", '{"transliteration": "marhaban", "explanation": "Standard romanization."}')
+    svc = TransliterationService(llm_client=large, tiers=ModelTiers(small))
+
+    svc.transliterate("مرحبا", "Arab", "Latn", context="a greeting", explain="full")
+
+    assert (small.calls, large.calls) == (0, 1)
+
+
+def test_translation_escalates_missing_explanation():
+    small = NamedLLM("small", '{"translation": "hello", "explanation": ""}')
+    large = NamedLLM("large", '{"translation": "hello", "explanation": "Common greeting."}')
+    tiers = ModelTiers(small, TierPolicy(max_small_score=3))
+    svc = TranslationService(llm_client=large, tiers=tiers)
+
+    result = svc.translate("hola", "Spanish", "English")
+
+    assert result["explanation"] == "Common greeting."
+    assert tiers.stats()["escalations"] == 1
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+from backend.llm.warmup import ModelWarmer, models_to_warm, WARM, IDLE, FAILED, SKIPPED
+from backend.transliteration.transliteration_service import LLMClient
+
+
+class CountingLLM(LLMClient):
+    def __init__(self, model: str = "fake", fail: bool = False):
+        self.model = model
+        self.fail = fail
+        self.pings = 0
+
+    def generate(self, prompt: str) -> str:
+        self.pings += 1
+        if self.fail:
+            raise RuntimeError("model not found")
+        return "OK"
+
+
+def test_warm_up_marks_models_ready():
+    small, large = CountingLLM("small"), CountingLLM("large")
+    warmer = ModelWarmer({"small": small, "large": large}, activity=lambda: 0)
+    assert not warmer.ready()
+
+    warmer.warm_up()
+
+    assert warmer.ready()
+    assert {s["state"] for s in warmer.status().values()} == {WARM}
+    assert (small.pings, large.pings) == (1, 1)
+
+
+def test_failed_model_is_not_ready_until_retried():
+    llm = CountingLLM(fail=True)
+    warmer = ModelWarmer({"fake": llm}, activity=lambda: 0)
+    warmer.warm_up()
+    assert not warmer.ready()
+    assert warmer.status()["fake"]["state"] == FAILED
+
+    llm.fail = False
+    warmer.tick()
+    assert warmer.ready()
+
+
+def test_idle_policy_stops_pings_until_traffic_returns():
+    llm = CountingLLM()
+    traffic = {"calls": 0}
+    warmer = ModelWarmer({"fake": llm}, idle_after=0.01, activity=lambda: traffic["calls"])
+    warmer.warm_up()
+    warmer.tick()
+    assert llm.pings == 2
+
+    warmer._last_activity -= 1  # pretend a quiet period passed
+    warmer.tick()
+    assert llm.pings == 2
+    assert warmer.status()["fake"]["state"] == IDLE
+    # Idle models still count as ready: the next request reloads them
+    assert warmer.ready()
+
+    traffic["calls"] += 1
+    warmer.tick()
+    assert llm.pings == 3
+    assert warmer.status()["fake"]["state"] == WARM
+
+
+def test_models_to_warm_includes_small_tier():
+    class Tiers:
+        small = CountingLLM("qwen")
+
+    assert set(models_to_warm(CountingLLM("mistral"), Tiers())) == {"mistral", "qwen"}
+
+
+def test_disabled_warm_up_reports_ready_without_pinging(monkeypatch):
+    from main import app
+    from api.dependencies import get_services
+
+    monkeypatch.setenv("LLM_WARMUP", "0")
+    llm = CountingLLM("mistral")
+    warmer = ModelWarmer.from_env({"mistral": llm})
+    warmer.start()
+
+    app.dependency_overrides[get_services] = lambda: SimpleNamespace(warmer=warmer)
+
+    async def get_ready():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ready")
+
+    loop = asyncio.new_event_loop()
+    try:
+        response = loop.run_until_complete(get_ready())
+    finally:
+        loop.close()
+        app.dependency_overrides.pop(get_services, None)
+
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+    assert response.json()["models"]["mistral"]["state"] == SKIPPED
+    assert llm.pings == 0
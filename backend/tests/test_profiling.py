@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import Counter
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend.main import profile_request
+from backend.observability import metrics
+
+# The app (and metrics) import the profiler as `observability.profiling`
+profiling = metrics.profiling
+
+
+def burn(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def profiled_app(tmp_path, monkeypatch, **options):
+    options = {"interval": 0.001, "min_interval": 0, "token": "secret", **options}
+    monkeypatch.setattr(profiling, "profiler", profiling.Profiler(tmp_path, **options))
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    app = FastAPI()
+    app.middleware("http")(profile_request)
+
+    @app.get("/work")
+    def work():
+        # Runs in the thread pool; entering a stage attaches the worker thread to the capture
+        with metrics.stage("test.work"):
+            burn(0.2)
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_profiled_request_captures_worker_thread(tmp_path, monkeypatch):
+    client = profiled_app(tmp_path, monkeypatch)
+
+    response = client.get("/work", headers={"X-Profile": "secret"})
+
+    capture_id = response.headers["X-Profile-Id"]
+    summary = profiling.profiler.captures()[0]
+    assert summary["id"] == capture_id
+    assert summary["request"] == "GET /work"
+    assert summary["samples"] > 10
+    assert any(frame["frame"].startswith("burn (") for frame in summary["top_frames"][:3])
+    folded = profiling.profiler.folded(capture_id)
+    assert folded.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+    assert "work (" in folded
+
+
+def test_requests_without_token_are_not_profiled(tmp_path, monkeypatch):
+    client = profiled_app(tmp_path, monkeypatch)
+
+    assert "X-Profile-Id" not in client.get("/work").headers
+    assert "X-Profile-Id" not in client.get("/work", headers={"X-Profile": "wrong"}).headers
+    assert profiling.profiler.captures() == []
+    # Non-ASCII tokens (e.g. from ?profile=) are refused, not a TypeError
+    assert "X-Profile-Id" not in client.get("/work", params={"profile": "sécret"}).headers
+    assert not profiling.profiler.authorized("sécret")
+
+
+def test_stop_waits_for_the_sampler(tmp_path):
+    profiler = profiling.Profiler(tmp_path, interval=0.001, min_interval=0, token="secret")
+    capture, status = profiler.start("GET /work")
+    burn(0.05)
+
+    summary = profiler.stop(capture)
+
+    assert status == "started"
+    assert not capture._sampler.is_alive()
+    assert summary["samples"] + summary["idle_samples"] == sum(capture.stacks.values()) + capture.idle
+
+
+def test_capture_stops_itself_after_max_seconds(tmp_path):
+    profiler = profiling.Profiler(tmp_path, interval=0.001, min_interval=0, max_seconds=0.05, token="secret")
+    capture, _ = profiler.start("GET /stuck")
+
+    capture._sampler.join(2)
+
+    assert capture.ended is not None
+    assert profiler.start("GET /work")[1] == "started"
+    assert [s["id"] for s in profiler.captures()] == [capture.id]
+    # A late stop from the request is a no-op
+    assert profiler.stop(capture) is None
+
+
+def test_client_disconnect_stops_the_capture(tmp_path, monkeypatch):
+    client = profiled_app(tmp_path, monkeypatch)
+
+    @client.app.get("/stream")
+    def stream():
+        async def chunks():
+            while True:
+                yield b"chunk"
+                await asyncio.sleep(0.01)
+
+        return StreamingResponse(chunks())
+
+    async def call():
+        sent = []
+        scope = {
+            "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream",
+            "root_path": "", "scheme": "http", "query_string": b"profile=secret", "headers": [],
+            "client": ("test", 1), "server": ("test", 80), "http_version": "1.1",
+        }
+
+        async def receive():
+            # The client goes away once some of the body has arrived
+            while len(sent) < 3:
+                await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        await client.app(scope, receive, send)
+        return sent
+
+    loop = asyncio.new_event_loop()
+    try:
+        sent = loop.run_until_complete(call())
+    finally:
+        loop.close()
+
+    assert sent[0]["type"] == "http.response.start"
+    assert profiling.profiler._current is None
+    assert len(profiling.profiler.captures()) == 1
+
+
+def test_captures_are_rate_limited_and_pruned(tmp_path, monkeypatch):
+    client = profiled_app(tmp_path, monkeypatch, min_interval=60, keep=1)
+
+    first = client.get("/work?profile=secret")
+    second = client.get("/work?profile=secret")
+
+    assert "X-Profile-Id" in first.headers
+    assert second.headers["X-Profile-Status"] == "rate-limited"
+    profiling.profiler.min_interval = 0
+    client.get("/work?profile=secret")
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_top_frames_ranks_by_self_samples():
+    stacks = Counter({"main;handler;parse": 6, "main;handler;ocr": 3, "main;handler": 1})
+
+    top = profiling.top_frames(stacks)
+
+    assert [f["frame"] for f in top] == ["parse", "ocr", "handler"]
+    assert top[0]["self_pct"] == 60.0
+    assert top[2]["inclusive_pct"] == 100.0
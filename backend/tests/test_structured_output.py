@@ -0,0 +1,83 @@
+import pytest
+
+from backend.llm.structured_output import IncrementalJSONParser, parse_structured
+from backend.transliteration.transliteration_service import (
+    TransliterationService, LLMClient, StructuredOutputError,
+)
+# the services import backend modules top-level, so read the counters they update from there
+from llm.structured_output import structured_stats
+
+FIELDS = ("transliteration", "explanation")
+
+
+class ScriptedLLM(LLMClient):
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+        self.schemas = []
+
+    def generate(self, prompt: str) -> str:
+        raise AssertionError("structured mode should use generate_structured")
+
+    def generate_structured(self, prompt: str, schema: dict) -> str:
+        self.prompts.append(prompt)
+        self.schemas.append(schema)
+        return self.responses.pop(0)
+
+
+def test_incremental_parser_emits_fields_while_streaming():
+    parser = IncrementalJSONParser()
+    chunks = ['Sure! {"translit', 'eration": "a|b \\"c\\"", "expl', 'anation": "pipes are', ' fine"}']
+
+    emitted = [parser.feed(c) for c in chunks]
+
+    assert emitted[1] == {"transliteration": 'a|b "c"'}
+    assert emitted[3] == {"explanation": "pipes are fine"}
+    assert parser.done
+
+
+def test_local_repair_handles_fences_trailing_commas_and_truncation():
+    assert parse_structured('```json\n{"transliteration": "x", "explanation": "y",}\n```', FIELDS) == {
+        "transliteration": "x", "explanation": "y",
+    }
+    assert parse_structured('{"transliteration": "x", "explanation": "cut o', FIELDS) == {
+        "transliteration": "x", "explanation": "cut o",
+    }
+
+
+def test_pipes_are_only_split_for_clients_without_json_output():
+    assert parse_structured("a|b", FIELDS) is None
+    assert parse_structured("a|b", FIELDS, legacy=True) == {"transliteration": "a", "explanation": "b"}
+    assert parse_structured('{"transliteration": "a|b", "explanation": "c"}', FIELDS) == {
+        "transliteration": "a|b", "explanation": "c",
+    }
+
+
+def test_service_uses_one_targeted_repair_and_counts_failures():
+    before = structured_stats.snapshot()
+    llm = ScriptedLLM("I think the answer is privet.", '{"transliteration": "privet", "explanation": "ok"}')
+    svc = TransliterationService(llm_client=llm)
+
+    result = svc.transliterate("привет", "Cyrl", "Latn")
+
+    assert result["transliteration"] == "privet"
+    assert len(llm.prompts) == 2
+    assert "could not be parsed" in llm.prompts[1]
+    assert llm.schemas[0]["required"] == list(FIELDS)
+
+    # Chatter is reported, not returned as the transliteration
+    llm = ScriptedLLM("no json here", "still no json")
+    with pytest.raises(StructuredOutputError) as error:
+        TransliterationService(llm_client=llm).transliterate("мир", "Cyrl", "Latn")
+    assert error.value.output == "no json here"
+    assert len(llm.prompts) == 2
+
+    # A JSON-capable client's "a|b" reply is not taken apart
+    llm = ScriptedLLM("mir|world", "mir|world")
+    llm.supports_json = True
+    with pytest.raises(StructuredOutputError):
+        TransliterationService(llm_client=llm).transliterate("мир", "Cyrl", "Latn")
+
+    after = structured_stats.snapshot()
+    assert after["repaired_by_llm"] == before["repaired_by_llm"] + 1
+    assert after["failed"] == before["failed"] + 2
@@ -0,0 +1,99 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.observability import metrics
+
+# The app (and metrics) import the tracing module as `observability.tracing`
+tracing = metrics.tracing
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = tracing.InMemoryExporter()
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer(sample_rate=1.0, exporter=exporter))
+    return exporter
+
+
+def test_stages_become_nested_spans(exporter):
+    with tracing.tracer.start_trace("request") as root:
+        with metrics.stage("ocr.pass1"):
+            with metrics.stage("ocr.threshold"):
+                pass
+        metrics.record_stage("llm.queue", 0.01)
+
+    spans = {s["name"]: s for s in exporter.traces()[0]}
+    assert set(spans) == {"request", "ocr.pass1", "ocr.threshold", "llm.queue"}
+    assert {s["traceId"] for s in spans.values()} == {root.trace_id}
+    assert spans["ocr.threshold"]["parentSpanId"] == spans["ocr.pass1"]["spanId"]
+    assert spans["llm.queue"]["parentSpanId"] == root.span_id
+    assert "parentSpanId" not in spans["request"]
+
+
+def test_failed_stage_marks_span_as_error(exporter):
+    with pytest.raises(RuntimeError):
+        with tracing.tracer.start_trace("request"):
+            with metrics.stage("llm.generate"):
+                raise RuntimeError("model crashed")
+
+    spans = {s["name"]: s for s in exporter.traces()[0]}
+    assert spans["llm.generate"]["status"] == {"code": tracing.STATUS_ERROR, "message": "RuntimeError: model crashed"}
+    assert spans["request"]["status"]["code"] == tracing.STATUS_ERROR
+
+
+def test_slow_traces_are_kept_when_not_sampled(monkeypatch):
+    exporter = tracing.InMemoryExporter()
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer(sample_rate=0.0, slow_ms=20, exporter=exporter))
+
+    with tracing.tracer.start_trace("fast"):
+        pass
+    with tracing.tracer.start_trace("slow"):
+        time.sleep(0.03)
+
+    assert [t[0]["name"] for t in exporter.traces()] == ["slow"]
+
+
+def test_file_exporter_writes_otlp_json_lines(tmp_path, monkeypatch):
+    path = tmp_path / "traces" / "spans.jsonl"
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer(sample_rate=1.0, exporter=tracing.FileExporter(str(path))))
+
+    for _ in range(2):
+        with tracing.tracer.start_trace("request", {"http.method": "POST"}):
+            with metrics.stage("detect_script"):
+                pass
+
+    documents = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(documents) == 2
+    spans = documents[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert {s["name"] for s in spans} == {"request", "detect_script"}
+    root = next(s for s in spans if s["name"] == "request")
+    assert root["attributes"] == [{"key": "http.method", "value": {"stringValue": "POST"}}]
+
+
+def test_http_request_and_chat_turn_are_traced_and_linked(exporter):
+    client = TestClient(app)
+
+    response = client.post("/detect-language", data={"text": "Привет мир"})
+    assert response.status_code == 200
+    request_spans = {s["name"]: s for s in exporter.traces()[0]}
+    assert "detect_script" in request_spans
+    root = request_spans["POST /detect-language"]
+
+    # A chat session created inside a traced request (as /transliterate does)
+    with tracing.tracer.start_trace("POST /transliterate") as origin:
+        tracing.remember("session-1")
+
+    with client.websocket_connect("/ws/chat") as ws:
+        ws.send_json({"type": "user", "session_id": "session-1", "text": "hello"})
+        while ws.receive_json()["partial"]:
+            pass
+
+    turn = next(s for s in exporter.traces()[0] if s["name"] == "chat.turn")
+    assert turn["links"] == [{"traceId": origin.trace_id, "spanId": origin.span_id}]
+    assert root["attributes"][1:] == [
+        {"key": "http.route", "value": {"stringValue": "/detect-language"}},
+        {"key": "http.status_code", "value": {"intValue": "200"}},
+    ]
@@ -39,3 +39,77 @@ def test_transliterate_parses_response_and_includes_context():
     # ensure context is present in the constructed prompt
     assert dummy.last_prompt is not None
     assert "Context: formal" in dummy.last_prompt
+
+
+class SlowCountingLLM(LLMClient):
+    def __init__(self, response: str, delay: float = 0.2, fail: bool = False):
+        self.response = response
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def generate(self, prompt: str) -> str:
+        import time
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return self.response
+
+
+def test_identical_concurrent_requests_share_one_generation():
+    from concurrent.futures import ThreadPoolExecutor
+
+    llm = SlowCountingLLM("privet|Standard romanization")
+    svc = TransliterationService(llm_client=llm)
+
+    # 40 students submitting the same worksheet line at once
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        results = list(pool.map(lambda _: svc.transliterate("привет", "Cyrl", "Latn"), range(40)))
+
+    assert llm.calls == 1
+    assert all(r["transliteration"] == "privet" for r in results)
+    assert svc.single_flight.stats()["coalesced"] == 39
+
+
+def test_shared_failure_propagates_without_poisoning_later_calls():
+    from concurrent.futures import ThreadPoolExecutor
+
+    llm = SlowCountingLLM("privet|ok", fail=True)
+    svc = TransliterationService(llm_client=llm)
+
+    def call(_):
+        try:
+            return svc.transliterate("привет", "Cyrl", "Latn")
+        except RuntimeError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        outcomes = list(pool.map(call, range(5)))
+
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert llm.calls == 1
+
+    llm.fail = False
+    assert svc.transliterate("привет", "Cyrl", "Latn")["transliteration"] == "privet"
+    assert llm.calls == 2
+
+
+def test_explain_none_skips_explanation_and_explain_result_caches_it():
+    dummy = DummyLLM('{"transliteration": "privet"}')
+    svc = TransliterationService(llm_client=dummy)
+
+    result = svc.transliterate("привет", "Cyrillic", "Latin", explain="none")
+
+    assert result["transliteration"] == "privet"
+    assert result["explanation"] is None
+    assert "explanation" not in dummy.last_prompt
+
+    dummy.response = '{"explanation": "Standard romanization of the soft consonant."}'
+    first = svc.explain_result(result, level="full")
+    dummy.response = '{"explanation": "should not be generated"}'
+    assert svc.explain_result(result, level="full") == first
+    assert "Standard romanization" in first
+
+    with pytest.raises(ValueError):
+        svc.transliterate("привет", "Cyrillic", "Latin", explain="verbose")
@@ -0,0 +1,84 @@
+import pytest
+
+from backend.transliteration.transliteration_service import TransliterationService, LLMClient, StructuredOutputError
+from backend.transliteration.word_memory import WordMemory, tokenize
+
+
+class RecordingLLM(LLMClient):
+    def __init__(self, response: str):
+        self.response = response
+        self.prompts = []
+
+    def generate(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return self.response
+
+
+def test_tokenize_keeps_combining_marks_and_round_trips():
+    text = "नमस्ते, दुनिया!"
+    runs = tokenize(text)
+
+    assert "".join(run for _, run in runs) == text
+    assert [run for is_word, run in runs if is_word] == ["नमस्ते", "दुनिया"]
+
+
+def test_memory_requires_repeated_observations_and_persists(tmp_path):
+    path = tmp_path / "memory.sqlite3"
+    memory = WordMemory(path)
+
+    memory.learn("Привет мир", "Privet mir", "Cyrl", "Latn")
+    assert memory.lookup("мир", "Cyrl", "Latn") == (None, {})
+
+    memory.learn("привет, мир", "privet, mir", "Cyrl", "Latn")
+    # word counts differ, so nothing can be aligned
+    assert memory.learn("мир", "the world", "Cyrl", "Latn") == 0
+
+    reopened = WordMemory(path)
+    assert reopened.lookup("Мир, привет!", "Cyrl", "Latn")[0] == "Mir, privet!"
+
+
+def test_service_answers_known_text_and_hints_partial_text():
+    llm = RecordingLLM('{"transliteration": "privet mir"}')
+    svc = TransliterationService(llm_client=llm, word_memory=WordMemory(":memory:"))
+
+    svc.transliterate("привет мир", "Cyrl", "Latn", explain="none")
+    svc.transliterate("привет мир", "Cyrl", "Latn", explain="none")
+    assert len(llm.prompts) == 2
+
+    result = svc.transliterate("мир привет", "Cyrl", "Latn", explain="none")
+    assert result["transliteration"] == "mir privet"
+    assert result["from_memory"] is True
+    assert len(llm.prompts) == 2
+
+    llm.response = '{"transliteration": "privet drug"}'
+    svc.transliterate("привет друг", "Cyrl", "Latn", explain="none")
+    assert "Known word transliterations (reuse them): привет = privet" in llm.prompts[-1]
+
+
+def test_unparsed_output_is_not_learned():
+    llm = RecordingLLM("Sorry, I cannot help with that.")
+    memory = WordMemory(":memory:")
+    svc = TransliterationService(llm_client=llm, word_memory=memory)
+
+    for _ in range(3):
+        with pytest.raises(StructuredOutputError):
+            svc.transliterate("привет мир", "Cyrl", "Latn", explain="none")
+
+    assert memory.lookup("привет мир", "Cyrl", "Latn") == (None, {})
+
+
+def test_context_requests_bypass_memory():
+    llm = RecordingLLM('{"transliteration": "privet mir"}')
+    memory = WordMemory(":memory:")
+    svc = TransliterationService(llm_client=llm, word_memory=memory)
+
+    svc.transliterate("привет мир", "Cyrl", "Latn", context="a greeting", explain="none")
+    svc.transliterate("привет мир", "Cyrl", "Latn", context="a greeting", explain="none")
+    assert memory.lookup("привет мир", "Cyrl", "Latn") == (None, {})
+
+    svc.transliterate("привет мир", "Cyrl", "Latn", explain="none")
+    svc.transliterate("привет мир", "Cyrl", "Latn", explain="none")
+    llm.response = '{"transliteration": "Privet, Mir (the space station)"}'
+    result = svc.transliterate("привет мир", "Cyrl", "Latn", context="space news", explain="none")
+    assert result["transliteration"] == "Privet, Mir (the space station)"
+    assert "Known word" not in llm.prompts[-1]
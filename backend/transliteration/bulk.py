@@ -0,0 +1,374 @@
+"""
+Offline bulk transliteration.
+
+Run from `backend/`:
+
+    python -m transliteration.bulk corpus.jsonl -o corpus.out.jsonl --target Latn
+    python -m transliteration.bulk - --format txt --source Cyrl --target Latn < lines.txt > out.jsonl
+    python -m transliteration.bulk scans/ -o scans.jsonl --target Latn --ocr-workers 8
+
+Input is streamed from a file or stdin ("-"): JSONL (text in --field, default "text"; an "id" is
+copied to the output), CSV (column --field, and "id") or plain text (one record per line, empty
+lines included so outputs line up). A directory is OCR'd instead: its images and PDFs (one
+record per PDF page), walked in sorted order and read in a process pool of --ocr-workers.
+
+Records take the API's batch path: word memory answers fully known inputs without the LLM,
+identical inputs share one generation, short inputs are micro-batched into shared prompts and
+long ones (OCR'd pages) go through the document pipeline. Up to --concurrency records are in
+flight; results are written as JSONL in input order, one line per record:
+
+    {"index": 0, "id": ..., "source_script": "Cyrl", "target_script": "Latn", "transliteration": ..., "from_memory": false}
+    {"index": 1, "id": ..., "error": "..."}
+
+Error lines are for records that cannot be transliterated (bad input, failed OCR). A record
+refused because the LLM is overloaded is retried after the scheduler's `retry_after`, backing off
+up to --max-retries times; past that the run stops without writing it, and rerunning resumes
+from the last checkpoint.
+
+Only a bounded window of records is held at any time, so memory stays flat however large the
+corpus. With an output file, progress is checkpointed to `<output>.checkpoint` every
+--checkpoint-every records (after flushing the output to disk). Rerunning the same command
+resumes there: input already done is skipped and output written after the checkpoint discarded.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from llm.scheduler import BATCH, LLMOverloadedError
+from ocr.language_detection import detect_script
+from transliteration.document_pipeline import DocumentPipeline
+from transliteration.micro_batcher import MicroBatcher
+from transliteration.transliteration_service import TransliterationService
+
+# Same cut-over as the API: longer inputs are chunked by the document pipeline
+DOCUMENT_THRESHOLD_CHARS = 2000
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".gif", ".webp"}
+FORMATS = ("jsonl", "csv", "txt")
+
+
+# --- Input --------------------------------------------------------------------------------------
+# Records are dicts with "id" and "text" (or "error"). "end_of_unit" marks the last record of a
+# unit that can be skipped as a whole on resume: every text record, or a document's last page.
+
+def guess_format(path: str) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix == ".csv":
+        return "csv"
+    return "txt"
+
+
+def read_records(stream: IO[str], fmt: str, field: str = "text", skip: int = 0) -> Iterator[dict]:
+    """Records from a JSONL, CSV or plain-text stream, after the first `skip` ones."""
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(stream)):
+            if number >= skip:
+                if field in row:
+                    yield {"id": row.get("id"), "text": row[field], "end_of_unit": True}
+                else:
+                    yield {"id": row.get("id"), "error": f"No {field!r} column", "end_of_unit": True}
+        return
+
+    number = 0
+    for line in stream:
+        if fmt == "jsonl" and not line.strip():
+            continue
+        number += 1
+        if number <= skip:
+            # Skipped lines are not parsed
+            continue
+        if fmt == "txt":
+            yield {"id": None, "text": line.rstrip("\r\n"), "end_of_unit": True}
+            continue
+        try:
+            data = json.loads(line)
+            yield {"id": data.get("id"), "text": data[field], "end_of_unit": True}
+        except (ValueError, KeyError, AttributeError, TypeError) as e:
+            yield {"id": None, "error": f"Bad record: {e!r}", "end_of_unit": True}
+
+
+def iter_documents(directory: str) -> Iterator[Path]:
+    """Images and PDFs under `directory`, in a stable (sorted) order, without listing it up front."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            suffix = Path(name).suffix.lower()
+            if suffix == ".pdf" or suffix in IMAGE_EXTENSIONS:
+                yield Path(root, name)
+
+
+def ocr_document(path: str) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+    """([(id suffix, text)], error) for one file; runs in an OCR worker process."""
+    try:
+        if path.lower().endswith(".pdf"):
+            from ocr.ocr_utils import iter_pdf_pages
+            return [(f"#{number + 1}", text or "") for number, text in iter_pdf_pages(path)], None
+        from ocr.ocr import extract_text_from_bytes
+        return [("", extract_text_from_bytes(Path(path).read_bytes())["text"])], None
+    except Exception as e:
+        return [], f"OCR failed: {e}"
+
+
+def ocr_records(directory: str, pool: Executor, window: int, skip: int = 0) -> Iterator[dict]:
+    """One record per image / PDF page of `directory`, after the first `skip` files."""
+    paths = (path for number, path in enumerate(iter_documents(directory)) if number >= skip)
+    submitted = ((path, pool.submit(ocr_document, str(path))) for path in paths)
+    for path, (pages, error) in in_order(submitted, window):
+        name = path.relative_to(directory).as_posix()
+        if error or not pages:
+            yield {"id": name, "error": error or "No pages", "end_of_unit": True}
+            continue
+        for number, (suffix, text) in enumerate(pages, start=1):
+            yield {"id": name + suffix, "text": text, "end_of_unit": number == len(pages)}
+
+
+def in_order(submitted: Iterator[Tuple[object, Future]], window: int) -> Iterator[Tuple[object, object]]:
+    """(key, result) for each (key, future) of a lazy iterator, in input order.
+
+    Pulls (and so submits) at most `window` entries ahead of what was yielded; Executor.map
+    would submit the whole input up front.
+    """
+    pending: deque = deque()
+    for entry in submitted:
+        pending.append(entry)
+        if len(pending) >= window:
+            key, future = pending.popleft()
+            yield key, future.result()
+    while pending:
+        key, future = pending.popleft()
+        yield key, future.result()
+
+
+# --- Processing ---------------------------------------------------------------------------------
+
+class BulkTransliterator:
+    def __init__(
+        self,
+        service: TransliterationService,
+        target_script: str,
+        source_script: Optional[str] = None,
+        context: Optional[str] = None,
+        concurrency: int = 16,
+        max_retries: int = 8,
+        retry_backoff: float = 1.0,
+    ):
+        self.service = service
+        self.micro_batcher = MicroBatcher(service)
+        self.document_pipeline = DocumentPipeline(service)
+        self.target_script = service.normalize_script_code(target_script)
+        self.source_script = service.normalize_script_code(source_script) if source_script else None
+        self.context = context
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = {"records": 0, "errors": 0, "from_memory": 0, "retries": 0}
+        self._lock = threading.Lock()
+
+    def transliterate(self, record: dict) -> dict:
+        """Output fields for one record (without "index"); failures become {"error": ...}.
+
+        LLMOverloadedError is not a failure of the record: it is retried with backoff and, once
+        `max_retries` is exceeded, raised so the run stops before the record is written.
+        """
+        output = {"id": record.get("id")}
+        if "error" in record:
+            return {**output, "error": record["error"]}
+        text = record["text"]
+        attempt = 0
+        while True:
+            try:
+                src = self.source_script or detect_script(text)["iso_15924"]
+                result = self._transliterate_text(text, src)
+                break
+            except LLMOverloadedError as e:
+                if attempt >= self.max_retries:
+                    raise
+                with self._lock:
+                    self.stats["retries"] += 1
+                time.sleep(max(e.retry_after, self.retry_backoff * 2 ** attempt))
+                attempt += 1
+            except Exception as e:
+                return {**output, "error": str(e)}
+        return {
+            **output,
+            "source_script": src,
+            "target_script": self.target_script,
+            "transliteration": result["transliteration"],
+            "from_memory": bool(result.get("from_memory")),
+        }
+
+    def _transliterate_text(self, text: str, src: str) -> dict:
+        if not text.strip():
+            return {"transliteration": text}
+        if len(text) > DOCUMENT_THRESHOLD_CHARS:
+            return self.document_pipeline.transliterate_document(
+                text, src, self.target_script, self.context, priority=BATCH
+            )
+        return self.micro_batcher.transliterate(text, src, self.target_script, self.context)
+
+    def run(self, records: Iterable[dict], out: IO[bytes], state: Optional[dict] = None,
+            checkpoint: Optional[Path] = None, checkpoint_every: int = 1000) -> dict:
+        """Write one JSONL line per record to `out`, in order; returns the final checkpoint state."""
+        state = dict(state or new_state())
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="bulk") as pool:
+            submitted = ((record.get("end_of_unit", True), pool.submit(self.transliterate, record)) for record in records)
+            try:
+                for end_of_unit, output in in_order(submitted, 4 * self.concurrency):
+                    line = json.dumps({"index": state["records"], **output}, ensure_ascii=False).encode("utf-8") + b"\n"
+                    out.write(line)
+                    state["records"] += 1
+                    state["output_bytes"] += len(line)
+                    if end_of_unit:
+                        state["units"] += 1
+                        state["unit_records"] = state["records"]
+                    self.stats["records"] += 1
+                    self.stats["errors"] += "error" in output
+                    self.stats["from_memory"] += bool(output.get("from_memory"))
+                    if checkpoint and state["records"] % checkpoint_every == 0:
+                        save_checkpoint(checkpoint, out, state)
+            except BaseException:
+                # Stopping (e.g. still overloaded): records not started yet would only be redone on resume
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        if checkpoint:
+            save_checkpoint(checkpoint, out, state)
+        else:
+            out.flush()
+        return state
+
+
+# --- Checkpoints --------------------------------------------------------------------------------
+
+def new_state() -> dict:
+    # records/output_bytes: written so far; units: skippable input units fully written, which
+    # account for the first unit_records records
+    return {"records": 0, "units": 0, "unit_records": 0, "output_bytes": 0}
+
+
+def load_checkpoint(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path: Path, out: IO[bytes], state: dict):
+    """Persist `state` once the output it describes is on disk."""
+    out.flush()
+    try:
+        os.fsync(out.fileno())
+    except (OSError, ValueError, io.UnsupportedOperation):
+        pass
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def skip_records(records: Iterator[dict], count: int) -> Iterator[dict]:
+    for number, record in enumerate(records):
+        if number >= count:
+            yield record
+
+
+# --- CLI ----------------------------------------------------------------------------------------
+
+def build_service(word_memory: bool = True) -> TransliterationService:
+    """The API's service setup: LLM router, model tiers and (optionally) word memory."""
+    from llm.router import get_router
+    from llm.tiering import get_model_tiers
+    from transliteration.word_memory import WordMemory
+
+    return TransliterationService(
+        llm_client=get_router(), word_memory=WordMemory() if word_memory else None, tiers=get_model_tiers()
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Transliterate a corpus (or a directory of scans) offline.")
+    parser.add_argument("input", help="JSONL, CSV or text file, '-' for stdin, or a directory of images/PDFs")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from the file extension)")
+    parser.add_argument("--field", default="text", help="JSONL field / CSV column holding the text")
+    parser.add_argument("--source", help="Source script (default: detected per record)")
+    parser.add_argument("--target", required=True, help="Target script, e.g. Latn")
+    parser.add_argument("--context", help="Context passed with every record")
+    parser.add_argument("--concurrency", type=int, default=16, help="Records in flight")
+    parser.add_argument("--max-retries", type=int, default=8, help="Retries of a record refused as overloaded")
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count() or 2, help="OCR processes")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Records between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--no-word-memory", action="store_true", help="Do not read or update word memory")
+    options = parser.parse_args(argv)
+    if options.checkpoint and not options.output:
+        parser.error("--checkpoint needs --output: stdout cannot be rewound to the checkpoint")
+    return options
+
+
+def main(argv: Optional[List[str]] = None, service: Optional[TransliterationService] = None) -> int:
+    options = parse_args(argv)
+    checkpoint = Path(options.checkpoint or options.output + ".checkpoint") if options.output else None
+    state = new_state()
+    if checkpoint and not options.restart and os.path.exists(options.output):
+        state = load_checkpoint(checkpoint) or state
+
+    bulk = BulkTransliterator(
+        service or build_service(not options.no_word_memory),
+        options.target, options.source, options.context, options.concurrency, options.max_retries,
+    )
+
+    if options.output:
+        out = open(options.output, "r+b" if state["records"] else "wb")
+        # Drop whatever was written after the checkpoint
+        out.truncate(state["output_bytes"])
+        out.seek(state["output_bytes"])
+    else:
+        out = sys.stdout.buffer
+    # Records past the last whole unit (pages of a partly written PDF) are skipped one by one
+    partial = state["records"] - state["unit_records"]
+
+    started = time.perf_counter()
+    try:
+        if os.path.isdir(options.input):
+            with ProcessPoolExecutor(options.ocr_workers) as pool:
+                records = ocr_records(options.input, pool, 2 * options.ocr_workers, skip=state["units"])
+                state = bulk.run(skip_records(records, partial), out, state, checkpoint, options.checkpoint_every)
+        else:
+            fmt = options.format or guess_format(options.input)
+            if options.input == "-":
+                stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+            else:
+                stream = open(options.input, encoding="utf-8", newline="")
+            with stream:
+                records = read_records(stream, fmt, options.field, skip=state["units"])
+                state = bulk.run(skip_records(records, partial), out, state, checkpoint, options.checkpoint_every)
+    except LLMOverloadedError as e:
+        print(f"Stopped: {e} (still overloaded after {options.max_retries} retries); rerun to resume", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    stats = bulk.stats
+    print(
+        f"{stats['records']} records in {elapsed:.1f} s ({stats['records'] / max(elapsed, 1e-9):.1f}/s), "
+        f"{stats['from_memory']} from word memory, {stats['errors']} errors, {stats['retries']} retries; "
+        f"{state['records']} total. Micro-batcher: {bulk.micro_batcher.snapshot()}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
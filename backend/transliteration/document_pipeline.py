@@ -0,0 +1,269 @@
+"""
+Long-document transliteration pipeline.
+
+OCR'd PDFs easily exceed the model's context window when sent as one prompt. The pipeline
+splits a document into layout separators (newlines, page breaks and the whitespace around them,
+kept verbatim) and text units (lines, or sentences of very long lines), packs units into chunks
+and transliterates chunks concurrently. Each chunk is sent as a numbered-items prompt; items
+missing from the answer are asked for again (with backoff) and results are reassembled in
+document order. An overloaded LLM is not retried: LLMOverloadedError reaches the caller.
+"""
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from llm.scheduler import LLMOverloadedError, SINGLE
+from transliteration.transliteration_service import TransliterationService, EXPLAIN_NONE
+
+# Whitespace runs containing a newline or form feed (page break) are layout, not content
+LAYOUT_SEPARATOR_RE = re.compile(r"([^\S\n\f]*[\n\f]\s*)")
+# Whitespace after sentence-final punctuation (Latin, CJK, Arabic, Devanagari)
+SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?。！？؟।])(\s+)")
+
+TEXT = "text"
+SEPARATOR = "sep"
+
+
+class DocumentChunk:
+    """A group of text-unit indices (into the segment list) transliterated with one prompt."""
+
+    def __init__(self, index: int, segment_ids: List[int], texts: List[str]):
+        self.index = index
+        self.segment_ids = segment_ids
+        self.texts = texts
+
+    @property
+    def size(self) -> int:
+        return sum(len(t) for t in self.texts)
+
+
+def _split_long_unit(unit: str, max_chars: int) -> List[Tuple[str, str]]:
+    """Split an over-long unit into sentences, then at whitespace, keeping the breaks as separators."""
+    segments: List[Tuple[str, str]] = []
+    for i, part in enumerate(SENTENCE_BREAK_RE.split(unit)):
+        if i % 2:
+            segments.append((SEPARATOR, part))
+            continue
+        while len(part) > max_chars:
+            cut = part.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+                segments.append((TEXT, part[:cut]))
+                part = part[cut:]
+            else:
+                segments.append((TEXT, part[:cut]))
+                segments.append((SEPARATOR, " "))
+                part = part[cut + 1:]
+        if part:
+            segments.append((TEXT, part))
+    return segments
+
+
+def split_document(text: str, max_chars: int = 1200, max_units: int = 16) -> Tuple[List[Tuple[str, str]], List[DocumentChunk]]:
+    """Return (segments, chunks). Joining all segment texts reproduces `text` exactly."""
+    segments: List[Tuple[str, str]] = []
+    for i, part in enumerate(LAYOUT_SEPARATOR_RE.split(text)):
+        if not part:
+            continue
+        if i % 2:
+            segments.append((SEPARATOR, part))
+            continue
+        # Leading/trailing spaces of a line are layout too (indentation, alignment)
+        stripped = part.strip()
+        if not stripped:
+            segments.append((SEPARATOR, part))
+            continue
+        lead = part[: len(part) - len(part.lstrip())]
+        trail = part[len(part.rstrip()):]
+        if lead:
+            segments.append((SEPARATOR, lead))
+        if len(stripped) > max_chars:
+            segments.extend(_split_long_unit(stripped, max_chars))
+        else:
+            segments.append((TEXT, stripped))
+        if trail:
+            segments.append((SEPARATOR, trail))
+
+    chunks: List[DocumentChunk] = []
+    current_ids: List[int] = []
+    current_texts: List[str] = []
+    size = 0
+    for seg_id, (kind, value) in enumerate(segments):
+        if kind != TEXT:
+            continue
+        if current_ids and (size + len(value) > max_chars or len(current_ids) >= max_units):
+            chunks.append(DocumentChunk(len(chunks), current_ids, current_texts))
+            current_ids, current_texts, size = [], [], 0
+        current_ids.append(seg_id)
+        current_texts.append(value)
+        size += len(value)
+    if current_ids:
+        chunks.append(DocumentChunk(len(chunks), current_ids, current_texts))
+
+    return segments, chunks
+
+
+class DocumentPipeline:
+    """Chunked, concurrent transliteration of long texts with ordered reassembly."""
+
+    def __init__(
+        self,
+        service: TransliterationService,
+        max_chars: int = 1200,
+        max_units: int = 16,
+        parallelism: int = 4,
+        retries: int = 2,
+        backoff: float = 0.5,
+    ):
+        self.service = service
+        self.max_chars = max_chars
+        self.max_units = max_units
+        self.parallelism = parallelism
+        self.retries = retries
+        # Seconds before the first retry; doubled for each further one
+        self.backoff = backoff
+
+    def iter_chunks(
+        self,
+        text: str,
+        source_script: str,
+        target_script: str,
+        context: Optional[str] = None,
+        priority: str = SINGLE,
+        ordered: bool = True,
+        indices: Optional[Iterable[int]] = None,
+    ) -> Iterator[dict]:
+        """Yield finished chunks as {"index", "total", "text"}.
+
+        Each chunk's "text" includes the layout separators that precede it, so concatenating the
+        yielded texts in index order rebuilds the document. With `ordered=True` chunks are
+        yielded in document order as soon as all earlier ones are done; otherwise in completion order.
+        `indices` restricts the work to those chunks (e.g. when resuming a partially done job).
+        """
+        src = self.service.normalize_script_code(source_script)
+        tgt = self.service.normalize_script_code(target_script)
+        segments, chunks = split_document(text, self.max_chars, self.max_units)
+        if not chunks:
+            if indices is None or 0 in set(indices):
+                yield {"index": 0, "total": 1, "text": text}
+            return
+        selected = chunks if indices is None else [chunks[i] for i in sorted(set(indices))]
+
+        # Separators are attached to the chunk that follows them; trailing ones to the last chunk
+        def render(chunk: DocumentChunk, outputs: List[str]) -> str:
+            start = chunk.segment_ids[0]
+            while start > 0 and segments[start - 1][0] == SEPARATOR:
+                start -= 1
+            end = len(segments) if chunk.index == len(chunks) - 1 else chunk.segment_ids[-1] + 1
+            by_id = dict(zip(chunk.segment_ids, outputs))
+            return "".join(by_id.get(i, segments[i][1]) for i in range(start, end))
+
+        pool = ThreadPoolExecutor(max_workers=self.parallelism)
+        try:
+            futures = {
+                # Each chunk runs in a copy of the caller's context so its stages join the request trace
+                pool.submit(contextvars.copy_context().run, self._transliterate_chunk, chunk, src, tgt, context, priority): chunk
+                for chunk in selected
+            }
+            done: Dict[int, str] = {}
+            order = [chunk.index for chunk in selected]
+            position = 0
+            for future in as_completed(futures):
+                chunk = futures[future]
+                rendered = render(chunk, future.result())
+                if not ordered:
+                    yield {"index": chunk.index, "total": len(chunks), "text": rendered}
+                    continue
+                done[chunk.index] = rendered
+                while position < len(order) and order[position] in done:
+                    yield {"index": order[position], "total": len(chunks), "text": done.pop(order[position])}
+                    position += 1
+        finally:
+            # A consumer that stops early (e.g. a disconnected stream) should not keep the LLM busy
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def count_chunks(self, text: str) -> int:
+        return max(1, len(split_document(text, self.max_chars, self.max_units)[1]))
+
+    def transliterate_document(
+        self,
+        text: str,
+        source_script: str,
+        target_script: str,
+        context: Optional[str] = None,
+        priority: str = SINGLE,
+    ) -> dict:
+        parts = [c["text"] for c in self.iter_chunks(text, source_script, target_script, context, priority)]
+        return {
+            "original_text": text,
+            "source_script": self.service.normalize_script_code(source_script),
+            "target_script": self.service.normalize_script_code(target_script),
+            "transliteration": "".join(parts),
+            "explanation": None,
+            "explanation_level": EXPLAIN_NONE,
+            "chunks": len(parts),
+        }
+
+    def _transliterate_chunk(
+        self, chunk: DocumentChunk, src: str, tgt: str, context: Optional[str], priority: str
+    ) -> List[str]:
+        # Units fully known to word memory never reach the model
+        outputs: List[Optional[str]] = [self.service.recall(text, src, tgt, context) for text in chunk.texts]
+        pending = [i for i, value in enumerate(outputs) if value is None]
+        if len(pending) == 1:
+            outputs[pending[0]] = self._single(chunk.texts[pending[0]], src, tgt, context, priority)
+        elif pending:
+            texts = [chunk.texts[i] for i in pending]
+            parsed: Dict[int, str] = {}
+            answered = False
+            last_error: Optional[Exception] = None
+            for attempt in range(self.retries + 1):
+                # Only the items still missing are asked for again; earlier answers are kept
+                missing = [n for n in range(1, len(texts) + 1) if n not in parsed]
+                if attempt:
+                    self._wait(attempt)
+                prompt = self.service._build_batch_prompt([texts[n - 1] for n in missing], src, tgt, context)
+                try:
+                    response = self.service._generate(prompt, priority)
+                except LLMOverloadedError:
+                    raise
+                except Exception as e:
+                    last_error = e
+                    continue
+                answered = True
+                for number, value in self.service._parse_batch_response(response, len(missing)).items():
+                    parsed[missing[number - 1]] = value
+                if len(parsed) == len(texts):
+                    break
+            if not answered and last_error is not None:
+                # The model never answered; unit-by-unit calls would only multiply the failures
+                raise last_error
+
+            # Whatever the chunk retries did not cover is transliterated unit by unit
+            for number, i in enumerate(pending, start=1):
+                if number in parsed:
+                    outputs[i] = parsed[number]
+                    self.service.remember(chunk.texts[i], parsed[number], src, tgt, context)
+                else:
+                    outputs[i] = self._single(chunk.texts[i], src, tgt, context, priority)
+        return outputs
+
+    def _wait(self, attempt: int):
+        time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def _single(self, text: str, src: str, tgt: str, context: Optional[str], priority: str) -> str:
+        last_error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._wait(attempt)
+            try:
+                return self.service.transliterate(
+                    text, src, tgt, context, priority=priority, explain=EXPLAIN_NONE
+                )["transliteration"]
+            except LLMOverloadedError:
+                raise
+            except Exception as e:
+                last_error = e
+        raise last_error
@@ -0,0 +1,181 @@
+"""
+Micro-batching for short transliteration inputs.
+
+Short inputs that share the same (source, target, context) are packed into one numbered prompt,
+so a batch of three-word phrases pays the preamble and model invocation once. Items the batch
+response does not cover fall back to individual `TransliterationService.transliterate` calls;
+a failed batch call (e.g. `LLMOverloadedError` from the scheduler) is not multiplied into
+single calls but raised to every caller in the batch.
+Batched items carry no explanation; callers can request one later with `explain_result`.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from llm.scheduler import BATCH
+from transliteration.transliteration_service import TransliterationService, EXPLAIN_NONE
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough upper bound that also holds for non-Latin scripts, which tokenize less efficiently
+    return max(1, len(text) // 3)
+
+
+class _Group:
+    def __init__(self):
+        self.items: List[Tuple[str, Future]] = []
+        self.tokens = 0
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """Collects short inputs for up to `window` seconds or until `token_budget` is reached."""
+
+    def __init__(
+        self,
+        service: TransliterationService,
+        window: float = 0.05,
+        max_items: int = 16,
+        token_budget: int = 512,
+        max_item_tokens: int = 32,
+        priority: str = BATCH,
+    ):
+        self.service = service
+        self.window = window
+        self.max_items = max_items
+        self.token_budget = token_budget
+        self.max_item_tokens = max_item_tokens
+        self.priority = priority
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str, Optional[str]], _Group] = {}
+        self.stats = {"batches": 0, "batched_items": 0, "fallbacks": 0, "singles": 0, "failed_batches": 0}
+
+    def transliterate(
+        self, text: str, source_script: str, target_script: str, context: Optional[str] = None
+    ) -> dict:
+        """Blocking call for one input; concurrent callers are batched together."""
+        src = self.service.normalize_script_code(source_script)
+        tgt = self.service.normalize_script_code(target_script)
+        recalled = self.service.recall(text, src, tgt, context)
+        if recalled is not None:
+            return {**self._result(text, src, tgt, recalled), "from_memory": True}
+
+        tokens = estimate_tokens(text)
+        if tokens > self.max_item_tokens:
+            self._count("singles")
+            return self.service.transliterate(
+                text, src, tgt, context, priority=self.priority, explain=EXPLAIN_NONE
+            )
+
+        key = (src, tgt, context)
+        future: Future = Future()
+        with self._lock:
+            group = self._pending.setdefault(key, _Group())
+            group.items.append((text, future))
+            group.tokens += tokens
+            leader = len(group.items) == 1
+            if len(group.items) >= self.max_items or group.tokens >= self.token_budget:
+                # Close the group; its leader runs it right away
+                del self._pending[key]
+                group.full.set()
+
+        if leader:
+            group.full.wait(self.window)
+            with self._lock:
+                if self._pending.get(key) is group:
+                    del self._pending[key]
+            self._run_batch(key, group.items)
+
+        return future.result()
+
+    def transliterate_many(
+        self, texts: List[str], source_script: str, target_script: str, context: Optional[str] = None
+    ) -> List[dict]:
+        """Transliterate a known list in budget-sized batches, preserving order."""
+        src = self.service.normalize_script_code(source_script)
+        tgt = self.service.normalize_script_code(target_script)
+        key = (src, tgt, context)
+
+        items: List[Tuple[str, Future]] = []
+        batch: List[Tuple[str, Future]] = []
+        tokens = 0
+        for text in texts:
+            future: Future = Future()
+            items.append((text, future))
+            cost = estimate_tokens(text)
+            if cost > self.max_item_tokens:
+                self._count("singles")
+                self._resolve_single(key, text, future)
+                continue
+            if batch and (len(batch) >= self.max_items or tokens + cost > self.token_budget):
+                self._run_batch(key, batch)
+                # The model is overloaded or down: don't queue the rest of the list behind it
+                failed = batch[0][1].exception()
+                if failed is not None:
+                    raise failed
+                batch, tokens = [], 0
+            batch.append((text, future))
+            tokens += cost
+        if batch:
+            self._run_batch(key, batch)
+
+        return [future.result() for _, future in items]
+
+    def _run_batch(self, key: Tuple[str, str, Optional[str]], items: List[Tuple[str, Future]]):
+        src, tgt, context = key
+        if len(items) == 1:
+            self._count("singles")
+            self._resolve_single(key, *items[0])
+            return
+
+        texts = [text for text, _ in items]
+        try:
+            prompt = self.service._build_batch_prompt(texts, src, tgt, context)
+            response = self.service._generate(prompt, self.priority)
+        except Exception as e:
+            # Overload or outage: retrying item by item would only add load, and callers need
+            # the error (429/503 + Retry-After, job requeue)
+            self._count("failed_batches")
+            for _, future in items:
+                future.set_exception(e)
+            return
+        parsed = self.service._parse_batch_response(response, len(texts))
+
+        self._count("batches")
+        for index, (text, future) in enumerate(items, start=1):
+            if index in parsed:
+                self._count("batched_items")
+                self.service.remember(text, parsed[index], src, tgt, context)
+                future.set_result(self._result(text, src, tgt, parsed[index]))
+            else:
+                self._count("fallbacks")
+                self._resolve_single(key, text, future)
+
+    def _count(self, name: str):
+        # Callers and group leaders update the counters from different threads
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+    @staticmethod
+    def _result(text: str, src: str, tgt: str, transliteration: str) -> dict:
+        return {
+            "original_text": text,
+            "source_script": src,
+            "target_script": tgt,
+            "transliteration": transliteration,
+            "explanation": None,
+            "explanation_level": EXPLAIN_NONE,
+        }
+
+    def _resolve_single(self, key: Tuple[str, str, Optional[str]], text: str, future: Future):
+        src, tgt, context = key
+        try:
+            future.set_result(self.service.transliterate(
+                text, src, tgt, context, priority=self.priority, explain=EXPLAIN_NONE
+            ))
+        except Exception as e:
+            future.set_exception(e)
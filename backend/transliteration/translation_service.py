@@ -2,20 +2,45 @@ from typing import Optional
 import subprocess
 from abc import ABC, abstractmethod
 
+from llm.scheduler import LLMScheduler, SINGLE, get_scheduler
+from llm.structured_output import object_schema, parse_structured
+from llm.tiering import valid_translation
+
 # LLM Client (Ollama)
 class LLMClient(ABC):
+    # True when generate_structured constrains replies to JSON; plain clients' replies may still
+    # come in the old "value|explanation" format
+    supports_json = False
+
     @abstractmethod
     def generate(self, prompt: str) -> str:
         pass
 
+    def generate_structured(self, prompt: str, schema: dict) -> str:
+        """Generate output constrained to JSON matching `schema`.
+
+        Clients without constrained decoding fall back to plain generation; the prompt
+        still asks for JSON and the response is parsed leniently.
+        """
+        return self.generate(prompt)
+
 class OllamaClient(LLMClient):
+    supports_json = True
+
     def __init__(self, model: str = "mistral"):
         self.model = model
 
     def generate(self, prompt: str) -> str:
+        return self._run(prompt)
+
+    def generate_structured(self, prompt: str, schema: dict) -> str:
+        # The CLI only offers generic JSON mode; the expected keys are spelled out in the prompt
+        return self._run(prompt, "--format", "json")
+
+    def _run(self, prompt: str, *args: str) -> str:
         try:
             result = subprocess.run(
-                ["ollama", "run", self.model],
+                ["ollama", "run", self.model, *args],
                 input=prompt,
                 capture_output=True,
                 text=True,
@@ -35,19 +60,41 @@ class OllamaClient(LLMClient):
 class TranslationService:
     """Context-aware literary translation service."""
 
-    def __init__(self, llm_client: Optional[LLMClient] = None):
+    RESPONSE_FIELDS = ("translation", "explanation")
+
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        structured: bool = True,
+        tiers=None,
+    ):
         self.llm = llm_client or OllamaClient()
+        # Optional llm.tiering.ModelTiers: easy requests go to a small model first
+        self.tiers = tiers
+        # Ask for a JSON object instead of the legacy "translation|explanation" format
+        self.structured = structured
+        self.scheduler = scheduler or get_scheduler()
 
     def translate(
-        self, text: str, source_lang: str, target_lang: str, context: Optional[str] = None
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        context: Optional[str] = None,
+        priority: str = SINGLE,
     ) -> dict:
         prompt = self._build_prompt(text, source_lang, target_lang, context)
-        response = self.llm.generate(prompt)
-
-        # Parse response: "translation|explanation"
-        parts = response.split("|", 1)
-        translation = parts[0].strip()
-        explanation = parts[1].strip() if len(parts) > 1 else "No explanation provided."
+        if self.tiers is None:
+            fields = self._generate_fields(prompt, priority)
+        else:
+            fields = self.tiers.run(
+                self.tiers.policy.translation_score(text, source_lang, target_lang, context),
+                lambda llm: self._generate_fields(prompt, priority, llm),
+                lambda f: bool(f.get("explanation")) and valid_translation(text, f["translation"]),
+            )
+        translation = fields["translation"]
+        explanation = fields["explanation"] or "No explanation provided."
 
         return {
             "original_text": text,
@@ -57,6 +104,35 @@ class TranslationService:
             "explanation": explanation,
         }
 
+    def _generate(
+        self, prompt: str, priority: str, schema: Optional[dict] = None, llm: Optional[LLMClient] = None
+    ) -> str:
+        llm = llm or self.llm
+        with self.scheduler.slot(priority):
+            if schema is not None:
+                return llm.generate_structured(prompt, schema)
+            return llm.generate(prompt)
+
+    def _generate_fields(self, prompt: str, priority: str, llm: Optional[LLMClient] = None) -> dict:
+        if not self.structured:
+            # Parse response: "translation|explanation"
+            response = self._generate(prompt, priority, llm=llm)
+            parts = response.split("|", 1)
+            return {
+                "translation": parts[0].strip(),
+                "explanation": parts[1].strip() if len(parts) > 1 else "",
+            }
+
+        schema = object_schema(self.RESPONSE_FIELDS)
+        response = self._generate(prompt, priority, schema, llm)
+        fields = parse_structured(
+            response, self.RESPONSE_FIELDS, repair=lambda p: self._generate(p, priority, schema, llm),
+            legacy=not getattr(llm or self.llm, "supports_json", False),
+        )
+        if fields is None:
+            fields = {"translation": response.strip(), "explanation": ""}
+        return fields
+
     def _build_prompt(
         self, text: str, source_lang: str, target_lang: str, context: Optional[str] = None
     ) -> str:
@@ -66,7 +142,13 @@ Text: "{text}"
         if context:
             prompt += f"Context: {context}\n"
 
-        prompt += """Provide the translated text followed by a brief explanation of your translation choices, separated by a pipe (|).
+        if self.structured:
+            prompt += """Respond with a JSON object with two string keys: "translation" (the translated text) and "explanation" (a brief explanation of your translation choices).
+Format: {"translation": "...", "explanation": "..."}
+
+Answer:"""
+        else:
+            prompt += """Provide the translated text followed by a brief explanation of your translation choices, separated by a pipe (|).
 Format: [translation]|[explanation]
 
 Answer:"""
@@ -2,30 +2,65 @@
 Transliteration service with LLM integration.
 Handles context-aware transliteration and explanation generation.
 """
-from typing import Optional
+from typing import Dict, List, Optional
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import os
+import re
 import subprocess
+import threading
+import time
+
+from llm.scheduler import LLMScheduler, SINGLE, get_scheduler
+from llm.single_flight import SingleFlight
+from llm.structured_output import StructuredOutputError, object_schema, parse_structured
+from llm.tiering import valid_transliteration
+from observability.metrics import record_stage, stage
 
 
 class LLMClient(ABC):
+    # True when generate_structured constrains replies to JSON; plain clients' replies may still
+    # come in the old "value|explanation" format
+    supports_json = False
+
     @abstractmethod
     def generate(self, prompt: str) -> str:
         pass
 
+    def generate_structured(self, prompt: str, schema: dict) -> str:
+        """Generate output constrained to JSON matching `schema`.
+
+        Clients without constrained decoding fall back to plain generation; the prompt
+        still asks for JSON and the response is parsed leniently.
+        """
+        return self.generate(prompt)
+
 
 class OllamaClient(LLMClient):
-    def __init__(self, model: str = "mistral"):
+    supports_json = True
+
+    def __init__(self, model: str = "mistral", host: Optional[str] = None):
         self.model = model
+        # Server to talk to (OLLAMA_HOST); None uses the CLI's default local server
+        self.host = host
 
     def generate(self, prompt: str) -> str:
+        return self._run(prompt)
+
+    def generate_structured(self, prompt: str, schema: dict) -> str:
+        # The CLI only offers generic JSON mode; the expected keys are spelled out in the prompt
+        return self._run(prompt, "--format", "json")
+
+    def _run(self, prompt: str, *args: str) -> str:
         try:
             result = subprocess.run(
-                ["ollama", "run", self.model],
+                ["ollama", "run", self.model, *args],
                 input=prompt,
                 capture_output=True,
                 text=True,
                 encoding='utf-8',
-                errors='replace'
+                errors='replace',
+                env={**os.environ, "OLLAMA_HOST": self.host} if self.host else None,
             )
         except FileNotFoundError:
             raise RuntimeError(
@@ -38,7 +73,61 @@ class OllamaClient(LLMClient):
         return result.stdout.strip()
 
 
+# "3. text", "3) text", "[3] text" or "3: text" at the start of a line
+BATCH_LINE_RE = re.compile(r"^\s*\[?(\d+)[.):\]]\s*(.*?)\s*$")
+
+
+EXPLAIN_NONE = "none"
+EXPLAIN_BRIEF = "brief"
+EXPLAIN_FULL = "full"
+EXPLAIN_LEVELS = (EXPLAIN_NONE, EXPLAIN_BRIEF, EXPLAIN_FULL)
+
+# Upper bound on word-memory hints injected into one prompt
+MAX_PROMPT_HINTS = 30
+
+# What the model is asked to write for each explanation level
+EXPLANATION_INSTRUCTIONS = {
+    EXPLAIN_BRIEF: "a brief explanation of your choices",
+    EXPLAIN_FULL: "a detailed explanation of your choices, covering ambiguous letters, the convention "
+                  "followed and how the result is pronounced",
+}
+
+
+class ExplanationCache:
+    """Bounded LRU cache of explanations keyed by transliteration result and level."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(result: dict, level: str) -> tuple:
+        return (
+            result["original_text"], result["source_script"], result["target_script"],
+            result["transliteration"], level,
+        )
+
+    def get(self, result: dict, level: str) -> Optional[str]:
+        with self._lock:
+            key = self.key(result, level)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            return None
+
+    def put(self, result: dict, level: str, explanation: str):
+        key = self.key(result, level)
+        with self._lock:
+            self._entries[key] = explanation
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
 class TransliterationService:
+    RESPONSE_FIELDS = ("transliteration", "explanation")
+
     SCRIPT_ALIASES = {
         "latin": "Latn", "Latin": "Latn",
         "cyrillic": "Cyrl", "Cyrillic": "Cyrl",
@@ -48,8 +137,26 @@ class TransliterationService:
         "hebrew": "Hebr", "Hebrew": "Hebr",
     }
 
-    def __init__(self, llm_client: Optional[LLMClient] = None):
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        structured: bool = True,
+        word_memory=None,
+        tiers=None,
+    ):
         self.llm = llm_client or OllamaClient()
+        # Optional llm.tiering.ModelTiers: easy requests go to a small model first
+        self.tiers = tiers
+        # Optional transliteration.word_memory.WordMemory consulted before prompting
+        self.word_memory = word_memory
+        # Ask for a JSON object instead of the legacy "transliteration|explanation" format
+        self.structured = structured
+        self.scheduler = scheduler or get_scheduler()
+        # Identical concurrent requests share one LLM generation
+        self.single_flight = SingleFlight()
+        # Explanations are generated on demand and reused for the same result
+        self.explanations = ExplanationCache()
 
     def normalize_script_code(self, script: str) -> str:
         if len(script) == 4 and script[0].isupper():
@@ -62,41 +169,247 @@ class TransliterationService:
         )
 
     def transliterate(
-        self, text: str, source_script: str, target_script: str, context: Optional[str] = None
+        self,
+        text: str,
+        source_script: str,
+        target_script: str,
+        context: Optional[str] = None,
+        priority: str = SINGLE,
+        explain: str = EXPLAIN_BRIEF,
     ) -> dict:
+        """Transliterate `text`.
+
+        `explain` controls the explanation: "none" skips it (roughly halving output tokens),
+        "brief" and "full" generate it with the transliteration. A skipped explanation can be
+        produced later with `explain_result`.
+        """
+        if explain not in EXPLAIN_LEVELS:
+            raise ValueError(f"Unknown explain level: {explain}. Use one of {', '.join(EXPLAIN_LEVELS)}.")
         src = self.normalize_script_code(source_script)
         tgt = self.normalize_script_code(target_script)
 
-        prompt = self._build_prompt(text, src, tgt, context)
-        response = self.llm.generate(prompt)
-
-        parts = response.split("|", 1)
-        transliteration = parts[0].strip()
-        explanation = parts[1].strip() if len(parts) > 1 else "No explanation provided."
+        hints: Dict[str, str] = {}
+        # Memory holds context-free readings; a request with context gets the model's own
+        if self.word_memory is not None and not context:
+            with stage("transliteration.memory_lookup"):
+                recalled, hints = self.word_memory.lookup(text, src, tgt)
+            if recalled is not None and explain == EXPLAIN_NONE:
+                # Every word is known: answer without the LLM
+                return {
+                    "original_text": text,
+                    "source_script": src,
+                    "target_script": tgt,
+                    "transliteration": recalled,
+                    "explanation": None,
+                    "explanation_level": explain,
+                    "from_memory": True,
+                }
+
+        prompt = self._build_prompt(text, src, tgt, context, explain, hints)
+        key = (text, src, tgt, context, getattr(self.llm, "model", None), explain)
+        fields = self.single_flight.do(
+            key, lambda: self._generate_tiered(prompt, priority, explain, text, src, tgt, context)
+        )
+        if fields.get("unparsed"):
+            raise StructuredOutputError("The model's reply could not be parsed as a transliteration", fields["transliteration"])
+        self.remember(text, fields["transliteration"], src, tgt, context)
 
-        return {
+        result = {
             "original_text": text,
             "source_script": src,
             "target_script": tgt,
-            "transliteration": transliteration,
-            "explanation": explanation,
+            "transliteration": fields["transliteration"],
+            "explanation": None,
+            "explanation_level": explain,
         }
+        if explain != EXPLAIN_NONE:
+            result["explanation"] = fields.get("explanation") or "No explanation provided."
+            self.explanations.put(result, explain, result["explanation"])
+        return result
+
+    def recall(self, text: str, source_script: str, target_script: str,
+               context: Optional[str] = None) -> Optional[str]:
+        """Transliteration of `text` from word memory when every word is known, else None.
+
+        Always None with a context: memory only holds context-free readings.
+        """
+        if self.word_memory is None or context:
+            return None
+        return self.word_memory.lookup(text, source_script, target_script)[0]
+
+    def remember(self, text: str, transliteration: str, source_script: str, target_script: str,
+                 context: Optional[str] = None):
+        """Feed a parsed, context-free LLM result to word memory (no-op without one)."""
+        if self.word_memory is not None and transliteration and not context:
+            self.word_memory.learn(text, transliteration, source_script, target_script)
+
+    def explain_result(self, result: dict, level: str = EXPLAIN_BRIEF, priority: str = SINGLE) -> str:
+        """Explain an existing transliteration result, generating it at most once per level."""
+        if level not in EXPLANATION_INSTRUCTIONS:
+            raise ValueError(f"Unknown explain level: {level}. Use 'brief' or 'full'.")
+        with stage("transliteration.explanation_cache"):
+            cached = self.explanations.get(result, level)
+        if cached is not None:
+            return cached
+
+        prompt = self._build_explanation_prompt(result, level)
+        key = ("explain",) + ExplanationCache.key(result, level)
+
+        def generate() -> str:
+            if not self.structured:
+                return self._generate(prompt, priority).strip()
+            schema = object_schema(("explanation",))
+            response = self._generate(prompt, priority, schema)
+            fields = parse_structured(
+                response, ("explanation",), repair=lambda p: self._generate(p, priority, schema)
+            )
+            return fields["explanation"] if fields else response.strip()
+
+        explanation = self.single_flight.do(key, generate) or "No explanation provided."
+        self.explanations.put(result, level, explanation)
+        return explanation
+
+    def _generate(
+        self, prompt: str, priority: str, schema: Optional[dict] = None, llm: Optional[LLMClient] = None
+    ) -> str:
+        llm = llm or self.llm
+        queued = time.perf_counter()
+        with self.scheduler.slot(priority):
+            record_stage("llm.queue", time.perf_counter() - queued)
+            with stage("llm.generate"):
+                if schema is not None:
+                    return llm.generate_structured(prompt, schema)
+                return llm.generate(prompt)
+
+    def _generate_tiered(
+        self, prompt: str, priority: str, explain: str, text: str, src: str, tgt: str, context: Optional[str]
+    ) -> Dict[str, str]:
+        if self.tiers is None:
+            return self._generate_fields(prompt, priority, explain)
+
+        def valid(fields: Dict[str, str]) -> bool:
+            if fields.get("unparsed"):
+                return False
+            if explain != EXPLAIN_NONE and not fields.get("explanation"):
+                return False
+            return valid_transliteration(text, fields["transliteration"], tgt)
+
+        score = self.tiers.policy.transliteration_score(text, src, tgt, context, explain)
+        return self.tiers.run(score, lambda llm: self._generate_fields(prompt, priority, explain, llm), valid)
+
+    def _generate_fields(
+        self, prompt: str, priority: str, explain: str = EXPLAIN_BRIEF, llm: Optional[LLMClient] = None
+    ) -> Dict[str, str]:
+        if not self.structured:
+            response = self._generate(prompt, priority, llm=llm)
+            if explain == EXPLAIN_NONE:
+                return {"transliteration": response.strip()}
+            parts = response.split("|", 1)
+            return {
+                "transliteration": parts[0].strip(),
+                "explanation": parts[1].strip() if len(parts) > 1 else "",
+            }
+
+        fields_wanted = self.RESPONSE_FIELDS if explain != EXPLAIN_NONE else ("transliteration",)
+        schema = object_schema(fields_wanted)
+        response = self._generate(prompt, priority, schema, llm)
+        fields = parse_structured(
+            response, fields_wanted, repair=lambda p: self._generate(p, priority, schema, llm),
+            legacy=not getattr(llm or self.llm, "supports_json", False),
+        )
+        if fields is None:
+            # Unparseable even after repair: marked so a larger tier is tried and `transliterate`
+            # reports it, instead of passing the raw reply off as the transliteration
+            fields = {"transliteration": response.strip(), "explanation": "", "unparsed": True}
+        return fields
 
     def _build_prompt(
-        self, text: str, source_script: str, target_script: str, context: Optional[str] = None
+        self,
+        text: str,
+        source_script: str,
+        target_script: str,
+        context: Optional[str] = None,
+        explain: str = EXPLAIN_BRIEF,
+        hints: Optional[Dict[str, str]] = None,
     ) -> str:
         prompt = f"""Transliterate the following text from {source_script} to {target_script}.
 Text: "{text}"
 """
         if context:
             prompt += f"Context: {context}\n"
+        if hints:
+            known = ", ".join(f"{word} = {value}" for word, value in list(hints.items())[:MAX_PROMPT_HINTS])
+            prompt += f"Known word transliterations (reuse them): {known}\n"
+
+        if explain == EXPLAIN_NONE:
+            if self.structured:
+                prompt += """Respond with a JSON object with one string key: "transliteration" (the transliterated text).
+Format: {"transliteration": "..."}
 
-        prompt += """Provide the transliteration followed by a brief explanation of your choices, separated by a pipe (|).
+Answer:"""
+            else:
+                prompt += """Provide only the transliteration, without any explanation.
+
+Answer:"""
+            return prompt
+
+        instruction = EXPLANATION_INSTRUCTIONS[explain]
+        if self.structured:
+            prompt += f"""Respond with a JSON object with two string keys: "transliteration" (the transliterated text) and "explanation" ({instruction}).
+Format: {{"transliteration": "...", "explanation": "..."}}
+
+Answer:"""
+        else:
+            prompt += f"""Provide the transliteration followed by {instruction}, separated by a pipe (|).
 Format: [transliteration]|[explanation]
 
 Answer:"""
         return prompt
 
+    def _build_explanation_prompt(self, result: dict, level: str) -> str:
+        prompt = f"""The text "{result['original_text']}" was transliterated from {result['source_script']} to {result['target_script']} as "{result['transliteration']}".
+"""
+        if self.structured:
+            prompt += f"""Respond with a JSON object with one string key: "explanation" ({EXPLANATION_INSTRUCTIONS[level]}).
+Format: {{"explanation": "..."}}
+
+Answer:"""
+        else:
+            prompt += f"""Provide {EXPLANATION_INSTRUCTIONS[level]}.
+
+Answer:"""
+        return prompt
+
+    def _build_batch_prompt(
+        self, texts: List[str], source_script: str, target_script: str, context: Optional[str] = None
+    ) -> str:
+        prompt = f"""Transliterate each numbered item from {source_script} to {target_script}.
+"""
+        if context:
+            prompt += f"Context: {context}\n"
+
+        prompt += "Items:\n"
+        for i, text in enumerate(texts, start=1):
+            prompt += f"{i}. {text}\n"
+
+        prompt += """Reply with exactly one line per item, in the same order, formatted as [number]. [transliteration]
+Do not add explanations or any other text.
+
+Answer:"""
+        return prompt
+
+    def _parse_batch_response(self, response: str, count: int) -> Dict[int, str]:
+        """Map item numbers (1-based) to transliterations, ignoring preamble and out-of-range lines."""
+        results: Dict[int, str] = {}
+        for line in response.splitlines():
+            match = BATCH_LINE_RE.match(line)
+            if not match:
+                continue
+            index, value = int(match.group(1)), match.group(2).strip().strip('"')
+            if 1 <= index <= count and value and index not in results:
+                results[index] = value
+        return results
+
 
 class TransliterationApp:
     """Wrapper for OCR + transliteration with multi-language fallback."""
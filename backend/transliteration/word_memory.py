@@ -0,0 +1,137 @@
+"""
+Persistent word-level transliteration memory.
+
+Every LLM transliteration whose input and output have the same number of words is aligned
+word by word and stored per (source, target) script pair in a small SQLite index. Before
+prompting, `TransliterationService` asks the memory for known words: fully covered inputs are
+answered without the LLM, partially covered ones pass the known words to the model as hints.
+"""
+import sqlite3
+import threading
+import unicodedata
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "data" / "word_memory.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS words (
+    source_script TEXT NOT NULL,
+    target_script TEXT NOT NULL,
+    token TEXT NOT NULL,
+    transliteration TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (source_script, target_script, token, transliteration)
+) WITHOUT ROWID
+"""
+
+
+def _is_word_char(ch: str) -> bool:
+    # Letters, combining marks (matras, niqqud, harakat) and digits
+    return unicodedata.category(ch)[0] in "LMN"
+
+
+def tokenize(text: str) -> List[Tuple[bool, str]]:
+    """Split text into (is_word, run) pairs; joining the runs reproduces the text."""
+    return [(is_word, "".join(run)) for is_word, run in groupby(text, key=_is_word_char)]
+
+
+def _match_case(source: str, value: str) -> str:
+    if source.isupper() and len(source) > 1:
+        return value.upper()
+    if source[:1].isupper():
+        return value[:1].upper() + value[1:]
+    return value
+
+
+class WordMemory:
+    """Token -> transliteration index backed by SQLite.
+
+    A mapping is only trusted once it has been observed `min_count` times and is the most
+    frequent transliteration for its token.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_count: int = 2):
+        self.path = str(path or DEFAULT_PATH)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.min_count = min_count
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def learn(self, text: str, transliteration: str, source_script: str, target_script: str) -> int:
+        """Align input and output word by word and record the pairs. Returns pairs stored."""
+        if source_script == target_script:
+            return 0
+        source_words = [run for is_word, run in tokenize(text) if is_word]
+        target_words = [run for is_word, run in tokenize(transliteration) if is_word]
+        # Only monotone one-to-one alignments are reliable enough to learn from
+        if not source_words or len(source_words) != len(target_words):
+            return 0
+
+        rows = [
+            (source_script, target_script, src.lower(), tgt.lower())
+            for src, tgt in zip(source_words, target_words)
+            if not src.isdigit()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                """INSERT INTO words (source_script, target_script, token, transliteration) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (source_script, target_script, token, transliteration) DO UPDATE SET count = count + 1""",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def known_words(self, tokens: List[str], source_script: str, target_script: str) -> Dict[str, str]:
+        """Most frequent trusted transliteration for each of `tokens` (lower-cased) that is known."""
+        keys = sorted({t.lower() for t in tokens})
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT token, transliteration, count FROM words
+                    WHERE source_script = ? AND target_script = ? AND token IN ({placeholders})
+                    ORDER BY token, count DESC""",
+                [source_script, target_script, *keys],
+            ).fetchall()
+
+        known: Dict[str, Optional[str]] = {}
+        for token, value, count in rows:
+            if token not in known and count >= self.min_count:
+                known[token] = value
+            elif token not in known:
+                # The most frequent candidate is not trusted yet; don't fall back to rarer ones
+                known[token] = None
+        return {token: value for token, value in known.items() if value is not None}
+
+    def lookup(self, text: str, source_script: str, target_script: str) -> Tuple[Optional[str], Dict[str, str]]:
+        """Return (full transliteration or None, known word hints).
+
+        The full transliteration is only returned when every word of `text` is known; separators
+        (spaces, punctuation) are kept as they are.
+        """
+        runs = tokenize(text)
+        words = [run for is_word, run in runs if is_word and not run.isdigit()]
+        known = self.known_words(words, source_script, target_script)
+        if not words or any(w.lower() not in known for w in words):
+            return None, {w: known[w.lower()] for w in words if w.lower() in known}
+
+        parts = []
+        for is_word, run in runs:
+            if is_word and not run.isdigit():
+                parts.append(_match_case(run, known[run.lower()]))
+            else:
+                parts.append(run)
+        return "".join(parts), {w: known[w.lower()] for w in words}
+
+    def stats(self) -> dict:
+        with self._lock:
+            pairs, observations = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(count), 0) FROM words").fetchone()
+        return {"path": self.path, "entries": pairs, "observations": observations}
@@ -10,7 +10,8 @@ from pathlib import Path
 # Add utils to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from utils.api_client import get_api_client, check_api_health
+from utils.api_client import get_api_client
+from utils import cache
 from utils.session_manager import SessionManager, TransliterationSession
 from utils.ui_components import (
     display_detection_result,
@@ -22,7 +23,8 @@ from utils.ui_components import (
     context_input_widget,
     settings_sidebar,
     info_section,
-    display_chat_interface
+    display_chat_interface,
+    debug_panel
 )
 
 
@@ -66,8 +68,8 @@ settings = settings_sidebar()
 st.markdown('<div class="main-header">🌍 Transliteration Tutor</div>', unsafe_allow_html=True)
 st.markdown('<div class="subheader">Convert text between writing systems with AI-powered explanations</div>', unsafe_allow_html=True)
 
-# Check API health
-if not check_api_health():
+# Check API health (cached, so reruns don't each ping the backend)
+if not cache.check_api_health_cached():
     st.error("""
     ❌ **API Connection Error**
     
@@ -112,8 +114,16 @@ with tab1:
     else:
         file_upload = file_upload_widget(accepted_types=['txt', 'jpg', 'jpeg', 'png', 'pdf', 'gif', 'bmp'])
         if file_upload:
-            file_data, filename = file_upload
-            st.success(f"✅ File uploaded: {filename}")
+            # Images are downscaled and re-encoded to what OCR needs before they are sent
+            file_data, filename, st.session_state.upload_stats = cache.prepare_upload(*file_upload)
+            stats = st.session_state.upload_stats
+            if stats["sent_bytes"] < stats["original_bytes"]:
+                st.success(
+                    f"✅ File uploaded: {file_upload[1]} "
+                    f"({stats['original_bytes'] / 1e6:.1f} MB → {stats['sent_bytes'] / 1e6:.1f} MB to send)"
+                )
+            else:
+                st.success(f"✅ File uploaded: {filename}")
     
     # Proceed to detection
     if (input_text and input_text.strip()) or file_data:
@@ -126,13 +136,12 @@ with tab1:
             st.session_state.detect_clicked = True
         
         if st.session_state.get("detect_clicked", False):
+            # Stays set across reruns; the cache answers repeats of the same input
             with st.spinner("Detecting language..."):
-                client = get_api_client()
-                
                 if input_text:
-                    detection_result = client.detect_language(text=input_text)
+                    detection_result = cache.detect_language(text=input_text)
                 else:
-                    detection_result = client.detect_language(file_data=file_data, filename=filename)
+                    detection_result = cache.detect_language(file_data=file_data, filename=filename)
             
             if "error" not in detection_result:
                 # Store detection result
@@ -177,26 +186,28 @@ with tab1:
             
             if st.session_state.get("transliterate_clicked", False):
                 with st.spinner("Transliterating..."):
-                    client = get_api_client()
-                    
                     confirmed_source = st.session_state.get("confirmed_source_script", "Latn")
                     
                     if input_text:
-                        result = client.transliterate(
+                        result = cache.transliterate(
                             text=input_text,
                             source_script=confirmed_source,
                             target_script=target_script,
                             context=context,
-                            skip_detection=True
+                            skip_detection=True,
+                            explain="brief" if settings["show_explanations"] else "none"
                         )
                     else:
-                        result = client.transliterate(
+                        # Reuses the backend's OCR result from detection; uploads again only if it expired
+                        result = cache.transliterate(
                             file_data=file_data,
                             filename=filename,
+                            artifact_id=st.session_state.get("detection_result", {}).get("artifact_id"),
                             source_script=confirmed_source,
                             target_script=target_script,
                             context=context,
-                            skip_detection=True
+                            skip_detection=True,
+                            explain="brief" if settings["show_explanations"] else "none"
                         )
                 
                 if "error" not in result:
@@ -250,17 +261,30 @@ with tab1:
 with tab2:
     st.markdown("### 📚 Translation History")
     
-    history = SessionManager.get_history()
+    total = SessionManager.history_count()
     
-    if not history:
+    if not total:
         st.info("No translations yet. Start by using the Translate tab!")
     else:
-        st.markdown(f"**Total translations: {len(history)}**")
+        st.markdown(f"**Total translations: {total}**")
+        
+        # Only one page is loaded and rendered per rerun, newest first
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            page_size = st.selectbox("Per page", options=[10, 25, 50], index=0, key="history_page_size")
+        pages = (total + page_size - 1) // page_size
+        if st.session_state.get("history_page", 1) > pages:
+            st.session_state.history_page = pages
+        with col2:
+            page = st.number_input(
+                f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key="history_page"
+            ) if pages > 1 else 1
         st.markdown("---")
         
-        for idx, session in enumerate(history, 1):
+        first = total - (page - 1) * page_size
+        for idx, session in enumerate(SessionManager.get_history_page(page - 1, page_size)):
             with st.expander(
-                f"{idx}. {session.input_text[:60]}... → {session.source_script} to {session.target_script}",
+                f"{first - idx}. {session.input_text[:60]}... → {session.source_script} to {session.target_script}",
                 expanded=False
             ):
                 col1, col2 = st.columns(2)
@@ -318,28 +342,27 @@ with tab3:
     if batch_texts and st.button("🚀 Transliterate Batch", key="batch_btn"):
         client = get_api_client()
         
-        results = []
+        results = [None] * len(batch_texts)
         progress_bar = st.progress(0)
         status_text = st.empty()
+        status_text.text(f"Processing 0/{len(batch_texts)}...")
         
-        for idx, text in enumerate(batch_texts):
-            status_text.text(f"Processing {idx+1}/{len(batch_texts)}...")
-            
-            # First detect language
-            detection = client.detect_language(text=text)
-            detected_source = detection.get("iso_code", source_script or "Latn")
-            
-            # Then transliterate
-            result = client.transliterate(
-                text=text,
-                source_script=source_script or detected_source,
-                target_script=target_script,
-                context=context,
-                skip_detection=bool(source_script)
-            )
-            
-            results.append(result)
-            progress_bar.progress((idx + 1) / len(batch_texts))
+        # Items run concurrently (the backend detects each source script itself unless one is
+        # given); progress advances as each one finishes, results keep the input order
+        completed = 0
+        for idx, result in client.iter_transliterate_many(
+            batch_texts,
+            concurrency=settings["batch_concurrency"],
+            source_script=source_script or None,
+            target_script=target_script,
+            context=context,
+            skip_detection=bool(source_script),
+            batch=True
+        ):
+            results[idx] = result
+            completed += 1
+            status_text.text(f"Processing {completed}/{len(batch_texts)}...")
+            progress_bar.progress(completed / len(batch_texts))
         
         status_text.empty()
         progress_bar.empty()
@@ -425,6 +448,10 @@ with tab4:
             st.text(languages)
 
 
+# Upload sizes and API call timings of this session
+debug_panel()
+
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -12,7 +12,8 @@ from utils.ui_components import (
     context_input_widget,
     settings_sidebar,
     info_section,
-    display_chat_interface
+    display_chat_interface,
+    debug_panel
 )
 
 __all__ = [
@@ -30,5 +31,6 @@ __all__ = [
     'context_input_widget',
     'settings_sidebar',
     'info_section',
-    'display_chat_interface'
+    'display_chat_interface',
+    'debug_panel'
 ]
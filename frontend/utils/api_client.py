@@ -1,91 +1,165 @@
 """
 API client for communicating with the transliteration backend.
 Handles all HTTP requests to the FastAPI backend.
+
+`AsyncTransliterationAPIClient` does the work: one pooled HTTP/1.1 keep-alive connection pool,
+per-call timeouts, and retries with backoff when the backend sheds load (429/503, honouring
+`Retry-After`). Streamlit scripts are synchronous, so `TransliterationAPIClient` runs the async
+client on a background event loop shared by every session and exposes the same blocking methods
+as before, plus `iter_transliterate_many` for concurrent batches with progress.
+
+Every call's path, status, bytes sent/received and latency (including retries) is kept in
+`recent_requests` for the debug panel.
 """
 
-import requests
-import io
-from typing import Optional, Dict, Any
-import streamlit as st
+import asyncio
+import email.utils
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
 
 # API Configuration
 API_BASE_URL = "http://localhost:8000"
 
+# Per-call read timeouts (seconds); LLM-backed calls can queue behind other work on the backend
+DETECT_TIMEOUT = 30.0
+TRANSLITERATE_TIMEOUT = 180.0
+DEFAULT_TIMEOUT = 15.0
+CONNECT_TIMEOUT = 5.0
 
-class TransliterationAPIClient:
-    """Client for transliteration API"""
-    
-    def __init__(self, base_url: str = API_BASE_URL):
+# Statuses the backend uses to shed load; the request was not processed, so retrying is safe
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES = 4
+# Backoff without Retry-After: 0.5 s, 1 s, 2 s, ... (with jitter), never more than MAX_RETRY_WAIT
+BACKOFF_BASE = 0.5
+MAX_RETRY_WAIT = 30.0
+
+# Concurrent requests per batch
+BATCH_CONCURRENCY = 4
+# Calls remembered for the debug panel
+RECENT_REQUESTS = 20
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), if present."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class AsyncTransliterationAPIClient:
+    """Async client for the transliteration API"""
+
+    def __init__(self, base_url: str = API_BASE_URL, max_connections: int = 10,
+                 max_retries: int = MAX_RETRIES, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.base_url = base_url
-        self.session = requests.Session()
-    
-    def detect_language(self, text: Optional[str] = None, file_data: Optional[bytes] = None, 
-                       filename: Optional[str] = None) -> Dict[str, Any]:
-        """
-        Detect language/script of input text or file.
-        
-        Args:
-            text: Text to detect language for
-            file_data: Binary file data (for images/PDFs)
-            filename: Original filename (for file uploads)
-        
-        Returns:
-            Dictionary with detected_script, iso_code, confidence, available_scripts, etc.
-        """
-        url = f"{self.base_url}/detect-language"
-        
+        self.max_retries = max_retries
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self.recent_requests: deque = deque(maxlen=RECENT_REQUESTS)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def _request(self, method: str, path: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> Dict[str, Any]:
+        """Send a request, retrying load-shedding responses; errors come back as {"error": ...}."""
+        stats = {"method": method, "path": path, "status": None, "attempts": 0, "sent_bytes": 0,
+                 "received_bytes": 0, "started": time.time()}
+        started = time.perf_counter()
         try:
-            if text:
-                response = self.session.post(url, data={"text": text})
-            elif file_data:
-                files = {"file": (filename or "upload", io.BytesIO(file_data))}
-                response = self.session.post(url, files=files)
-            else:
-                return {"error": "Provide either text or file"}
-            
-            response.raise_for_status()
+            return await self._send(method, path, timeout, stats, **kwargs)
+        finally:
+            stats["latency_ms"] = round(1000 * (time.perf_counter() - started), 1)
+            self.recent_requests.append(stats)
+
+    async def _send(self, method: str, path: str, timeout: float, stats: dict, **kwargs) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            stats["attempts"] = attempt + 1
+            try:
+                response = await self.http.request(
+                    method, path, timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT), **kwargs
+                )
+            except httpx.ConnectError as e:
+                # Nothing reached the backend; worth another try
+                if attempt == self.max_retries:
+                    return {"error": f"API Error: {str(e)}"}
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except httpx.HTTPError as e:
+                return {"error": f"API Error: {str(e)}"}
+
+            # Multipart and form bodies are sent with a Content-Length; a retry sends them again
+            stats["sent_bytes"] += int(response.request.headers.get("content-length", 0))
+            stats["received_bytes"] += len(response.content)
+            stats["status"] = response.status_code
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                wait = retry_after_seconds(response)
+                await asyncio.sleep(min(MAX_RETRY_WAIT, wait if wait is not None else self._backoff(attempt)))
+                continue
+            if response.status_code >= 400:
+                return {"error": f"API Error: {response.status_code} {response.reason_phrase}",
+                        "status_code": response.status_code}
             return response.json()
-        
-        except requests.exceptions.RequestException as e:
-            return {"error": f"API Error: {str(e)}"}
-    
-    def confirm_language(self, detected_language: str, user_confirmed: bool, 
-                        corrected_language: Optional[str] = None) -> Dict[str, Any]:
+        return {"error": "API Error: retries exhausted"}
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(MAX_RETRY_WAIT, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+    async def detect_language(self, text: Optional[str] = None, file_data: Optional[bytes] = None,
+                              filename: Optional[str] = None) -> Dict[str, Any]:
         """
-        Confirm or correct detected language.
-        
-        Args:
-            detected_language: Original detected ISO code
-            user_confirmed: True if user confirmed, False to correct
-            corrected_language: User's correction if not confirmed
-        
+        Detect language/script of input text or file.
+
         Returns:
-            Dictionary with confirmed_source_script and message
+            Dictionary with detected_script, iso_code, confidence, available_scripts, etc.
         """
-        url = f"{self.base_url}/confirm-language"
-        
+        if text:
+            return await self._request("POST", "/detect-language", DETECT_TIMEOUT, data={"text": text})
+        if file_data:
+            # Raw bytes rather than a file object, so a retried request sends the upload again
+            files = {"file": (filename or "upload", file_data)}
+            return await self._request("POST", "/detect-language", DETECT_TIMEOUT, files=files)
+        return {"error": "Provide either text or file"}
+
+    async def confirm_language(self, detected_language: str, user_confirmed: bool,
+                               corrected_language: Optional[str] = None) -> Dict[str, Any]:
+        """Confirm or correct detected language; returns confirmed_source_script and message."""
         payload = {
             "detected_language": detected_language,
             "user_confirmed": user_confirmed,
         }
         if corrected_language:
             payload["corrected_language"] = corrected_language
-        
-        try:
-            response = self.session.post(url, json=payload)
-            response.raise_for_status()
-            return response.json()
-        
-        except requests.exceptions.RequestException as e:
-            return {"error": f"API Error: {str(e)}"}
-    
-    def transliterate(self, text: Optional[str] = None, file_data: Optional[bytes] = None,
-                     filename: Optional[str] = None, source_script: Optional[str] = None,
-                     target_script: str = "Latn", context: Optional[str] = None,
-                     skip_detection: bool = False) -> Dict[str, Any]:
+        return await self._request("POST", "/confirm-language", json=payload)
+
+    async def transliterate(self, text: Optional[str] = None, file_data: Optional[bytes] = None,
+                            filename: Optional[str] = None, source_script: Optional[str] = None,
+                            target_script: str = "Latn", context: Optional[str] = None,
+                            skip_detection: bool = False, batch: bool = False,
+                            explain: str = "none", artifact_id: Optional[str] = None,
+                            timeout: float = TRANSLITERATE_TIMEOUT) -> Dict[str, Any]:
         """
         Transliterate text from source script to target script.
-        
+
         Args:
             text: Text to transliterate
             file_data: Binary file data (for images/PDFs)
@@ -94,64 +168,124 @@ class TransliterationAPIClient:
             target_script: Target script (default: Latin)
             context: Additional context for transliteration
             skip_detection: Skip auto-detection if True
-        
+            batch: Queue as low-priority batch work on the backend
+            explain: Explanation level: "none", "brief" or "full"
+            artifact_id: The file's OCR result from detect_language; sent instead of file_data,
+                which is only uploaded if the backend no longer has it
+            timeout: Seconds to wait for the response
+
         Returns:
             Dictionary with transliteration, explanation, etc.
         """
-        url = f"{self.base_url}/transliterate"
-        
         data = {
             "target_script": target_script,
-            "skip_detection": "true" if skip_detection else "false"
+            "skip_detection": "true" if skip_detection else "false",
+            "batch": "true" if batch else "false",
+            "explain": explain
         }
-        
         if text:
             data["text"] = text
-        
         if source_script:
             data["source_script"] = source_script
-        
         if context:
             data["context"] = context
-        
-        try:
-            if file_data:
-                files = {"file": (filename or "upload", io.BytesIO(file_data))}
-                response = self.session.post(url, data=data, files=files)
-            else:
-                response = self.session.post(url, data=data)
-            
-            response.raise_for_status()
-            return response.json()
-        
-        except requests.exceptions.RequestException as e:
-            return {"error": f"API Error: {str(e)}"}
-    
-    def chat(self, session_id: str, message: str) -> Dict[str, Any]:
-        """
-        Send a message to the chat endpoint (for follow-up questions).
-        
-        Args:
-            session_id: Chat session ID
-            message: User message
-        
-        Returns:
-            Dictionary with assistant response
+
+        if artifact_id and not text:
+            result = await self._request("POST", "/transliterate", timeout,
+                                         data={**data, "artifact_id": artifact_id})
+            # Expired on the backend: fall back to uploading the file
+            if "artifact_id" not in result.get("error", "") or not file_data:
+                return result
+
+        files = {"file": (filename or "upload", file_data)} if file_data else None
+        return await self._request("POST", "/transliterate", timeout, data=data, files=files)
+
+    async def transliterate_many(self, texts: List[str], concurrency: int = BATCH_CONCURRENCY,
+                                 **options) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Transliterate `texts` with at most `concurrency` requests in flight.
+
+        Async iterator of (index, result) in completion order, so callers can show progress.
         """
-        url = f"{self.base_url}/chat"
-        
-        payload = {
-            "session_id": session_id,
-            "message": message
-        }
-        
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index: int, text: str):
+            async with semaphore:
+                return index, await self.transliterate(text=text, **options)
+
+        for next_done in asyncio.as_completed([one(i, t) for i, t in enumerate(texts)]):
+            yield await next_done
+
+    async def health(self, timeout: float = 2.0) -> bool:
         try:
-            response = self.session.post(url, json=payload)
-            response.raise_for_status()
-            return response.json()
-        
-        except requests.exceptions.RequestException as e:
-            return {"error": f"API Error: {str(e)}"}
+            response = await self.http.get("/health", timeout=timeout)
+        except httpx.HTTPError:
+            return False
+        return response.status_code == 200
+
+
+class _LoopThread:
+    """An event loop running forever in a daemon thread, for calling async code from Streamlit."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="api-client-loop", daemon=True).start()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+
+class TransliterationAPIClient:
+    """Blocking facade over AsyncTransliterationAPIClient (same methods, same return values)"""
+
+    def __init__(self, base_url: str = API_BASE_URL, **options):
+        self.base_url = base_url
+        self._loop = _LoopThread()
+        # The async client must be created on the loop that will use it
+        self.client: AsyncTransliterationAPIClient = self._loop.run(self._create(base_url, options))
+
+    @staticmethod
+    async def _create(base_url: str, options: dict) -> AsyncTransliterationAPIClient:
+        return AsyncTransliterationAPIClient(base_url, **options)
+
+    def detect_language(self, text: Optional[str] = None, file_data: Optional[bytes] = None,
+                        filename: Optional[str] = None) -> Dict[str, Any]:
+        return self._loop.run(self.client.detect_language(text, file_data, filename))
+
+    def confirm_language(self, detected_language: str, user_confirmed: bool,
+                         corrected_language: Optional[str] = None) -> Dict[str, Any]:
+        return self._loop.run(self.client.confirm_language(detected_language, user_confirmed, corrected_language))
+
+    def transliterate(self, **kwargs) -> Dict[str, Any]:
+        """See AsyncTransliterationAPIClient.transliterate."""
+        return self._loop.run(self.client.transliterate(**kwargs))
+
+    def iter_transliterate_many(self, texts: List[str], concurrency: int = BATCH_CONCURRENCY,
+                                **options) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, result) on the calling thread as each concurrent request completes."""
+        done: "queue.Queue" = queue.Queue()
+
+        async def produce():
+            try:
+                async for item in self.client.transliterate_many(texts, concurrency, **options):
+                    done.put(item)
+            finally:
+                done.put(None)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self._loop.loop)
+        while True:
+            item = done.get()
+            if item is None:
+                break
+            yield item
+        # Surface unexpected failures from the producer
+        future.result()
+
+    def health(self) -> bool:
+        return self._loop.run(self.client.health())
+
+    def recent_requests(self) -> List[Dict[str, Any]]:
+        """The latest calls' stats, oldest first."""
+        return list(self.client.recent_requests)
 
 
 # Singleton instance
@@ -167,8 +301,4 @@ def get_api_client() -> TransliterationAPIClient:
 
 def check_api_health() -> bool:
     """Check if API is running"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=2)
-        return response.status_code == 200
-    except:
-        return False
+    return get_api_client().health()
@@ -0,0 +1,133 @@
+"""
+Cached API calls for Streamlit reruns.
+
+Streamlit reruns app.py on every widget interaction, so any call made in the script body is
+repeated each time. These wrappers put health, detection and transliteration behind
+`st.cache_data`, keyed by a hash of the input content and the request options, so a rerun with
+unchanged inputs makes no backend call.
+
+- Only successful responses are cached: the wrapped function raises on an error response and
+  Streamlit does not cache exceptions, so the next rerun asks the backend again.
+- Detection depends only on the content and is shared by every browser session. Its result
+  carries the backend's `artifact_id` for the OCR'd upload, which the backend forgets after
+  ARTIFACT_TTL_SECONDS, so cached detections expire well before that (an artifact evicted early
+  is handled by the API client, which then uploads the file again).
+- Transliteration responses carry a backend `session_id` (chat context), so they are cached per
+  browser session only.
+- Uploaded images are shrunk once per file (see image_prep), not on every rerun.
+"""
+
+import hashlib
+import os
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+import streamlit as st
+
+from utils.api_client import get_api_client
+from utils.image_prep import prepare_upload as _prepare_upload
+
+HEALTH_TTL = 10
+# Same variable and default as the backend (api/artifacts.py); cached artifact_ids must not outlive it
+ARTIFACT_TTL_SECONDS = float(os.environ.get("ARTIFACT_TTL_SECONDS", 1800))
+# A cached artifact_id keeps at least a fifth of its backend lifetime (6 minutes by default)
+DETECT_TTL = 0.8 * ARTIFACT_TTL_SECONDS
+DETECT_MAX_ENTRIES = 256
+TRANSLITERATE_TTL = 1800
+TRANSLITERATE_MAX_ENTRIES = 128
+UPLOAD_MAX_ENTRIES = 16
+
+
+class _Uncached(Exception):
+    """Carries an error response out of a cached function so it is not stored."""
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("error"))
+        self.result = result
+
+
+def content_key(text: Optional[str] = None, file_data: Optional[bytes] = None) -> str:
+    """SHA-256 of the input text or file bytes."""
+    digest = hashlib.sha256()
+    if text:
+        digest.update(b"text:" + text.encode("utf-8"))
+    elif file_data:
+        digest.update(b"file:" + file_data)
+    return digest.hexdigest()
+
+
+def _browser_scope() -> str:
+    if "cache_scope" not in st.session_state:
+        st.session_state.cache_scope = uuid.uuid4().hex
+    return st.session_state.cache_scope
+
+
+@st.cache_data(ttl=HEALTH_TTL, show_spinner=False)
+def _health() -> bool:
+    if not get_api_client().health():
+        raise _Uncached({"error": "API unavailable"})
+    return True
+
+
+def check_api_health_cached() -> bool:
+    """Backend health, checked at most every HEALTH_TTL seconds while it is up."""
+    try:
+        return _health()
+    except _Uncached:
+        return False
+
+
+# Arguments starting with "_" are not hashed by Streamlit; `key` stands in for them
+@st.cache_data(ttl=DETECT_TTL, max_entries=DETECT_MAX_ENTRIES, show_spinner=False)
+def _detect(key: str, _text: Optional[str], _file_data: Optional[bytes],
+            _filename: Optional[str]) -> Dict[str, Any]:
+    result = get_api_client().detect_language(text=_text, file_data=_file_data, filename=_filename)
+    if "error" in result:
+        raise _Uncached(result)
+    return result
+
+
+def detect_language(text: Optional[str] = None, file_data: Optional[bytes] = None,
+                    filename: Optional[str] = None) -> Dict[str, Any]:
+    """Cached TransliterationAPIClient.detect_language."""
+    try:
+        return _detect(content_key(text, file_data), text, file_data, filename)
+    except _Uncached as e:
+        return e.result
+
+
+@st.cache_data(ttl=TRANSLITERATE_TTL, max_entries=TRANSLITERATE_MAX_ENTRIES, show_spinner=False)
+def _transliterate(key: str, scope: str, options: Dict[str, Any], _text: Optional[str],
+                   _file_data: Optional[bytes], _filename: Optional[str]) -> Dict[str, Any]:
+    result = get_api_client().transliterate(text=_text, file_data=_file_data, filename=_filename, **options)
+    if "error" in result:
+        raise _Uncached(result)
+    return result
+
+
+def transliterate(text: Optional[str] = None, file_data: Optional[bytes] = None,
+                  filename: Optional[str] = None, **options) -> Dict[str, Any]:
+    """Cached TransliterationAPIClient.transliterate (options as keyword arguments)."""
+    try:
+        return _transliterate(content_key(text, file_data), _browser_scope(), options,
+                              text, file_data, filename)
+    except _Uncached as e:
+        return e.result
+
+
+@st.cache_data(max_entries=UPLOAD_MAX_ENTRIES, show_spinner=False)
+def _prepare(key: str, _file_data: bytes, filename: str) -> Tuple[bytes, str, Dict[str, Any]]:
+    return _prepare_upload(_file_data, filename)
+
+
+def prepare_upload(file_data: bytes, filename: str) -> Tuple[bytes, str, Dict[str, Any]]:
+    """Cached image_prep.prepare_upload."""
+    return _prepare(content_key(file_data=file_data), file_data, filename)
+
+
+def clear():
+    """Drop all cached responses."""
+    _prepare.clear()
+    _health.clear()
+    _detect.clear()
+    _transliterate.clear()
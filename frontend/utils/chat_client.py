@@ -0,0 +1,148 @@
+"""
+WebSocket chat client for follow-up questions.
+
+The backend streams chat replies over `/ws/chat` as `assistant` frames (`partial: true` for each
+chunk, then a final frame). `ChatSocket` keeps one connection open per browser session, on the
+API client's background event loop, and hands chunks to the Streamlit script as they arrive so
+the reply renders while it is generated.
+
+Chat sessions live on the backend and are addressed by `session_id`, so a dropped connection is
+simply reopened and the question re-sent with the same id. That only happens before the first
+chunk arrived; a reply cut off halfway is reported rather than repeated. Each question carries a
+`message_id`, kept across re-sends, so the backend replaces the earlier attempt instead of storing
+the question twice.
+
+The connection carries one reply at a time: starting a new question (e.g. after a Streamlit
+rerun abandoned the previous stream) cancels the reply still in progress.
+"""
+
+import asyncio
+import json
+import queue
+import random
+import uuid
+from typing import Iterator, Optional
+
+import websockets
+from websockets.exceptions import WebSocketException
+
+from utils.api_client import API_BASE_URL, CONNECT_TIMEOUT, MAX_RETRY_WAIT, get_api_client
+
+# Seconds to wait for the next frame of a reply (the first one may queue behind other LLM work)
+REPLY_TIMEOUT = 180.0
+MAX_RECONNECTS = 3
+
+
+class ChatError(RuntimeError):
+    """The reply could not be (fully) received."""
+
+
+class _ServerError(Exception):
+    def __init__(self, frame: dict):
+        super().__init__(frame.get("message") or "Chat error")
+        self.frame = frame
+
+
+class ChatSocket:
+    """One persistent /ws/chat connection; one reply at a time"""
+
+    def __init__(self, base_url: str = API_BASE_URL, max_reconnects: int = MAX_RECONNECTS):
+        self.url = base_url.replace("http", "ws", 1) + "/ws/chat"
+        self.max_reconnects = max_reconnects
+        # Shares the background event loop of the HTTP client
+        self._loop = get_api_client()._loop
+        self._conn = None
+        # Serialises replies on the connection (created on the background loop); `_future` is the
+        # reply in progress
+        self._lock: Optional[asyncio.Lock] = None
+        self._future = None
+        self.last_ttft_ms: Optional[float] = None
+
+    async def _drop(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                await conn.close()
+            except Exception:
+                pass
+
+    async def _reply(self, session_id: Optional[str], text: str, out: "queue.Queue"):
+        received = False
+        message_id = uuid.uuid4().hex
+        for attempt in range(self.max_reconnects + 1):
+            try:
+                if self._conn is None:
+                    self._conn = await websockets.connect(self.url, open_timeout=CONNECT_TIMEOUT)
+                await self._conn.send(json.dumps(
+                    {"type": "user", "session_id": session_id, "text": text, "message_id": message_id}
+                ))
+                while True:
+                    frame = json.loads(await asyncio.wait_for(self._conn.recv(), REPLY_TIMEOUT))
+                    kind = frame.get("type")
+                    if kind == "session":
+                        # No session id was given: the backend created one; reuse it on reconnect
+                        session_id = frame["session_id"]
+                    elif kind == "error":
+                        raise _ServerError(frame)
+                    elif kind == "assistant" and frame.get("partial"):
+                        received = True
+                        out.put(("chunk", frame.get("text", "")))
+                    elif kind == "assistant":
+                        self.last_ttft_ms = frame.get("ttft_ms")
+                        return
+            except asyncio.CancelledError:
+                # Frames of the abandoned reply would otherwise be read as the next one's
+                await self._drop()
+                raise
+            except _ServerError as e:
+                # The backend closes the socket after an error; overload errors say when to retry
+                await self._drop()
+                retry_after = e.frame.get("retry_after")
+                if received or retry_after is None or attempt == self.max_reconnects:
+                    out.put(("error", str(e)))
+                    return
+                await asyncio.sleep(min(MAX_RETRY_WAIT, float(retry_after)))
+            except (OSError, asyncio.TimeoutError, WebSocketException) as e:
+                await self._drop()
+                if received or attempt == self.max_reconnects:
+                    reason = "reply interrupted" if received else "could not reach the chat service"
+                    out.put(("error", f"Chat connection lost ({reason}): {e}"))
+                    return
+                await asyncio.sleep(min(MAX_RETRY_WAIT, 0.5 * 2 ** attempt * random.uniform(0.5, 1.0)))
+
+    def stream(self, session_id: Optional[str], text: str) -> Iterator[str]:
+        """Send `text` and yield the reply's chunks as they arrive (append them verbatim).
+
+        Raises ChatError if the reply fails; chunks already yielded stay valid.
+        """
+        out: "queue.Queue" = queue.Queue()
+
+        async def run():
+            try:
+                if self._lock is None:
+                    self._lock = asyncio.Lock()
+                async with self._lock:
+                    await self._reply(session_id, text, out)
+            finally:
+                out.put(None)
+
+        if self._future is not None:
+            self._future.cancel()
+        future = self._future = asyncio.run_coroutine_threadsafe(run(), self._loop.loop)
+        try:
+            while True:
+                item = out.get()
+                if item is None:
+                    break
+                kind, value = item
+                if kind == "error":
+                    raise ChatError(value)
+                yield value
+            if not future.cancelled():
+                future.result()
+        finally:
+            # The consumer stopped early (rerun, error): do not keep receiving a reply nobody reads
+            future.cancel()
+
+    def close(self):
+        self._loop.run(self._drop())
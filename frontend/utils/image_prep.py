@@ -0,0 +1,59 @@
+"""
+Shrink images before they are uploaded.
+
+Camera photos are often 5-15 MB, far more than OCR needs: the backend converts every image to
+grayscale before thresholding, and Tesseract reads body text well once letters are ~20-30 px
+tall, which a page photo still gives at MAX_SIDE pixels on its longest side. So images are
+downscaled to MAX_SIDE, converted to grayscale and re-encoded (JPEG for photos, PNG for lossless
+sources such as scans and screenshots). The original is sent whenever that would not be smaller.
+"""
+
+import io
+import time
+from typing import Any, Dict, Tuple
+
+MAX_SIDE = 2000
+JPEG_QUALITY = 90
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "bmp"}
+LOSSLESS_EXTENSIONS = {"png", "gif", "bmp"}
+
+
+def prepare_upload(file_data: bytes, filename: str) -> Tuple[bytes, str, Dict[str, Any]]:
+    """Return (bytes to send, filename to send, stats) for an uploaded file.
+
+    Stats: original_bytes, sent_bytes, original_size and sent_size ((w, h), images only),
+    prep_ms.
+    """
+    started = time.perf_counter()
+    stats: Dict[str, Any] = {"original_bytes": len(file_data), "sent_bytes": len(file_data)}
+    stem, _, extension = filename.rpartition(".")
+    extension = extension.lower()
+    if extension not in IMAGE_EXTENSIONS:
+        return file_data, filename, stats
+
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(file_data))
+        stats["original_size"] = image.size
+        # Phone photos are often stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(image).convert("L")
+    except (OSError, ValueError):
+        # Not decodable here; let the backend report it
+        return file_data, filename, stats
+    image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    if extension in LOSSLESS_EXTENSIONS:
+        image.save(buffer, format="PNG", optimize=True)
+        new_name = f"{stem}.png"
+    else:
+        image.save(buffer, format="JPEG", quality=JPEG_QUALITY)
+        new_name = f"{stem}.jpg"
+    stats["prep_ms"] = round(1000 * (time.perf_counter() - started), 1)
+
+    if buffer.tell() >= len(file_data):
+        return file_data, filename, stats
+    stats["sent_size"] = image.size
+    stats["sent_bytes"] = buffer.tell()
+    return buffer.getvalue(), new_name, stats
@@ -1,13 +1,48 @@
 """
 Session management utilities for Streamlit app.
 Handles conversation history, user preferences, etc.
+
+Only the newest MAX_IN_MEMORY sessions stay in `st.session_state`; older ones are spilled, one
+JSON object per line, to a per-browser file under HISTORY_DIR (see `HistorySpill`). History is
+read a page at a time and exported as NDJSON without building the whole document in memory.
+A spill file is deleted when its history is cleared or its browser session ends; files left
+behind by a crashed process are pruned once they are STALE_SPILL_SECONDS old.
 """
 
 import json
+import os
+import tempfile
+import time
+import uuid
+import weakref
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from pathlib import Path
+from typing import Iterator, List, Dict, Any, Optional
 import streamlit as st
 
+# Sessions kept in memory per browser session; older ones go to the spill file
+MAX_IN_MEMORY = 50
+HISTORY_DIR = Path(os.environ.get("HISTORY_DIR", Path(tempfile.gettempdir()) / "transliteration-history"))
+# Spill files untouched for this long belong to sessions that ended without cleaning up
+STALE_SPILL_SECONDS = 24 * 3600
+
+_pruned = False
+
+
+def prune_stale_spills(directory: Path = HISTORY_DIR, max_age: float = STALE_SPILL_SECONDS) -> int:
+    """Delete spill files not modified for `max_age` seconds; returns how many were removed"""
+    removed = 0
+    cutoff = time.time() - max_age
+    for path in directory.glob("*.ndjson"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            # Removed concurrently by another process
+            continue
+    return removed
+
 
 class TransliterationSession:
     """Represents a single transliteration session with history"""
@@ -67,19 +102,72 @@ class TransliterationSession:
         return obj
 
 
+class HistorySpill:
+    """Append-only NDJSON file of older sessions, with line offsets for random page access"""
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.offsets: List[int] = []
+        # Streamlit has no session-end hook, but the session's state (and with it this object) is
+        # dropped when the session ends; the file goes with it (also at interpreter exit)
+        weakref.finalize(self, path.unlink, missing_ok=True)
+    
+    def __len__(self) -> int:
+        return len(self.offsets)
+    
+    def append(self, sessions: List[TransliterationSession]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            for session in sessions:
+                self.offsets.append(f.tell())
+                f.write(json.dumps(session.to_dict(), default=str, ensure_ascii=False).encode("utf-8") + b"\n")
+    
+    def read(self, start: int, stop: int) -> List[TransliterationSession]:
+        """Sessions [start, stop) in insertion order (oldest first)."""
+        start, stop = max(0, start), min(stop, len(self.offsets))
+        if start >= stop:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[start])
+            return [TransliterationSession.from_dict(json.loads(f.readline())) for _ in range(start, stop)]
+    
+    def lines(self) -> Iterator[bytes]:
+        if not self.offsets:
+            return
+        with open(self.path, "rb") as f:
+            for _ in range(len(self.offsets)):
+                yield f.readline()
+    
+    def clear(self):
+        self.offsets = []
+        self.path.unlink(missing_ok=True)
+
+
 class SessionManager:
     """Manages all transliteration sessions"""
     
     SESSION_HISTORY_KEY = "transliteration_history"
+    HISTORY_SPILL_KEY = "transliteration_history_spill"
     CURRENT_SESSION_KEY = "current_session"
     USER_PREFERENCES_KEY = "user_preferences"
     
     @staticmethod
     def init_session_state():
         """Initialize Streamlit session state"""
+        global _pruned
+        if not _pruned:
+            # Once per process: files of sessions from before a restart are never finalized
+            _pruned = True
+            prune_stale_spills()
+        
         if SessionManager.SESSION_HISTORY_KEY not in st.session_state:
             st.session_state[SessionManager.SESSION_HISTORY_KEY] = []
         
+        if SessionManager.HISTORY_SPILL_KEY not in st.session_state:
+            st.session_state[SessionManager.HISTORY_SPILL_KEY] = HistorySpill(
+                HISTORY_DIR / f"{uuid.uuid4().hex}.ndjson"
+            )
+        
         if SessionManager.CURRENT_SESSION_KEY not in st.session_state:
             st.session_state[SessionManager.CURRENT_SESSION_KEY] = None
         
@@ -95,14 +183,46 @@ class SessionManager:
     def add_session(session: TransliterationSession):
         """Add a new session to history"""
         SessionManager.init_session_state()
-        st.session_state[SessionManager.SESSION_HISTORY_KEY].append(session)
+        recent = st.session_state[SessionManager.SESSION_HISTORY_KEY]
+        recent.append(session)
         st.session_state[SessionManager.CURRENT_SESSION_KEY] = session
+        
+        # Spill the oldest sessions in one write once the in-memory window is full
+        if len(recent) > MAX_IN_MEMORY:
+            overflow = len(recent) - MAX_IN_MEMORY // 2
+            st.session_state[SessionManager.HISTORY_SPILL_KEY].append(recent[:overflow])
+            del recent[:overflow]
     
     @staticmethod
     def get_history() -> List[TransliterationSession]:
-        """Get all sessions"""
+        """Get all sessions, oldest first (reads spilled sessions back; prefer get_history_page)"""
+        SessionManager.init_session_state()
+        spill = st.session_state[SessionManager.HISTORY_SPILL_KEY]
+        return spill.read(0, len(spill)) + st.session_state[SessionManager.SESSION_HISTORY_KEY]
+    
+    @staticmethod
+    def history_count() -> int:
+        """Number of sessions in history"""
+        SessionManager.init_session_state()
+        return len(st.session_state[SessionManager.HISTORY_SPILL_KEY]) + len(
+            st.session_state[SessionManager.SESSION_HISTORY_KEY]
+        )
+    
+    @staticmethod
+    def get_history_page(page: int, page_size: int) -> List[TransliterationSession]:
+        """Sessions on `page` (0-based), newest first; only that page is loaded"""
         SessionManager.init_session_state()
-        return st.session_state[SessionManager.SESSION_HISTORY_KEY]
+        spill = st.session_state[SessionManager.HISTORY_SPILL_KEY]
+        recent = st.session_state[SessionManager.SESSION_HISTORY_KEY]
+        total = len(spill) + len(recent)
+        # Page bounds as oldest-first indices
+        stop = total - page * page_size
+        start = max(0, stop - page_size)
+        if stop <= 0:
+            return []
+        sessions = spill.read(start, min(stop, len(spill)))
+        sessions += recent[max(0, start - len(spill)):max(0, stop - len(spill))]
+        return sessions[::-1]
     
     @staticmethod
     def get_current_session() -> Optional[TransliterationSession]:
@@ -113,6 +233,8 @@ class SessionManager:
     @staticmethod
     def clear_history():
         """Clear all history"""
+        SessionManager.init_session_state()
+        st.session_state[SessionManager.HISTORY_SPILL_KEY].clear()
         st.session_state[SessionManager.SESSION_HISTORY_KEY] = []
         st.session_state[SessionManager.CURRENT_SESSION_KEY] = None
     
@@ -129,11 +251,17 @@ class SessionManager:
         st.session_state[SessionManager.USER_PREFERENCES_KEY][key] = value
     
     @staticmethod
-    def export_history() -> str:
-        """Export history as JSON"""
-        history = SessionManager.get_history()
-        data = [s.to_dict() for s in history]
-        return json.dumps(data, indent=2, default=str)
+    def iter_export_lines() -> Iterator[bytes]:
+        """History as NDJSON lines (one session per line, oldest first), streamed from the spill file"""
+        SessionManager.init_session_state()
+        yield from st.session_state[SessionManager.HISTORY_SPILL_KEY].lines()
+        for session in st.session_state[SessionManager.SESSION_HISTORY_KEY]:
+            yield json.dumps(session.to_dict(), default=str, ensure_ascii=False).encode("utf-8") + b"\n"
+    
+    @staticmethod
+    def export_history() -> bytes:
+        """Export history as NDJSON (spilled sessions are copied as stored, not re-parsed)"""
+        return b"".join(SessionManager.iter_export_lines())
     
     @staticmethod
     def get_history_summary() -> str:
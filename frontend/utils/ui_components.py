@@ -5,7 +5,8 @@ Reusable components for common UI patterns.
 
 import streamlit as st
 from typing import Dict, Any, Optional, List
-from utils.api_client import get_api_client
+from utils.api_client import BATCH_CONCURRENCY, get_api_client
+from utils.chat_client import ChatError, ChatSocket
 
 
 def display_detection_result(detection_result: Dict[str, Any]):
@@ -227,22 +228,32 @@ def display_chat_interface(session_id: str, messages: List[Dict[str, str]] = Non
     user_input = st.chat_input("Ask a follow-up question about the transliteration...")
     
     if user_input:
-        client = get_api_client()
+        # One WebSocket per browser session, kept across reruns
+        if "chat_socket" not in st.session_state:
+            st.session_state.chat_socket = ChatSocket()
+        chat_socket = st.session_state.chat_socket
         
         # Display user message
         st.chat_message("user").write(user_input)
         
-        # Get response from API
-        with st.spinner("Thinking..."):
-            response = client.chat(session_id, user_input)
+        # Render the reply as it streams in
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            assistant_message = ""
+            error = None
+            try:
+                for chunk in chat_socket.stream(session_id, user_input):
+                    assistant_message += chunk
+                    placeholder.markdown(assistant_message + "▌")
+            except ChatError as e:
+                error = str(e)
+            placeholder.markdown(assistant_message or "No response")
         
-        if "error" not in response:
-            assistant_message = response.get("assistant_reply", "No response")
-            st.chat_message("assistant").write(assistant_message)
+        if error:
+            st.error(f"Error: {error}")
+        if assistant_message:
             messages.append({"role": "user", "content": user_input})
             messages.append({"role": "assistant", "content": assistant_message})
-        else:
-            st.error(f"Error: {response['error']}")
     
     return messages
 
@@ -272,15 +283,24 @@ def settings_sidebar():
         value=True
     )
     
+    # Parallel requests for the batch tab
+    batch_concurrency = st.sidebar.slider(
+        "Parallel batch requests",
+        min_value=1,
+        max_value=16,
+        value=BATCH_CONCURRENCY,
+        help="How many batch items are sent to the API at once"
+    )
+    
     # Export history
     if st.sidebar.button("📥 Export History"):
         from utils.session_manager import SessionManager
-        history_json = SessionManager.export_history()
+        history_ndjson = SessionManager.export_history()
         st.sidebar.download_button(
-            label="Download as JSON",
-            data=history_json,
-            file_name="transliteration_history.json",
-            mime="application/json"
+            label="Download as NDJSON",
+            data=history_ndjson,
+            file_name="transliteration_history.ndjson",
+            mime="application/x-ndjson"
         )
     
     # Clear history
@@ -289,13 +309,54 @@ def settings_sidebar():
         SessionManager.clear_history()
         st.rerun()
     
+    # Forget cached API responses (e.g. after restarting the backend with another model)
+    if st.sidebar.button("♻️ Clear Cached Results"):
+        from utils import cache
+        cache.clear()
+        st.rerun()
+    
     return {
         "theme": theme,
         "auto_confirm": auto_confirm,
-        "show_explanations": show_explanations
+        "show_explanations": show_explanations,
+        "batch_concurrency": batch_concurrency
     }
 
 
+def debug_panel():
+    """Sidebar expander with the last upload's size and recent API calls (bytes and latency)"""
+    
+    with st.sidebar.expander("🐞 Debug", expanded=False):
+        upload = st.session_state.get("upload_stats")
+        if upload:
+            st.markdown("**Last upload**")
+            line = f"{upload['original_bytes'] / 1024:.0f} KB → {upload['sent_bytes'] / 1024:.0f} KB sent"
+            if upload.get("sent_size"):
+                line += f" ({upload['original_size'][0]}×{upload['original_size'][1]} → " \
+                        f"{upload['sent_size'][0]}×{upload['sent_size'][1]} px, {upload['prep_ms']} ms)"
+            st.text(line)
+        
+        calls = get_api_client().recent_requests()
+        if not calls:
+            st.caption("No API calls yet (cached results make none).")
+            return
+        st.markdown("**Recent API calls** (newest first)")
+        st.dataframe(
+            [
+                {
+                    "Call": f"{c['method']} {c['path']}",
+                    "Status": c["status"] or "failed",
+                    "Sent KB": round(c["sent_bytes"] / 1024, 1),
+                    "Received KB": round(c["received_bytes"] / 1024, 1),
+                    "Latency ms": c["latency_ms"],
+                    "Attempts": c["attempts"],
+                }
+                for c in reversed(calls)
+            ],
+            hide_index=True,
+        )
+
+
 def info_section():
     """Display help/info section"""
     